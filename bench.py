@@ -0,0 +1,726 @@
+'''Micro-benchmarks for the engine and the AI.
+
+Usage: python bench.py [name ...]   (runs every benchmark if none is given)
+'''
+import sys
+import time
+import tracemalloc
+
+from odds import win_probability
+from state import State
+
+
+def timed(fn, repeat):
+    '''Calls [fn] [repeat] times. Returns the mean time per call in
+    microseconds.'''
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def allocated(fn, repeat):
+    '''Calls [fn] [repeat] times under tracemalloc. Returns the peak number of
+    bytes allocated while doing so.'''
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    for _ in range(repeat):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - base
+
+
+def _find_node_slicing(id, node_lst):
+    '''The recursive, list-slicing lookup that find_node() used to be; kept
+    here as the baseline.'''
+    if len(node_lst) == 0:
+        return None
+    i = len(node_lst) // 2
+    curr_node = node_lst[i]
+    if curr_node.get_id() < id:
+        return _find_node_slicing(id, node_lst[i+1:])
+    elif curr_node.get_id() > id:
+        return _find_node_slicing(id, node_lst[:i])
+    return curr_node
+
+
+def _search_copying(state, ai_color, depth, max_depth, a, b, neighbors, stats):
+    '''The alpha-beta search as build_state_paths() used to expand it: every
+    child State gets fresh copies of both (territory id, troops) lists and
+    troops are looked up by a linear scan. Same moves, values and pruning
+    as search.AlphaBeta; kept here as the baseline.'''
+    stats[0] += 1
+    color = state.get_current_player().get_color()
+    if (depth >= max_depth or len(state.get_trp_terr()) == 0
+            or len(state.get_opp_trp_terr()) == 0):
+        troops = state.get_trp_terr() if color == ai_color else state.get_opp_trp_terr()
+        return sum(num for _, num in troops)
+    maximizing = color == ai_color
+    best = None
+    for t_id, num_troops in state.get_trp_terr():
+        if num_troops < 2:
+            continue
+        for neighbor_id in neighbors[t_id]:
+            if neighbor_id not in [e[0] for e in state.get_opp_trp_terr()]:
+                continue
+            neighbor_troops = state.get_troops(neighbor_id)
+            if num_troops - 1 <= neighbor_troops:
+                continue
+            l = win_probability(num_troops, neighbor_troops)
+            if l <= 0.9:
+                continue
+            new_tt = [e for e in state.get_opp_trp_terr()
+                      if e not in [(neighbor_id, neighbor_troops)]]
+            new_ott = [e for e in state.get_trp_terr()
+                       if e not in [(t_id, num_troops)]] + \
+                [(neighbor_id, num_troops-1), (t_id, 1)]
+            child = State(current_player=state.get_opponent(),
+                          opponent=state.get_current_player(),
+                          move=(t_id, neighbor_id), children=[],
+                          likelihood=l*state.get_likelihood(),
+                          trp_terr=new_tt, opp_trp_terr=new_ott)
+            value = l * _search_copying(child, ai_color, depth+1, max_depth,
+                                        a/l, b/l, neighbors, stats)
+            if maximizing:
+                best = value if best is None else max(best, value)
+                a = max(a, value)
+            else:
+                best = value if best is None else min(best, value)
+                b = min(b, value)
+            if b <= a:
+                return best
+    if best is None:
+        troops = state.get_trp_terr() if color == ai_color else state.get_opp_trp_terr()
+        return sum(num for _, num in troops)
+    return best
+
+
+def _search_position(seed, max_extra_troops=9):
+    '''Deals the classic map between RED and BLUE at random.
+    Returns the two players and the nodes sorted by id.'''
+    from continent import all_nodes_sorted
+    from mapgen import deal
+    from player import Player
+
+    red, blue = [Player(color, 0, [], []) for color in
+                 deal(all_nodes_sorted, 2, max_extra_troops, seed)]
+    return red, blue, all_nodes_sorted
+
+
+def bench_lookup():
+    '''Territory lookups: old slicing search vs find_node() vs registry.'''
+    from continent import all_nodes_sorted, registry
+    from node import find_node
+
+    ids = [node.get_id() for node in all_nodes_sorted]
+    names = [node.get_name() for node in all_nodes_sorted]
+    def sweep(find, keys, *args):
+        def run():
+            for key in keys:
+                find(key, *args)
+        return run
+
+    cases = [
+        ("slicing find_node", sweep(_find_node_slicing, ids, all_nodes_sorted)),
+        ("find_node", sweep(find_node, ids, all_nodes_sorted)),
+        ("registry.find", sweep(registry.find, ids)),
+        ("registry.find_name", sweep(registry.find_name, names)),
+    ]
+    print("%-20s %14s %18s" % ("lookup", "us/lookup", "peak bytes/sweep"))
+    for name, fn in cases:
+        us = timed(fn, 2000) / len(ids)
+        peak = allocated(fn, 50)
+        print("%-20s %14.3f %18i" % (name, us, peak))
+
+
+def bench_fortify():
+    '''Reachability checks of one GUI fortify frame (every node against
+    every node): Dijkstra per query vs the component index.'''
+    import random
+    from color import Color
+    from continent import all_nodes
+    from path import path_exists, path_exists_search
+
+    rng = random.Random(0)
+    for node in all_nodes:
+        node.set_owner(rng.choice([Color.RED, Color.BLUE, Color.GREEN, Color.YELLOW]))
+
+    def frame(fn):
+        def run():
+            for node1 in all_nodes:
+                for node2 in all_nodes:
+                    fn(node1, node2)
+        return run
+
+    print("%-20s %14s" % ("reachability", "ms/frame"))
+    print("%-20s %14.3f" % ("path_exists_search", timed(frame(path_exists_search), 20) / 1000))
+    print("%-20s %14.3f" % ("path_exists", timed(frame(path_exists), 20) / 1000))
+
+
+def bench_scale():
+    '''How per-turn queries scale with the map size, on generated maps
+    with 4 players, and how the AI's alpha-beta search does with 2.'''
+    import math
+    import random
+    from color import Color
+    from mapgen import generate_world
+    from path import path_exists
+    from rules import calculate_troops_gained, set_continent_owners, territories
+
+    print("%8s %12s %12s %12s %12s %12s" % (
+        "size", "territories", "cont.owners", "gained", "100 paths",
+        "hit test"))
+    for size in [42, 500, 2000, 5000]:
+        continents, nodes = generate_world(size, max(1, size // 7), 4, seed=size)
+        rng = random.Random(size)
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(100)]
+
+        def paths():
+            # The first query after a conquest pays for rebuilding the index.
+            nodes[0].set_owner(Color.RED if nodes[0].get_owner() != Color.RED else Color.BLUE)
+            for node1, node2 in pairs:
+                path_exists(node1, node2)
+
+        def hit_test():
+            # What the GUI does per node button and frame: a distance check.
+            mouse = (600, 450)
+            for node in nodes:
+                x, y = node.get_location()
+                math.sqrt((x - mouse[0])**2 + (y - mouse[1])**2)
+
+        repeat = max(1, 20000 // size)
+        print("%8i %10.1fus %10.1fus %10.1fus %10.1fus %10.1fus" % (
+            size,
+            timed(lambda: territories(Color.RED, continents), repeat),
+            timed(lambda: set_continent_owners(continents), repeat),
+            timed(lambda: calculate_troops_gained(Color.RED, continents),
+                  repeat),
+            timed(paths, repeat),
+            timed(hit_test, repeat)))
+
+    # The AI's search (as in main.build_state_paths()) between two players.
+    from search import AlphaBeta, SearchBoard, TranspositionTable
+
+    print("%8s %6s %12s %10s" % ("size", "depth", "positions", "ms"))
+    for size in [42, 500, 2000, 5000]:
+        continents, nodes = generate_world(size, max(1, size // 7), 2, seed=size)
+        # Fills the odds tables the search reads.
+        AlphaBeta(SearchBoard.from_nodes(nodes), Color.RED, 1).search(
+            Color.RED, Color.BLUE)
+        for depth in [2, 3]:
+            start = time.perf_counter()
+            search = AlphaBeta(SearchBoard.from_nodes(nodes), Color.RED, depth,
+                               0.9, TranspositionTable())
+            search.search(Color.RED, Color.BLUE)
+            print("%8i %6i %12i %10.1f" % (size, depth, search.nodes,
+                                           (time.perf_counter() - start) * 1000))
+
+
+def bench_search():
+    '''Alpha-beta search speed in searched positions per second: State
+    list copies per child vs make/unmake on one SearchBoard. Both find the
+    same value; move order and so the number of positions may differ.'''
+    from search import AlphaBeta, SearchBoard
+
+    print("%6s %12s %16s %12s %18s" % ("depth", "positions", "copying pos/s",
+                                       "positions", "make/unmake pos/s"))
+    for depth in [2, 3, 4, 5, 6]:
+        positions = [0, 0]
+        copying = 0.0
+        unmake = 0.0
+        for seed in range(5):
+            red, blue, nodes = _search_position(seed)
+            neighbors = {node.get_id(): [n.get_id() for n in node.get_neighbors()]
+                         for node in nodes}
+            tt = [(n.get_id(), n.get_troops()) for n in nodes if n.get_owner() == red.get_color()]
+            ott = [(n.get_id(), n.get_troops()) for n in nodes if n.get_owner() != red.get_color()]
+            stats = [0]
+            start = time.perf_counter()
+            root = State(current_player=red, opponent=blue, likelihood=1,
+                         children=[], trp_terr=tt, opp_trp_terr=ott)
+            expected = _search_copying(root, red.get_color(), 0, depth,
+                                       -float("inf"), float("inf"),
+                                       neighbors, stats)
+            copying += time.perf_counter() - start
+
+            start = time.perf_counter()
+            search = AlphaBeta(SearchBoard.from_nodes(nodes), red.get_color(),
+                               depth)
+            value = search.search(red.get_color(), blue.get_color())
+            unmake += time.perf_counter() - start
+            assert abs(value - expected) < 1e-6 * max(1, abs(expected))
+            positions[0] += stats[0]
+            positions[1] += search.nodes
+        print("%6i %12i %16.0f %12i %18.0f" % (depth, positions[0],
+                                               positions[0] / copying,
+                                               positions[1],
+                                               positions[1] / unmake))
+
+
+def bench_tt():
+    '''Positions searched by alpha-beta with and without a transposition
+    table, and the time taken, summed over five random deals.'''
+    from search import AlphaBeta, SearchBoard, TranspositionTable
+
+    print("%6s %12s %10s %12s %10s %10s %10s" % (
+        "depth", "no table", "ms", "with table", "ms", "saved", "hit rate"))
+    for depth in [3, 4, 5, 6]:
+        counts = [0, 0]
+        times = [0.0, 0.0]
+        probes = hits = 0
+        for seed in range(5):
+            red, blue, nodes = _search_position(seed)
+            values = []
+            for k, table in enumerate([None, TranspositionTable()]):
+                search = AlphaBeta(SearchBoard.from_nodes(nodes),
+                                   red.get_color(), depth, table=table)
+                start = time.perf_counter()
+                values.append(search.search(red.get_color(), blue.get_color()))
+                times[k] += time.perf_counter() - start
+                counts[k] += search.nodes
+            probes += table.probes
+            hits += table.hits
+            assert abs(values[0] - values[1]) < 1e-6 * max(1, abs(values[0]))
+        print("%6i %12i %10.1f %12i %10.1f %9.1f%% %9.1f%%" % (
+            depth, counts[0], times[0] * 1000, counts[1], times[1] * 1000,
+            100 * (1 - counts[1] / counts[0]), 100 * hits / max(1, probes)))
+
+
+def bench_order():
+    '''Alpha-beta with a transposition table: board order vs ordered moves
+    vs ordered moves with principal-variation search, summed over five
+    random deals. "cut" is the fraction of expanded positions cut off,
+    "first" the fraction of cutoffs caused by the first move.'''
+    from search import AlphaBeta, SearchBoard, TranspositionTable
+
+    configs = [("board order", False, False), ("ordered", True, False),
+               ("ordered+pvs", True, True)]
+    print("%6s %-12s %10s %8s %8s %8s %10s" % (
+        "depth", "moves", "positions", "cut", "first", "re-srch", "ms"))
+    for depth in [3, 4, 5, 6]:
+        for name, ordering, pvs in configs:
+            nodes = expanded = cutoffs = first = researches = 0
+            elapsed = 0.0
+            for seed in range(5):
+                red, blue, board_nodes = _search_position(seed)
+                search = AlphaBeta(SearchBoard.from_nodes(board_nodes),
+                                   red.get_color(), depth,
+                                   table=TranspositionTable(), ordering=ordering,
+                                   pvs=pvs)
+                start = time.perf_counter()
+                search.search(red.get_color(), blue.get_color())
+                elapsed += time.perf_counter() - start
+                nodes += search.nodes
+                expanded += search.expanded
+                cutoffs += search.cutoffs
+                first += search.first_cutoffs
+                researches += search.researches
+            print("%6i %-12s %10i %7.1f%% %7.1f%% %8i %10.1f" % (
+                depth, name, nodes, 100 * cutoffs / max(1, expanded),
+                100 * first / max(1, cutoffs), researches, elapsed * 1000))
+
+
+def _search_attacks(make_search, max_attacks=10):
+    '''Returns an attack phase for engine.Game that asks a fresh search
+    from make_search(board, color) for every attack until it has no move
+    (see Game.play_turn()). Counts searched positions in its [nodes]
+    attribute.'''
+    from search import SearchBoard
+
+    def attack(game, player):
+        color = player.get_color()
+        other = [p.get_color() for p in game.get_order() if p is not player][0]
+        conquered = False
+        for _ in range(max_attacks):
+            board = SearchBoard.from_nodes(game.get_nodes())
+            search = make_search(board, color)
+            search.search(color, other)
+            attack.nodes += search.nodes
+            if search.best_move is None:
+                break
+            from_i, to_i = search.best_move
+            conquered = game.attack(game.find(board.ids[from_i]),
+                                    game.find(board.ids[to_i])) or conquered
+        return conquered
+    attack.nodes = 0
+    return attack
+
+
+def bench_expectimax(games=20):
+    '''Two-player games between the threshold alpha-beta search (depth 6)
+    and expectimax (depth 2), swapping colors every game: wins and positions
+    searched per game.'''
+    from color import Color
+    from engine import Game
+    from expectimax import Expectimax
+    from search import AlphaBeta
+
+    engines = {
+        "alpha-beta": lambda board, color: AlphaBeta(board, color, 6),
+        "expectimax": lambda board, color: Expectimax(board, color, 2),
+    }
+    wins = {name: 0 for name in engines}
+    nodes = {name: 0 for name in engines}
+    for seed in range(games):
+        names = list(engines)
+        if seed % 2 == 1:
+            names.reverse()
+        players = dict(zip([Color.RED, Color.BLUE], names))
+        attacks = {color: _search_attacks(engines[name])
+                   for color, name in players.items()}
+        game = Game(colors=[Color.RED, Color.BLUE], seed=seed)
+        winner = game.play(300, attack=lambda game, player:
+                           attacks[player.get_color()](game, player))
+        if winner is not None:
+            wins[players[winner]] += 1
+        for color, name in players.items():
+            nodes[name] += attacks[color].nodes
+    print("%-12s %6s %18s" % ("engine", "wins", "positions/game"))
+    for name in engines:
+        print("%-12s %6i %18.0f" % (name, wins[name], nodes[name] / games))
+    print("%i games, %i unfinished after 300 turns" % (
+        games, games - sum(wins.values())))
+
+
+def bench_mcts(games=10, iterations=100):
+    '''Two-player games between MCTS ([iterations] playouts per attack)
+    and the threshold alpha-beta search (depth 6), swapping colors every
+    game: wins, playouts per second and positions searched per game.'''
+    from color import Color
+    from engine import Game
+    from mcts import attack_phase
+    from search import AlphaBeta
+
+    wins = {"mcts": 0, "alpha-beta": 0}
+    playouts = 0
+    positions = 0
+    elapsed = 0.0
+    for seed in range(games):
+        mcts = attack_phase(iterations)
+        alphabeta = _search_attacks(lambda board, color: AlphaBeta(board, color, 6))
+        colors = [Color.RED, Color.BLUE]
+        if seed % 2 == 1:
+            colors.reverse()
+        engines = {colors[0]: ("mcts", mcts), colors[1]: ("alpha-beta", alphabeta)}
+
+        def attack(game, player):
+            name, phase = engines[player.get_color()]
+            if name != "mcts":
+                return phase(game, player)
+            nonlocal elapsed
+            start = time.perf_counter()
+            res = phase(game, player)
+            elapsed += time.perf_counter() - start
+            return res
+
+        game = Game(colors=[Color.RED, Color.BLUE], seed=seed)
+        winner = game.play(200, attack=attack)
+        if winner is not None:
+            wins[engines[winner][0]] += 1
+        playouts += mcts.iterations
+        positions += alphabeta.nodes
+    print("%-12s %6s" % ("engine", "wins"))
+    for name, count in wins.items():
+        print("%-12s %6i" % (name, count))
+    print("%i games, %i unfinished after 200 turns" % (
+        games, games - sum(wins.values())))
+    print("mcts: %.0f playouts/s, %.0f playouts/game; alpha-beta: %.0f "
+          "positions/game" % (playouts / elapsed, playouts / games,
+                              positions / games))
+
+
+def bench_parallel():
+    '''Root-parallel alpha-beta (depth 6, five random deals) and MCTS (4000
+    playouts) on a process pool: time, speedup over the serial search and
+    parallel efficiency (speedup / workers). Pool start-up is not timed.'''
+    import multiprocessing
+    from continent import continents
+    from mcts import ATTACK, MCTS
+    from parallel import SearchPool
+    from search import AlphaBeta, SearchBoard, TranspositionTable
+
+    def deals():
+        # The position of each deal, restored before every search.
+        for seed in range(5):
+            yield _search_position(seed)
+
+    start = time.perf_counter()
+    for red, blue, nodes in deals():
+        AlphaBeta(SearchBoard.from_nodes(nodes), red.get_color(), 6,
+                  table=TranspositionTable()).search(red.get_color(),
+                                                     blue.get_color())
+    serial_ab = time.perf_counter() - start
+    red, blue, nodes = _search_position(0)
+    start = time.perf_counter()
+    MCTS.from_nodes(nodes, continents, [red.get_color(), blue.get_color()],
+                    ATTACK, 0, seed=0).run(4000)
+    serial_mcts = time.perf_counter() - start
+
+    print("%i CPUs" % multiprocessing.cpu_count())
+    print("%8s %12s %8s %6s %12s %8s %6s" % ("workers", "alpha-beta", "speedup",
+                                            "eff.", "mcts", "speedup", "eff."))
+    print("%8s %11.0fms %8s %6s %11.0fms %8s %6s" % ("serial", serial_ab * 1000,
+                                                    "", "", serial_mcts * 1000,
+                                                    "", ""))
+    for workers in [1, 2, 4, 8, 16]:
+        with SearchPool(nodes, continents, workers) as pool:
+            start = time.perf_counter()
+            for red, blue, nodes in deals():
+                pool.alphabeta(nodes, red.get_color(), blue.get_color(), 6)
+            ab = time.perf_counter() - start
+            red, blue, nodes = _search_position(0)
+            start = time.perf_counter()
+            pool.mcts(nodes, [red.get_color(), blue.get_color()], ATTACK, 0,
+                      4000)
+            tree = time.perf_counter() - start
+        print("%8i %11.0fms %7.2fx %5.0f%% %11.0fms %7.2fx %5.0f%%" % (
+            workers, ab * 1000, serial_ab / ab, 100 * serial_ab / ab / workers,
+            tree * 1000, serial_mcts / tree,
+            100 * serial_mcts / tree / workers))
+
+
+def bench_tree():
+    '''Memory of the alpha-beta tree recorded for the AI, measured with
+    tracemalloc, summed over five random deals: the nodes kept (root
+    children and principal variation) and the bytes they hold, and the peak
+    bytes allocated during the search, for State objects and for the array
+    arena of statetree.StateTree.'''
+    from search import AlphaBeta, SearchBoard
+    from statetree import StateTree
+
+    def recorded(make_root):
+        # Returns the bytes held by the tree recorded from make_root(), the
+        # peak bytes allocated while searching and the positions searched.
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        root = make_root()
+        search = AlphaBeta(SearchBoard.from_nodes(nodes), red.get_color(),
+                           depth)
+        search.search(red.get_color(), blue.get_color(), 0, state=root)
+        searched = search.nodes
+        del search
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size - base, peak - base, searched
+
+    print("%6s %10s %8s %12s %12s %12s %12s" % (
+        "depth", "positions", "kept", "State bytes", "State peak",
+        "arena bytes", "arena peak"))
+    for depth in [3, 4, 5, 6]:
+        positions = 0
+        kept = 0
+        sizes = [0, 0, 0, 0]
+        for seed in range(5):
+            red, blue, nodes = _search_position(seed)
+            # Fills the caches of the search (e.g. win probabilities) first.
+            recorded(lambda: None)
+            size, peak, searched = recorded(lambda: State(current_player=red,
+                                                opponent=blue, likelihood=1))
+            sizes[0] += size
+            sizes[1] += peak
+            positions += searched
+            tree = StateTree()
+            size, peak, _ = recorded(lambda: tree.reset(red, blue, [], []))
+            sizes[2] += size
+            sizes[3] += peak
+            kept += len(tree)
+        print("%6i %10i %8i %12i %12i %12i %12i" % (
+            depth, positions, kept, sizes[0], sizes[1], sizes[2],
+            sizes[3]))
+
+
+def bench_reuse(plies=20, depth=6):
+    '''Two players taking turns attacking once, [plies] attacks on each of
+    five random deals, both searching to depth [depth] before every attack:
+    positions searched and time when the tree and table start afresh for
+    every search (as the AI did before) vs when the tree is re-rooted onto
+    the searched child whenever the attack went as searched
+    (StateTree.follow()) and the search deepens from the values kept in the
+    table.'''
+    import random
+    from sampler import sample_blitz
+    from search import AlphaBeta, SearchBoard, TranspositionTable
+    from statetree import StateTree
+
+    def lists(board, color):
+        return [(t_id, board.troops[i]) for i, t_id in enumerate(board.ids)
+                if board.owners[i] == color]
+
+    def play(reuse):
+        played = searches = positions = 0
+        start = time.perf_counter()
+        for seed in range(5):
+            red, blue, nodes = _search_position(seed)
+            board = SearchBoard.from_nodes(nodes)
+            dice = random.Random(seed)
+            table = TranspositionTable()
+            tree = StateTree()
+            players = [red, blue]
+            root = tree.reset(red, blue, lists(board, red.get_color()),
+                              lists(board, blue.get_color()),
+                              key=board.key(red.get_color()))
+            for ply in range(plies):
+                player = players[ply % 2]
+                opp = players[1 - ply % 2]
+                if not reuse:
+                    table = TranspositionTable()
+                table.new_search()
+                root.set_children([])
+                search = AlphaBeta(board, red.get_color(), depth, table=table)
+                search.search(player.get_color(), opp.get_color(), 0,
+                              state=root)
+                searches += 1
+                positions += search.nodes
+                if len(root.get_children()) == 0:
+                    break
+                # The best child for the player to move, ties to the first.
+                sign = 1 if player is red else -1
+                chosen = None
+                for child in root.get_children():
+                    if (chosen is None
+                            or sign * child.get_h() > sign * chosen.get_h()):
+                        chosen = child
+                from_i, to_i = (board.index[t_id] for t_id in chosen.get_move())
+                attack_left, defense_left = sample_blitz(
+                    board.troops[from_i], board.troops[to_i], dice)
+                board.make_blitz(from_i, to_i, attack_left, defense_left)
+                played += 1
+                key = board.key(opp.get_color())
+                trp_terr = lists(board, opp.get_color())
+                opp_trp_terr = lists(board, player.get_color())
+                root = None
+                if reuse:
+                    root = tree.follow(chosen.get_move(), key, trp_terr,
+                                       opp_trp_terr)
+                if root is None:
+                    root = tree.reset(opp, player, trp_terr, opp_trp_terr,
+                                      key=key)
+        return played, searches, positions, time.perf_counter() - start
+
+    print("%8s %8s %10s %12s %10s" % ("tree", "attacks", "searches",
+                                      "positions", "ms"))
+    for name, reuse in [("fresh", False), ("re-root", True)]:
+        played, searches, positions, elapsed = play(reuse)
+        print("%8s %8i %10i %12i %10.0f" % (name, played, searches, positions,
+                                             elapsed * 1000))
+
+
+def bench_multiplayer(threshold=0.6):
+    '''Paranoid alpha-beta (with a table) vs max^n without and with shallow
+    pruning on 4- and 6-player deals, attacks above [threshold]: positions
+    searched and time, summed over five random deals.'''
+    from continent import all_nodes_sorted
+    from mapgen import deal
+    from multiplayer import MaxN, Paranoid
+    from search import SearchBoard, TranspositionTable
+
+    searches = {
+        "paranoid": lambda board, colors, depth: Paranoid(
+            board, colors, colors[0], depth, threshold, TranspositionTable()),
+        "max^n": lambda board, colors, depth: MaxN(
+            board, colors, depth, threshold, shallow=False),
+        "shallow": lambda board, colors, depth: MaxN(
+            board, colors, depth, threshold),
+    }
+    print("%8s %6s" % ("players", "depth") + "".join(
+        "%12s %8s" % (name, "ms") for name in searches))
+    for players in [4, 6]:
+        for depth in [2, 3, 4]:
+            counts = {name: 0 for name in searches}
+            times = {name: 0.0 for name in searches}
+            for seed in range(5):
+                colors = deal(all_nodes_sorted, players, 9, seed)
+                moves = []
+                for name, make_search in searches.items():
+                    search = make_search(SearchBoard.from_nodes(all_nodes_sorted),
+                                         colors, depth)
+                    start = time.perf_counter()
+                    search.search(colors[0], colors[1])
+                    times[name] += time.perf_counter() - start
+                    counts[name] += search.nodes
+                    moves.append(search.best_move)
+                # Shallow pruning never changes the choice.
+                assert moves[1] == moves[2]
+            print("%8i %6i" % (players, depth) + "".join(
+                "%12i %8.1f" % (counts[name], times[name] * 1000)
+                for name in searches))
+
+
+def bench_eval():
+    '''Evaluation speed in leaves per second, one position at a time vs in
+    batches of positions after a move, and alpha-beta with each evaluator
+    (batched where it can be): positions searched and time, summed over
+    five random deals.'''
+    from continent import continents
+    from evaluation import EVALUATORS, make_evaluator
+    from search import AlphaBeta, SearchBoard
+
+    red, blue, nodes = _search_position(0)
+    board = SearchBoard.from_nodes(nodes)
+    moves = board.attack_moves(red.get_color(), 0.0)
+    print("%8s %6s %14s %14s" % ("features", "batch", "single leaf/s",
+                                 "batch leaf/s"))
+    for name in ["fast", "full"]:
+        evaluator = make_evaluator(name, board, continents)
+        for size in [1, 8, 64, 512]:
+            batch = (moves * (size // len(moves) + 1))[:size]
+
+            def single():
+                for from_i, to_i, _ in batch:
+                    board.make_attack(from_i, to_i)
+                    evaluator.evaluate(board, red.get_color())
+                    board.unmake()
+            repeat = max(1, 512 // size)
+            single_time = timed(single, repeat)
+            batch_time = timed(lambda: evaluator.evaluate_moves(
+                board, batch, red.get_color()), repeat)
+            print("%8s %6i %14.0f %14.0f" % (name, size,
+                                             size * 1e6 / single_time,
+                                             size * 1e6 / batch_time))
+
+    print("%6s" % "depth" + "".join("%12s %8s" % (name, "ms")
+                                    for name in EVALUATORS))
+    for depth in [4, 5, 6]:
+        counts = {name: 0 for name in EVALUATORS}
+        times = {name: 0.0 for name in EVALUATORS}
+        for seed in range(5):
+            red, blue, nodes = _search_position(seed)
+            for name in EVALUATORS:
+                board = SearchBoard.from_nodes(nodes)
+                search = AlphaBeta(board, red.get_color(), depth,
+                                   evaluator=make_evaluator(name, board,
+                                                            continents))
+                start = time.perf_counter()
+                search.search(red.get_color(), blue.get_color())
+                times[name] += time.perf_counter() - start
+                counts[name] += search.nodes
+        print("%6i" % depth + "".join(
+            "%12i %8.1f" % (counts[name], times[name] * 1000)
+            for name in EVALUATORS))
+
+
+BENCHMARKS = {
+    "lookup": bench_lookup,
+    "fortify": bench_fortify,
+    "scale": bench_scale,
+    "search": bench_search,
+    "tt": bench_tt,
+    "order": bench_order,
+    "expectimax": bench_expectimax,
+    "mcts": bench_mcts,
+    "parallel": bench_parallel,
+    "tree": bench_tree,
+    "reuse": bench_reuse,
+    "multiplayer": bench_multiplayer,
+    "eval": bench_eval,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print("== %s ==" % name)
+        BENCHMARKS[name]()
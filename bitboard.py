@@ -0,0 +1,18 @@
+# Sets of territories as bitboards: bit i of a Python int is set if
+# territory i is in the set. Ints have no size limit, so maps bigger than
+# 64 territories work too. Union, intersection and "contains all of" tests
+# are a single integer operation whatever the size of the set.
+
+
+def mask_of(indices):
+    '''Returns the bitboard of [indices] (iterable of ints).'''
+    mask = 0
+    for i in indices:
+        mask |= 1 << int(i)
+    return mask
+
+
+def popcount(mask):
+    '''Returns the number of territories in [mask].'''
+    return bin(mask).count("1")
+
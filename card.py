@@ -1,8 +1,6 @@
-import operator
-import random
-
 from troop import Troop
 from continent import *
+from rng import global_random
 
 
 class Card:
@@ -46,6 +44,40 @@ class Card:
         return -1
 
 
+def card_index(territory, card_lst):
+    '''
+    Uses binary search to find where the card with given territory is, or
+        would go, in the given Card list, without copying it.
+    Returns the index of the first card whose territory name is not less
+        than the name of [territory] (wildcards count as greater than every
+        territory).
+
+    Preconditions: [territory] is a Node; [card_lst] is a list of Card objects
+        that are sorted by territory name in an increasing order with no
+        duplicates, followed by the wildcards. [card_lst] can be empty.
+    '''
+    name = territory.get_name()
+    lo = 0
+    hi = len(card_lst)
+    while lo < hi:
+        i = (lo + hi) // 2
+        curr_terr = card_lst[i].get_node()
+        if curr_terr == None or curr_terr.get_name() >= name:
+            hi = i
+        else:
+            lo = i + 1
+    return lo
+
+
+def _holds(card_lst, i, territory):
+    '''Returns True if the card at index [i] of [card_lst] is the card of
+    [territory] (a Node, looked up by name).'''
+    if i == len(card_lst):
+        return False
+    curr_terr = card_lst[i].get_node()
+    return curr_terr != None and curr_terr.get_name() == territory.get_name()
+
+
 def add_card(card, card_lst):
     '''
     Uses binary search to add the given Card object to the given Card list.
@@ -56,21 +88,14 @@ def add_card(card, card_lst):
         that are sorted by territory name in an increasing order with no
         duplicates. [card_lst] can be empty.
     '''
-    if len(card_lst) == 0:
-        return [card]
-
     # Wildcard automatically goes to the end.
     if card.get_troop_type() == Troop.WILDCARD:
         return card_lst + [card]
 
-    i = len(card_lst) // 2
-    curr_terr = card_lst[i].get_node()
-    given_terr = card.get_node()
-    if curr_terr == None or curr_terr.get_name() > given_terr.get_name():
-        return add_card(card, card_lst[:i]) + card_lst[i:]
-    elif curr_terr.get_name() < given_terr.get_name():
-        return card_lst[:i+1] + add_card(card, card_lst[i+1:])
-    raise ValueError("Card already in the card list!")
+    i = card_index(card.get_node(), card_lst)
+    if _holds(card_lst, i, card.get_node()):
+        raise ValueError("Card already in the card list!")
+    return card_lst[:i] + [card] + card_lst[i:]
 
 
 def remove_card(territory, card_lst):
@@ -84,119 +109,84 @@ def remove_card(territory, card_lst):
         that are sorted by territory name in an increasing order with no
         duplicates. [card_lst] can be empty.
     '''
-
-    if len(card_lst) == 0:
-        raise ValueError("Card not found in the card list!")
-    # If looking for a wildcard, remove ONE wildcar from the end of [card_lst].
-    elif territory == None:
-        if card_lst[-1].get_troop_type() == Troop.WILDCARD:
+    # If looking for a wildcard, remove ONE wildcard from the end of [card_lst].
+    if territory == None:
+        if len(card_lst) > 0 and card_lst[-1].get_troop_type() == Troop.WILDCARD:
             return card_lst[:-1]
-        else:
-            raise ValueError("Card not found in the card list!")
-
-    i = len(card_lst) // 2
-    curr_terr = card_lst[i].get_node()
+        raise ValueError("Card not found in the card list!")
 
-    if curr_terr == None or curr_terr.get_name() > territory.get_name():
-        return remove_card(territory, card_lst[:i]) + card_lst[i:]
-    elif curr_terr.get_name() < territory.get_name():
-        return card_lst[:i+1] + remove_card(territory, card_lst[i+1:])
+    i = card_index(territory, card_lst)
+    if not _holds(card_lst, i, territory):
+        raise ValueError("Card not found in the card list!")
     return card_lst[:i] + card_lst[i+1:]
 
 
 def find_card(territory, card_lst):
     '''
     Uses binary search to find the card with given territory in the given
-        Card list.
+        Card list, without copying it.
     Returns a Card object. If the card is not in [card_lst], returns None.
 
     Preconditions: [territory] is a Node; [card_lst] is a list of Card objects
         that are sorted by territory name in an increasing order with no
         duplicates. [card_lst] can be empty.
     '''
-
-    if len(card_lst) == 0:
-        return None
     # If looking for a wildcard, look at the very end of [card_lst].
-    elif territory == None:
-        if card_lst[-1].get_troop_type() == Troop.WILDCARD:
+    if territory == None:
+        if len(card_lst) > 0 and card_lst[-1].get_troop_type() == Troop.WILDCARD:
             return card_lst[-1]
-        else:
-            return None
+        return None
+
+    i = card_index(territory, card_lst)
+    if _holds(card_lst, i, territory):
+        return card_lst[i]
+    return None
+
 
-    i = len(card_lst) // 2
-    curr_terr = card_lst[i].get_node()
-    if curr_terr == None or curr_terr.get_name() > territory.get_name():
-        return find_card(territory, card_lst[:i])
-    elif curr_terr.get_name() < territory.get_name():
-        return find_card(territory, card_lst[i+1:])
-    return card_lst[i], i
-
-
-# Initialize all cards.
-card_bindings = {
-    "Afghanistan": Troop.CAVALRY,
-    "Alaska": Troop.INFANTRY,
-    "Alberta": Troop.CAVALRY,
-    "Argentina": Troop.INFANTRY,
-    "Brazil": Troop.ARTILLERY,
-    "Central America": Troop.ARTILLERY,
-    "China": Troop.INFANTRY,
-    "Congo": Troop.INFANTRY,
-    "East Africa": Troop.INFANTRY,
-    "Eastern Australia": Troop.ARTILLERY,
-    "Eastern United States": Troop.ARTILLERY,
-    "Egypt": Troop.INFANTRY,
-    "Great Britain": Troop.ARTILLERY,
-    "Greenland": Troop.CAVALRY,
-    "Iceland": Troop.INFANTRY,
-    "India": Troop.CAVALRY,
-    "Indonesia": Troop.ARTILLERY,
-    "Irkutsk": Troop.CAVALRY,
-    "Japan": Troop.ARTILLERY,
-    "Kamchatka": Troop.INFANTRY,
-    "Madagascar": Troop.CAVALRY,
-    "Middle East": Troop.INFANTRY,
-    "Mongolia": Troop.INFANTRY,
-    "New Guinea": Troop.INFANTRY,
-    "North Africa": Troop.CAVALRY,
-    "Northern Europe": Troop.ARTILLERY,
-    "Northwest Territory": Troop.ARTILLERY,
-    "Ontario": Troop.CAVALRY,
-    "Peru": Troop.INFANTRY,
-    "Quebec": Troop.CAVALRY,
-    "Russia": Troop.CAVALRY,
-    "Scandinavia": Troop.CAVALRY,
-    "Siam": Troop.INFANTRY,
-    "Siberia": Troop.CAVALRY,
-    "South Africa": Troop.ARTILLERY,
-    "Southern Europe": Troop.ARTILLERY,
-    "Ural": Troop.CAVALRY,
-    "Venezuela": Troop.INFANTRY,
-    "Western Australia": Troop.ARTILLERY,
-    "Western Europe": Troop.ARTILLERY,
-    "Western United States": Troop.ARTILLERY,
-    "Yakutsk": Troop.CAVALRY
-}
-
-# Sort all nodes alphabetically.
-all_nodes_alphabetical = sorted(all_nodes, key=operator.attrgetter('name'))
-all_cards_sorted = []
-
-# Add territory cards according to bindings.
-i = 0
-for key in card_bindings:
-    node = all_nodes_alphabetical[i]
-    assert node.get_name() == key, "Problem with assigning Card values: %s vs %s." % (
-        node.get_name(), key)
-
-    all_cards_sorted.append(Card(card_bindings[key], node))
-    i += 1
-
-# Add wildcards.
 total_wildcards = 2
-for _ in range(total_wildcards):
-    all_cards_sorted.append(Card(Troop.WILDCARD, None))
 
-all_cards = all_cards_sorted.copy()
-random.shuffle(all_cards)
+
+def card_bindings_of(compiled):
+    '''Returns a dictionary mapping territory names to Troop types, as given
+    by the compiled map [compiled] (see mapdata.py).'''
+    res = {}
+    for name, troop_name in zip(compiled["names"], compiled["cards"]):
+        if troop_name is not None:
+            res[name] = Troop[troop_name]
+    return res
+
+
+def make_cards(registry, bindings):
+    '''Returns a list with a card for every territory in [bindings] (see
+    card_bindings_of()), sorted by territory name, followed by the
+    wildcards. Territories are looked up in [registry].'''
+    res = []
+    assert len(bindings) == len(registry), "Card bindings don't cover the map!"
+    for key in sorted(bindings):
+        node = registry.find_name(key)
+        assert node is not None, "Problem with assigning Card values: no %s." % key
+
+        res.append(Card(bindings[key], node))
+
+    # Add wildcards.
+    for _ in range(total_wildcards):
+        res.append(Card(Troop.WILDCARD, None))
+    return res
+
+
+def shuffled_deck(rng=None, cards=None):
+    '''Returns a shuffled copy of [cards] (all cards of the classic map if
+    None), using the GameRandom stream [rng] (the global one if None).'''
+    if rng is None:
+        rng = global_random
+    if cards is None:
+        cards = all_cards_sorted
+    deck = cards.copy()
+    rng.shuffle(deck)
+    return deck
+
+
+# Initialize all cards. Troop types come from the map file.
+card_bindings = card_bindings_of(classic_map)
+all_cards_sorted = make_cards(registry, card_bindings)
+all_cards = shuffled_deck()
@@ -16,3 +16,9 @@ class Color(Enum):
 
     # def __str__(self):
     #     return self.value + self.name + Color.ENDC.value
+
+
+# Colors as small integers (their position in Color), for the arrays of the
+# search and the evaluation and for the Zobrist keys. COLORS maps them back.
+COLOR_CODES = {color: code for code, color in enumerate(Color)}
+COLORS = tuple(Color)
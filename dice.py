@@ -0,0 +1,76 @@
+from fractions import Fraction
+from itertools import product
+
+
+# Per-roll loss distributions derived from the rules of roll.roll(): both
+# sides sort their dice, the highest dice are compared pairwise, and ties go
+# to the defender. Enumerating every throw gives exact probabilities for any
+# number of dice and any die size, so house rules need no hand-typed tables.
+
+# (dice_attack, dice_defend, sides, exact) -> list of ((a_lost, d_lost), p).
+_loss_cache = {}
+
+
+def loss_distribution(dice_attack, dice_defend, sides=6, exact=False):
+    '''
+    Enumerates all [sides]^([dice_attack]+[dice_defend]) throws of a single
+    roll.
+    Returns a list of ((attacker losses, defender losses), probability) sorted
+        by attacker losses. Probabilities are Fraction objects if [exact] is
+        True and floats otherwise.
+
+    Preconditions: [dice_attack], [dice_defend] and [sides] are positive
+    integers.
+    '''
+    key = (dice_attack, dice_defend, sides, exact)
+    if key in _loss_cache:
+        return _loss_cache[key]
+    assert dice_attack >= 1 and dice_defend >= 1 and sides >= 1
+
+    compared = min(dice_attack, dice_defend)
+    counts = [0] * (compared + 1)
+    for dice in product(range(1, sides+1), repeat=dice_attack + dice_defend):
+        attack_rolls = sorted(dice[:dice_attack], reverse=True)
+        defend_rolls = sorted(dice[dice_attack:], reverse=True)
+        attack_lost = 0
+        for i in range(compared):
+            if attack_rolls[i] <= defend_rolls[i]:
+                attack_lost += 1
+        counts[attack_lost] += 1
+
+    total = sides ** (dice_attack + dice_defend)
+    res = []
+    for attack_lost in range(compared + 1):
+        if counts[attack_lost] == 0:
+            continue
+        p = Fraction(counts[attack_lost], total)
+        if not exact:
+            p = float(p)
+        res.append(((attack_lost, compared - attack_lost), p))
+    _loss_cache[key] = res
+    return res
+
+
+def outcome_cube(max_dice_attack=3, max_dice_defend=2, sides=6, exact=False):
+    '''
+    Builds the table of single-roll outcomes for every combination of dice.
+    Returns a nested list [cube] such that cube[dd-1][da-1][k] is the
+        probability that, with [da] attacking dice and [dd] defending dice,
+        the attacker loses [k] troops (and the defender loses the other
+        min(da, dd) - k). Entries for impossible [k] are 0.
+
+    Example for house rules with 3 defending dice and 8-sided dice:
+        outcome_cube(max_dice_defend=3, sides=8).
+    '''
+    zero = Fraction(0) if exact else 0.0
+    max_compared = min(max_dice_attack, max_dice_defend)
+    cube = []
+    for dd in range(1, max_dice_defend+1):
+        row = []
+        for da in range(1, max_dice_attack+1):
+            probs = [zero] * (max_compared + 1)
+            for (attack_lost, _), p in loss_distribution(da, dd, sides, exact):
+                probs[attack_lost] = p
+            row.append(probs)
+        cube.append(row)
+    return cube
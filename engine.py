@@ -0,0 +1,185 @@
+from card import card_bindings_of, make_cards, shuffled_deck
+from color import Color
+from continent import build_world
+from mapdata import CLASSIC_MAP, load_compiled
+from node import Registry
+from player import Player
+from rng import GameRandom
+from roll import blitz
+from rules import (apply_blitz, calculate_troops_gained, check_attack,
+                   claim_territories, initialize_troops, remove_defeated,
+                   set_continent_owners, territories)
+from sampler import sample_blitz
+
+
+class Game():
+
+    def __init__(self, colors=(Color.RED, Color.BLUE, Color.GREEN, Color.YELLOW),
+                 initial_troops=30, map_path=CLASSIC_MAP, seed=None,
+                 quiet=True, fast_combat=True, rng=None):
+        ''' Initiates a self-contained game: its own nodes, continents, deck,
+        players and random stream, so any number of games can live in one
+        process. [colors] are the players' colors; [initial_troops] is the
+        number of troops each player starts with. [rng] is a GameRandom
+        stream; if None, one is created from [seed] and [quiet]. If
+        [fast_combat] is True, blitz results are drawn from the exact outcome
+        tables instead of rolling every die.'''
+        self.rng = rng if rng is not None else GameRandom(seed, quiet)
+        self.compiled = load_compiled(map_path)
+        self.colors = list(colors)
+        self.initial_troops = initial_troops
+        self.fast_combat = fast_combat
+        self.reset()
+
+    def reset(self):
+        '''Puts the game back to an empty board, with a fresh deck and
+        players in a new random order.'''
+        self.continents, self.nodes = build_world(self.compiled)
+        self.registry = Registry(self.nodes)
+        cards = make_cards(self.registry, card_bindings_of(self.compiled))
+        self.deck = shuffled_deck(self.rng, cards)
+        self.players = [Player(color, self.initial_troops, [], [])
+                        for color in self.colors]
+        self.order = self.players.copy()
+        self.rng.shuffle(self.order)
+        self.turn = 0
+
+    def setup(self):
+        '''Claims all territories and places the initial troops at random.'''
+        claim_order = self.nodes.copy()
+        self.rng.shuffle(claim_order)
+        claim_territories(self.order, claim_order.copy())
+        initialize_troops(self.order, claim_order, self.rng)
+        set_continent_owners(self.continents)
+
+    def get_nodes(self):
+        return self.nodes
+
+    def get_continents(self):
+        return self.continents
+
+    def get_order(self):
+        return self.order
+
+    def find(self, id):
+        '''Returns the node with given [id], or None.'''
+        return self.registry.find(id)
+
+    def territories(self, color):
+        return territories(color, self.continents)
+
+    def troops_gained(self, player):
+        # Continent owners are kept up to date by the registry (see
+        # node.Registry.moved()).
+        troops_gained, _, _ = calculate_troops_gained(player.get_color(),
+                                                      self.continents)
+        return troops_gained
+
+    def attack(self, from_node, to_node):
+        '''Conducts a blitz attack between the two nodes; on success all
+        troops but one move in and the attacker draws a card at the end of
+        the turn (see play_turn()).
+        Returns a boolean representing whether attack was successful or not.
+
+        Preconditions: from_node.get_troops() > 1 and to_node.get_troops() > 0;
+            the nodes have two different owners.'''
+        if self.fast_combat:
+            blitz_res = sample_blitz(from_node.get_troops(),
+                                     to_node.get_troops(), self.rng)
+        else:
+            blitz_res = blitz(from_node.get_troops(), to_node.get_troops(),
+                              self.rng)
+        return apply_blitz(from_node, to_node, blitz_res)
+
+    def use_cards(self, player, hand):
+        '''Trades in [hand] (a valid 3-card combination from
+        player.decide()), puts the cards back into the deck at random places
+        and deploys the territorial bonus.
+        Returns the card bonus (troops still to be deployed).'''
+        card_bonus, _ = player.count_bonus(hand, False)
+        for card in hand:
+            node = card.get_node()
+            if node is not None and node.get_owner() == player.get_color():
+                node.add_troops(2)
+            player.take_card(node)
+            self.deck.insert(self.rng.randint(0, len(self.deck)), card)
+        return card_bonus
+
+    def random_deploy(self, player, troops):
+        owned = self.territories(player.get_color())
+        for _ in range(troops):
+            self.rng.choice(owned).add_troops(1)
+
+    def random_attacks(self, player, max_attacks=20):
+        '''Attacks at random, only from territories with more troops than the
+        defender, until there is no such attack or [max_attacks] were made.
+        Returns True if at least one territory was conquered.'''
+        color = player.get_color()
+        conquered = False
+        for _ in range(max_attacks):
+            options = []
+            for node in self.territories(color):
+                if node.get_troops() > 1:
+                    for neighbor in node.attack_options():
+                        if node.get_troops() > neighbor.get_troops():
+                            options.append((node, neighbor))
+            if len(options) == 0:
+                break
+            from_node, to_node = self.rng.choice(options)
+            conquered = self.attack(from_node, to_node) or conquered
+        return conquered
+
+    def play_turn(self, deploy=None, attack=None):
+        '''
+        Plays the turn of the next player in [order]: reinforcements (cards
+        are traded in when the player holds more than 4), [deploy], [attack]
+        and a card for a conquest. [deploy](game, player, troops) and
+        [attack](game, player) default to random play; [attack] returns True
+        if a territory was conquered.
+        Returns the player who moved.
+        '''
+        if deploy is None:
+            deploy = Game.random_deploy
+        if attack is None:
+            attack = Game.random_attacks
+        player = self.order.pop(0)
+        self.order.append(player)
+
+        troops = self.troops_gained(player)
+        if len(player.get_cards()) > 4:
+            troops += self.use_cards(player, player.decide())
+        deploy(self, player, troops)
+
+        if check_attack(player.get_color(), self.continents):
+            if attack(self, player) and len(self.deck) > 0:
+                player.give_card(self.deck.pop(0))
+
+        self.order = remove_defeated(self.order, self.continents, self.rng)
+        self.turn += 1
+        return player
+
+    def winner(self):
+        '''Returns the color of the last remaining player, or None.'''
+        if len(self.order) == 1:
+            return self.order[0].get_color()
+        return None
+
+    def play(self, max_turns=1000, deploy=None, attack=None):
+        '''Sets up the board and plays until one player is left or after
+        [max_turns] turns.
+        Returns the color of the winner, or None.'''
+        self.setup()
+        while self.winner() is None and self.turn < max_turns:
+            self.play_turn(deploy, attack)
+        return self.winner()
+
+
+def run_games(n, seed=0, **kwargs):
+    '''Plays [n] independent quiet games with streams derived from [seed]
+    (see GameRandom.streams()), e.g. as the body of a worker process.
+    [kwargs] are passed on to Game.
+    Returns the list of winners' colors (None for unfinished games).'''
+    res = []
+    for rng in GameRandom.streams(seed, n):
+        res.append(Game(rng=rng, **kwargs).play())
+    return res
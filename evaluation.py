@@ -0,0 +1,179 @@
+from functools import partial
+
+import numpy as np
+
+from color import COLOR_CODES
+from search import board_continents
+
+
+# Position evaluation for the AI. A position is described by a vector of
+# features of the AI's color, computed with a few NumPy operations over the
+# owner and troop arrays (see board_arrays()), and scored with a weight
+# per feature. Positions are evaluated in batches: owners and troops of
+# shape (positions, territories), one row per position, so a search can
+# score all the leaves below a node at once.
+
+FEATURES = ("troops", "border_pressure", "continent_completion",
+            "reinforcements", "components")
+
+# Roughly in troops: reinforcements come every turn, continents are worth
+# their bonus once held, and troops facing enemy armies or cut off from the
+# rest are worth less.
+DEFAULT_WEIGHTS = {
+    "troops": 1.0,
+    "border_pressure": -0.1,
+    "continent_completion": 1.0,
+    "reinforcements": 2.0,
+    "components": -2.0,
+}
+
+
+class TroopEvaluator():
+
+    # Scored one position at a time (see FeatureEvaluator.batched).
+    batched = False
+
+    def __init__(self, neighbors=None, continents=None):
+        ''' The plain evaluation: the troops of the AI, in O(1) from the
+        counts a SearchBoard keeps. The arguments are only there to match
+        FeatureEvaluator.'''
+
+    def evaluate(self, board, color):
+        '''Returns the value of [board] (SearchBoard) for [color].'''
+        return board.total_troops(color)
+
+
+class FeatureEvaluator():
+
+    # Leaves are better scored in batches (see search.AlphaBeta).
+    batched = True
+
+    def __init__(self, neighbors, continents, features=FEATURES, weights=None):
+        '''
+        Initiates an evaluator for the map with [neighbors] (list of lists
+        of territory indices) and [continents] (list of (bonus, territory
+        indices), see search.board_continents()), scoring [features] (names
+        from FEATURES) with [weights] (name: weight, DEFAULT_WEIGHTS for the
+        ones not given). Raises ValueError if a feature is unknown.
+        '''
+        n = len(neighbors)
+        for name in features:
+            if name not in FEATURES:
+                raise ValueError("Unknown feature: %s" % name)
+        self.features = tuple(features)
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.weights = np.array([weights[name] for name in self.features])
+        self.adjacency = np.zeros((n, n))
+        for i, neighbor_lst in enumerate(neighbors):
+            self.adjacency[i, neighbor_lst] = 1.0
+        # Neighbor lists padded with index n, a territory nobody owns.
+        degree = max(len(neighbor_lst) for neighbor_lst in neighbors)
+        self.padded = np.full((n, degree), n)
+        for i, neighbor_lst in enumerate(neighbors):
+            self.padded[i, :len(neighbor_lst)] = neighbor_lst
+        self.members = np.zeros((n, len(continents)))
+        for k, (_, indices) in enumerate(continents):
+            self.members[indices, k] = 1.0
+        self.sizes = self.members.sum(0)
+        self.bonuses = np.array([float(bonus) for bonus, _ in continents])
+
+    def components(self, own):
+        '''Returns the number of connected groups of territories in each row
+        of [own] (bool array of shape (positions, territories)), by
+        spreading the smallest index through every group.'''
+        n = own.shape[1]
+        index = np.arange(n)
+        labels = np.where(own, index, n)
+        while True:
+            padded = np.concatenate(
+                [labels, np.full((len(labels), 1), n)], axis=1)
+            spread = np.minimum(labels, padded[:, self.padded].min(axis=2))
+            spread = np.where(own, spread, n)
+            if np.array_equal(spread, labels):
+                break
+            labels = spread
+        return (own & (labels == index)).sum(axis=1)
+
+    def feature_vectors(self, owners, troops, color):
+        '''
+        Returns the features of [color] (Color object) for a batch of
+        positions as an array of shape (positions, features), in the order
+        of [features]. [owners] (color codes of color.COLOR_CODES) and
+        [troops] have shape (positions, territories).
+        '''
+        own = owners == COLOR_CODES[color]
+        troops = np.maximum(troops, 0)
+        own_troops = np.where(own, troops, 0)
+        columns = []
+        for name in self.features:
+            if name == "troops":
+                columns.append(own_troops.sum(axis=1))
+            elif name == "border_pressure":
+                # Enemy troops next to each territory, beyond its own.
+                facing = np.where(own, 0, troops) @ self.adjacency
+                excess = np.maximum(facing - own_troops, 0)
+                columns.append(np.where(own, excess, 0).sum(axis=1))
+            elif name == "continent_completion":
+                share = (own @ self.members) / self.sizes
+                columns.append((share ** 2) @ self.bonuses)
+            elif name == "reinforcements":
+                held = (own @ self.members) == self.sizes
+                territories = own.sum(axis=1)
+                columns.append(np.maximum(territories // 3, 3) +
+                               held @ self.bonuses)
+            elif name == "components":
+                columns.append(self.components(own))
+        return np.stack(columns, axis=1).astype(float)
+
+    def evaluate_batch(self, owners, troops, color):
+        '''Returns the values of a batch of positions (see
+        feature_vectors()) for [color] as an array.'''
+        return self.feature_vectors(owners, troops, color) @ self.weights
+
+    def evaluate(self, board, color):
+        '''Returns the value of [board] (SearchBoard) for [color].'''
+        owners, troops = board_arrays(board)
+        return float(self.evaluate_batch(owners[None], troops[None], color)[0])
+
+    def evaluate_moves(self, board, moves, color):
+        '''Returns the values for [color] of the positions after each of
+        [moves] ((from index, to index, probability), assumed to succeed as
+        in SearchBoard.make_attack()) on [board] (SearchBoard), as an
+        array.'''
+        owners, troops = board_arrays(board)
+        rows = np.arange(len(moves))
+        from_i = np.array([move[0] for move in moves])
+        to_i = np.array([move[1] for move in moves])
+        owners = np.tile(owners, (len(moves), 1))
+        troops = np.tile(troops, (len(moves), 1))
+        owners[rows, to_i] = owners[rows, from_i]
+        troops[rows, to_i] = troops[rows, from_i] - 1
+        troops[rows, from_i] = 1
+        return self.evaluate_batch(owners, troops, color)
+
+
+def board_arrays(board):
+    '''Returns the owners (color codes) and troops of [board] (SearchBoard)
+    as NumPy arrays.'''
+    owners = np.array([COLOR_CODES[owner] for owner in board.owners],
+                      dtype=np.int8)
+    return owners, np.array(board.troops, dtype=np.int32)
+
+
+# Evaluators by name, from the most accurate to the fastest; each is called
+# with the neighbors and continents of the map. "fast"
+# leaves out the component count, the one feature that takes a loop.
+EVALUATORS = {
+    "full": FeatureEvaluator,
+    "fast": partial(FeatureEvaluator, features=FEATURES[:-1]),
+    "troops": TroopEvaluator,
+}
+
+
+def make_evaluator(name, board, continents):
+    '''Returns the evaluator called [name] in EVALUATORS for the map of
+    [board] (SearchBoard) with [continents] (Continent objects).'''
+    if name not in EVALUATORS:
+        raise ValueError("Unknown evaluator: %s" % name)
+    return EVALUATORS[name](board.neighbors,
+                            board_continents(board, continents))
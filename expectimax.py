@@ -0,0 +1,231 @@
+import time
+
+from color import Color
+from odds import distribution
+from search import (AlphaBeta, EXACT, LOWER, UPPER, SearchTimeout,
+                    move_first)
+
+
+# Expectimax over blitz results. Unlike AlphaBeta, an attack is not assumed
+# to succeed: it leads to a chance node whose children are the possible
+# results of the blitz, conquests and failures alike, weighted by their
+# exact probabilities. Either player may also stop attacking (pass).
+
+# Bucketed results less likely than this are folded into the most likely
+# result, e.g. the near-impossible failures of a big army on a small one.
+MIN_OUTCOME = 0.01
+
+_outcome_cache = {}
+
+
+def _buckets(outcomes, max_buckets):
+    '''Merges [outcomes] (list of (troops, probability) sorted by troops)
+    into at most [max_buckets] groups of neighboring troop counts with about
+    equal probability. Each group is represented by its expected troops,
+    rounded.
+    Returns a list of (troops, probability).'''
+    total = sum(p for _, p in outcomes)
+    res = []
+    mass = 0.0
+    weighted = 0.0
+    done = 0.0
+    for troops, p in outcomes:
+        mass += p
+        weighted += troops * p
+        if mass + done >= total * (len(res) + 1) / max_buckets - 1e-12:
+            res.append((int(round(weighted / mass)), mass))
+            done += mass
+            mass = 0.0
+            weighted = 0.0
+    if mass > 0:
+        res.append((int(round(weighted / mass)), mass))
+    # Rounding may map two groups to the same count.
+    merged = {}
+    for troops, p in res:
+        merged[troops] = merged.get(troops, 0.0) + p
+    return sorted(merged.items())
+
+
+def blitz_outcomes(attack, defense, max_outcomes=3):
+    '''
+    Returns the results of a blitz with [attack] and [defense] troops as a
+    list of (attack left, defense left, probability), most likely first.
+    Conquests (by attacking troops left) and failures (by defending troops
+    left) are each bucketed into at most [max_outcomes] results, so that a
+    chance node has at most 2*[max_outcomes] children however big the
+    armies are. Results less likely than MIN_OUTCOME are added to the most
+    likely one. The probabilities sum to 1.
+
+    Preconditions: [attack] > 1 and [defense] > 0.
+    '''
+    key = (attack, defense, max_outcomes)
+    if key in _outcome_cache:
+        return _outcome_cache[key]
+    wins = []
+    losses = []
+    for (attack_left, defense_left), p in sorted(distribution(attack, defense).items()):
+        if defense_left == 0:
+            wins.append((attack_left, p))
+        else:
+            losses.append((defense_left, p))
+    res = [(troops, 0, p) for troops, p in _buckets(wins, max_outcomes)] + \
+        [(1, troops, p) for troops, p in _buckets(losses, max_outcomes)]
+    res.sort(key=lambda outcome: -outcome[2])
+    rare = sum(p for _, _, p in res if p < MIN_OUTCOME)
+    res = [outcome for outcome in res if outcome[2] >= MIN_OUTCOME]
+    res[0] = res[0][:2] + (res[0][2] + rare,)
+    _outcome_cache[key] = res
+    return res
+
+
+class Expectimax(AlphaBeta):
+
+    def __init__(self, board, ai_color=Color.RED, max_depth=3, threshold=0.2,
+                 table=None, max_outcomes=3, territory_weight=1.0, star1=True):
+        '''
+        Initiates an expectimax search on [board] (SearchBoard). Each ply is
+        one attack or a pass, after which the other player moves. An attack
+        is a chance node over blitz_outcomes() with [max_outcomes]; attacks
+        that succeed with probability [threshold] or less are not
+        considered.
+        A position is worth the troops of [ai_color] minus those of everyone
+        else, plus [territory_weight] times the same difference in
+        territories (troops alone would make any attack look bad, since
+        attacking never gains troops).
+        If [star1] is True, chance nodes are cut off as soon as the results
+        searched so far decide them (Star1 pruning), using the fact that no
+        value lies outside [lower, upper].
+        [table], [nodes], [expanded], [cutoffs] and [best_move] are as for
+        AlphaBeta; [chance_cutoffs] counts Star1 cutoffs. [best_move] is None
+        if passing is best.
+        '''
+        AlphaBeta.__init__(self, board, ai_color, max_depth, threshold, table)
+        self.max_outcomes = max_outcomes
+        self.territory_weight = territory_weight
+        self.star1 = star1
+        self.chance_cutoffs = 0
+        # Attacks never create troops, so the evaluation stays within the
+        # bounds of the starting position.
+        bound = sum(board.troops) + territory_weight * len(board)
+        self.lower = -bound
+        self.upper = bound
+
+    def evaluate(self):
+        board = self.board
+        ai_color = self.ai_color
+        troops = 2 * board.total_troops(ai_color) - sum(board.troop_counts.values())
+        territories = 2 * board.territory_count(ai_color) - len(board)
+        return troops + self.territory_weight * territories
+
+    def search(self, color, other, depth=0, a=-float("inf"), b=float("inf"),
+               state=None):
+        '''
+        Searches the position with [color] to move against [other], [depth]
+        plies below the root, in the window ([a], [b]).
+        If [state] is given, a child is recorded for every attack
+        searched at the root, with its win probability as likelihood and its
+        expected value as h (deeper positions are not recorded, since they
+        depend on the dice).
+        Returns the value of the position.
+        '''
+        self.nodes += 1
+        if (self.deadline is not None and self.nodes % 64 == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+        board = self.board
+        if (depth >= self.max_depth or board.territory_count(color) == 0
+                or board.territory_count(other) == 0):
+            return self.evaluate()
+
+        draft = self.max_depth - depth
+        table = self.table
+        entry = None
+        if table is not None:
+            key = board.key(color)
+            entry = table.probe(key)
+            if depth > 0 and entry is not None and entry[2] >= draft:
+                value, bound = entry[1], entry[3]
+                if (bound == EXACT or (bound == LOWER and value >= b)
+                        or (bound == UPPER and value <= a)):
+                    return value
+        a_orig = a
+        b_orig = b
+
+        maximizing = color == self.ai_color
+        moves = board.attack_moves(color, self.threshold)
+        moves.sort(key=lambda move: -move[2])
+        if entry is not None and entry[4] is not None:
+            moves = move_first(moves, entry[4])
+        # Passing comes last.
+        moves.append(None)
+        self.expanded += 1
+        best = None
+        best_move = None
+        for k, move in enumerate(moves):
+            if move is None:
+                value = self.search(other, color, depth+1, a, b)
+            else:
+                from_i, to_i, l = move
+                value = self.chance(color, other, depth, from_i, to_i, a, b)
+                if depth == 0 and state is not None:
+                    child = state.new_child((board.ids[from_i], board.ids[to_i]), l)
+                    child.set_h(value)
+            if best is None or (value > best if maximizing else value < best):
+                best = value
+                best_move = move[:2] if move is not None else None
+            if maximizing:
+                a = max(a, value)
+            else:
+                b = min(b, value)
+            if b <= a:
+                self.cutoffs += 1
+                if k == 0:
+                    self.first_cutoffs += 1
+                break
+
+        if table is not None:
+            if best <= a_orig:
+                bound = UPPER
+            elif best >= b_orig:
+                bound = LOWER
+            else:
+                bound = EXACT
+            table.store(key, best, draft, bound, best_move)
+        if depth == 0:
+            self.best_move = best_move
+            if state is not None:
+                state.set_h(best)
+        return best
+
+    def chance(self, color, other, depth, from_i, to_i, a, b):
+        '''Returns the expected value of a blitz from territory [from_i] on
+        [to_i] by [color], or a bound outside ([a], [b]) if Star1 pruning
+        cuts it off.'''
+        board = self.board
+        lower = self.lower
+        upper = self.upper
+        expected = 0.0
+        remaining = 1.0
+        for attack_left, defense_left, p in blitz_outcomes(
+                board.troops[from_i], board.troops[to_i], self.max_outcomes):
+            remaining -= p
+            if self.star1:
+                # The window in which this result still matters, given the
+                # results so far and the extremes for the remaining ones.
+                child_a = max(lower, (a - expected - remaining * upper) / p)
+                child_b = min(upper, (b - expected - remaining * lower) / p)
+            else:
+                child_a = lower
+                child_b = upper
+            board.make_blitz(from_i, to_i, attack_left, defense_left)
+            value = self.search(other, color, depth+1, child_a, child_b)
+            board.unmake()
+            expected += p * value
+            if self.star1:
+                if expected + remaining * upper <= a:
+                    self.chance_cutoffs += 1
+                    return expected + remaining * upper
+                if expected + remaining * lower >= b:
+                    self.chance_cutoffs += 1
+                    return expected + remaining * lower
+        return expected
@@ -1,6 +1,5 @@
 import math
 import pygame
-import random
 import time
 
 from card import *
@@ -8,7 +7,19 @@ from color import Color
 from continent import *
 from path import path_exists
 from player import Player
+from rules import (apply_blitz, calculate_troops_gained, claim_territories,
+                   initialize_troops, set_continent_owners, territories)
+from rng import GameRandom
 from roll import blitz
+from sampler import sample_blitz
+
+# If True, blitz attacks draw their result from precomputed outcome tables
+# instead of rolling (and printing) every die.
+FAST_COMBAT = False
+
+# The dice and shuffles of this game. Every roll is printed; pass quiet=True
+# for a silent game.
+game_random = GameRandom(quiet=False)
 
 # Initialize players.
 initial_troops = 30
@@ -21,7 +32,7 @@ purple_player = Player(Color.PURPLE, initial_troops, [])
 
 # Randomize order.
 order = [red_player, blue_player, green_player, yellow_player]
-random.shuffle(order)
+game_random.shuffle(order)
 
 pygame.init()
 
@@ -626,50 +637,10 @@ def game_quit():
     quit()
 
 
-locations = {
-    "Afghanistan": (776, 370),
-    "Alaska": (79, 210),
-    "Alberta": (198, 255),
-    "Argentina": (283, 725),
-    "Brazil": (367, 609),
-    "Central America": (215, 415),
-    "China": (926, 420),
-    "Congo": (591, 642),
-    "East Africa": (673, 600),
-    "Eastern Australia": (1011, 682),
-    "Eastern United States": (290, 354),
-    "Egypt": (603, 492),
-    "Great Britain": (507, 303),
-    "Greenland": (457, 176),
-    "Iceland": (506, 217),
-    "India": (822, 512),
-    "Indonesia": (944, 602),
-    "Irkutsk": (951, 286),
-    "Japan": (1048, 364),
-    "Kamchatka": (1115, 213),
-    "Madagascar": (691, 723),
-    "Middle East": (696, 500),
-    "Mongolia": (980, 347),
-    "New Guinea": (1074, 597),
-    "North Africa": (521, 551),
-    "Northern Europe": (593, 331),
-    "Northwest Territory": (245, 210),
-    "Ontario": (275, 260),
-    "Peru": (249, 613),
-    "Quebec": (370, 256),
-    "Russia": (686, 282),
-    "Scandinavia": (563, 234),
-    "Siam": (912, 500),
-    "Siberia": (880, 230),
-    "South Africa": (582, 762),
-    "Southern Europe": (589, 392),
-    "Ural": (808, 268),
-    "Venezuela": (251, 529),
-    "Western Australia": (946, 706),
-    "Western Europe": (505, 395),
-    "Western United States": (200, 360),
-    "Yakutsk": (993, 208)
-}
+# Screen locations of the territories for a 1200X900 window, from the map file.
+locations = {}
+for node in all_nodes:
+    locations[node.get_name()] = node.get_location()
 
 
 def rescale_locations(w, h):
@@ -682,10 +653,6 @@ def rescale_locations(w, h):
         locations[loc] = (x, y)
 
 
-for node in all_nodes:
-    node.set_location(locations[node.get_name()])
-
-
 def darken_screen():
     dark = pygame.Surface(
         (bgImg.get_width(), bgImg.get_height()), flags=pygame.SRCALPHA)
@@ -702,115 +669,31 @@ def lighten_screen():
         bgImg.blit(dark, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
 
 
-
-def territories(color, continents):
-    '''Returns a list of territories (Node list) owned by a player with a
-    given color in the given continent list (can be empty).'''
-    res = []
-    for continent in continents:
-        for node in continent.get_nodes():
-            if node.get_owner() == color:
-                res.append(node)
-    return res
-
-def find_player(color, player_lst):
-    '''Returns the player from [player_lst] with a given color. Raises
-    ValueError if not found.'''
-    for player in player_lst:
-        if player.get_color() == color:
-            return player
-    raise ValueError('Player with color %s not found!' % str(color))
-
-# WARNING: this function changes both [order] and [nodes].
-def claim_territories(order, nodes):
-    '''Gives territories for a given [order] in a given territories.'''
-    while len(nodes) > 0:
-        # Select the next player in the queue.
-        curr_player = order.pop(0)
-        order.append(curr_player)
-        if curr_player.get_troops() == 0:
-            continue
-        # Get necessary information and pop the first node from [nodes].
-        curr_color = curr_player.get_color()
-        curr_node = nodes.pop(0)
-        assert curr_node.get_troops() == -1, "Non-empty territory during claim!"
-        # Set ownership and subtract troops.
-        curr_node.set_owner(curr_color)
-        curr_node.set_troops(1)
-        curr_player.subtract_troops(1)
-    return
-
-
-def initialize_troops(order, nodes):
-    # WARNING: this function changes both [order] and [nodes].
-    '''Initializes troops using a given order in given node list.'''
-    total_remaining_troops = 0
-    for player in order:
-        total_remaining_troops += player.get_troops()
-    while total_remaining_troops > 0:
-        # Pop the first node from the queue and put it at the end.
-        curr_node = nodes.pop(0)
-        nodes.append(curr_node)
-        curr_color = curr_node.get_owner()
-        # Find player with a given color.
-        curr_player = find_player(curr_color, order)
-        # Add a random number or, if the player doesn't have enough troops,
-        # the remaining troops to the territory
-        assigned_troops = min(random.randint(0, 5), curr_player.get_troops())
-        curr_node.add_troops(assigned_troops)
-        curr_player.subtract_troops(assigned_troops)
-        total_remaining_troops -= assigned_troops
-
-def blitz_attack(from_node, to_node):
+def blitz_attack(from_node, to_node, rng=None):
     '''Conducts blitz attack between the two nodes and changes the results.
     Returns a boolean representing whether attack was successful or not.
     In case of a successful attack, moves all possible troops into a new
     territory; however, this is done purely for bookkeeping purposes when 
     letting the player choose how many troops to actually move in.
 
+    [rng] is the GameRandom stream for the dice (game_random if None).
+
     Preconditions: from_node.get_troops() > 1 and to_node.get_troops() > 0;
         the nodes have two different owners.'''
-    blitz_res = blitz(from_node.get_troops(), to_node.get_troops())
+    if rng is None:
+        rng = game_random
+    if FAST_COMBAT:
+        blitz_res = sample_blitz(from_node.get_troops(), to_node.get_troops(), rng)
+    else:
+        blitz_res = blitz(from_node.get_troops(), to_node.get_troops(), rng)
 
     if blitz_res[0] == 1:
         print("Attack unsuccessful! You now have 1 troop in " + from_node.get_name() + ". The " + str(to_node.get_owner()) +
               " player has " + str(blitz_res[1]) + " troops in " + to_node.get_name())
-        from_node.set_troops(1)
-        to_node.set_troops(blitz_res[1])
-        return False
     elif blitz_res[1] == 0:
         print("\nAttack successful!")
-        from_node.set_troops(1)
-        to_node.set_troops(blitz_res[0]-1)
-        to_node.set_owner(from_node.get_owner())
-        return True
-    else:
-        raise ValueError("Wrong results for blitz: (%i, %i)" % blitz_res)
-
-def set_continent_owners(continents):
-    '''Checks if any of the continents is owned by a single color and
-    sets owners if there are ones.'''
-    for continent in continents:
-        single_owner = True
-        node_lst = continent.get_nodes()
-        possible_owner = node_lst[0].get_owner()
-        for node in node_lst[1:]:
-            if node.get_owner() != possible_owner:
-                single_owner = False
-                continent.demonopolize()
-                break
-        if single_owner:
-            continent.monopolize(possible_owner)
+    return apply_blitz(from_node, to_node, blitz_res)
 
-def territories(color, continents):
-    '''Returns a list of territories (Node list) owned by a player with a
-    given color in the given continent list (can be empty).'''
-    res = []
-    for continent in continents:
-        for node in continent.get_nodes():
-            if node.get_owner() == color:
-                res.append(node)
-    return res
 
 def calculate_territorial_bonus(curr_color, continents):
     '''Calculates the number of troops gained by the player with a given color
@@ -818,35 +701,8 @@ def calculate_territorial_bonus(curr_color, continents):
     Returns the number of gained troops (int), the number of territories owned
     by the player (int), and the list of continents owned by the player
     (Continent list).'''
-    continents_owned = []
-    territories_owned = len(territories(curr_color, continents))
-    territory_bonus = max(territories_owned//3, 3)
-    troops_gained = 0
-    troops_gained += territory_bonus
-    for continent in continents:
-        if continent.get_owner() == curr_color:
-            continents_owned.append(continent)
-            bonus = continent.get_bonus()
-            troops_gained += bonus
-    return troops_gained, territories_owned, continents_owned
-    
-def calculate_troops_gained(curr_color, continents):
-    '''Calculates the number of troops gained by the player with a given color
-    in the beginning of their turn.
-    Returns the number of gained troops (int), the number of territories owned
-    by the player (int), and the list of continents owned by the player
-    (Continent list).'''
-    continents_owned = []
-    territories_owned = len(territories(curr_color, continents))
-    territory_bonus = max(territories_owned//3, 3)
-    troops_gained = 0
-    troops_gained += territory_bonus
-    for continent in continents:
-        if continent.get_owner() == curr_color:
-            continents_owned.append(continent)
-            bonus = continent.get_bonus()
-            troops_gained += bonus
-    return troops_gained, territories_owned, continents_owned
+    return calculate_troops_gained(curr_color, continents)
+
 
 msg_displayed = False
 def show_new_troops(curr_player):
@@ -940,7 +796,7 @@ def use_cards():
     assert best_hand is not None
 
     for card in best_hand:
-        all_cards.insert(random.randint(0, len(all_cards)), card)
+        all_cards.insert(game_random.randint(0, len(all_cards)), card)
     curr_player.add_troops(curr_player.use_cards(best_hand))
     best_hand = None
 
@@ -951,7 +807,7 @@ def use_cards_forced():
     assert msg_displayed
 
     for card in best_hand:
-        all_cards.insert(random.randint(0, len(all_cards)), card)
+        all_cards.insert(game_random.randint(0, len(all_cards)), card)
     curr_player.add_troops(curr_player.use_cards(best_hand))
     best_hand = None
     msg_displayed = False
@@ -1484,8 +1340,11 @@ def fortify_phase(curr_player):
             fortify_phase_over = True
 
 
-claim_territories(order, all_nodes.copy())
-initialize_troops(order, all_nodes.copy())
+# Territories are claimed in an order drawn from the game's stream.
+claim_order = all_nodes.copy()
+game_random.shuffle(claim_order)
+claim_territories(order, claim_order)
+initialize_troops(order, all_nodes.copy(), game_random)
 
 # Ensure there are no unowned nodes.
 for continent in continents:
@@ -1493,12 +1352,13 @@ for continent in continents:
         if node.get_owner() == Color.NONE:
             raise ValueError('Unowned node!' + str(node))
 
+# Check continent ownership. The registry keeps it up to date afterwards.
+set_continent_owners(continents)
+
 while True:
     # Pick the next player.
     curr_player = order.pop(0)
     order.append(curr_player)
-    # Check continent ownership.
-    set_continent_owners(continents)
     # Give new troops.
     show_new_troops(curr_player)
     # Deploy - Attack - Fortify.
@@ -1,138 +1,54 @@
-import random
-import time
-
 from card import *
 from color import Color
 from continent import *
-from path import path_exists
 from player import Player
+from rules import (calculate_troops_gained, check_attack,
+                   check_attack_everyone, claim_territories, initialize_troops,
+                   remove_defeated, territories)
 from roll import blitz
+from evaluation import make_evaluator
+from expectimax import Expectimax
+from mcts import ATTACK, MCTS
+from search import AlphaBeta, SearchBoard, TranspositionTable
+from zobrist import GraphHash
+from rng import global_random
+from sampler import sample_blitz
+from odds import win_probability
+from parallel import SearchPool
 
-import numpy as np
-from state import State
-from statespace import Statespace
-
-
-
-
-def territories(color, continents):
-    '''Returns a list of territories (Node list) owned by a player with a
-    given color in the given continent list (can be empty).'''
-    res = []
-    for continent in continents:
-        for node in continent.get_nodes():
-            if node.get_owner() == color:
-                res.append(node)
-    return res
-
-
-def find_player(color, player_lst):
-    '''Returns the player from [player_lst] with a given color. Raises
-    ValueError if not found.'''
-    for player in player_lst:
-        if player.get_color() == color:
-            return player
-    raise ValueError('Player with color %s not found!' % str(color))
-
-
-# WARNING: this function changes both [order] and [nodes].
-def claim_territories(order, nodes):
-    '''Gives territories for a given [order] in a given territories.'''
-    while len(nodes) > 0:
-        # Select the next player in the queue.
-        curr_player = order.pop(0)
-        order.append(curr_player)
-        if curr_player.get_troops() == 0:
-            continue
-        # Get necessary information and pop the first node from [nodes].
-        curr_color = curr_player.get_color()
-        curr_node = nodes.pop(0)
-        assert curr_node.get_troops() == -1, "Non-empty territory during claim!"
-        # Set ownership and subtract troops.
-        curr_node.set_owner(curr_color)
-        curr_node.set_troops(1)
-        curr_player.subtract_troops(1)
-
-        if (curr_node.get_id() not in curr_player.get_territories()):
-            curr_player.add_territory(curr_node.get_id())
-    return
-
-
-def initialize_troops(order, nodes):
-    # WARNING: this function changes both [order] and [nodes].
-    '''Initializes troops using a given order in given node list.'''
-    total_remaining_troops = 0
-    for player in order:
-        total_remaining_troops += player.get_troops()
-    while total_remaining_troops > 0:
-        # Pop the first node from the queue and put it at the end.
-        curr_node = nodes.pop(0)
-        nodes.append(curr_node)
-        curr_color = curr_node.get_owner()
-        # Find player with a given color.
-        curr_player = find_player(curr_color, order)
-        # Add a random number or, if the player doesn't have enough troops,
-        # the remaining troops to the territory
-        assigned_troops = min(random.randint(0, 5), curr_player.get_troops())
-        curr_node.add_troops(assigned_troops)
-        curr_player.subtract_troops(assigned_troops)
-        total_remaining_troops -= assigned_troops
-
-
-def remove_defeated(player_lst):
-    '''Removes players with no territories from the given player list.
-    Returns a new player list without the defeated players.
-
-    Preconditions: no duplicates in [player_lst].'''
-    res = []
-    for i in range(len(player_lst)):
-        player = player_lst[i]
-        if len(territories(player.get_color(), continents)) > 0:
-            res.append(player)
-        else:
-            print("\n%s Player has been defeated!\n" %
-                  str(player.get_color()))
-    return res
-
-
-def check_attack(color, continents):
-    '''Checks if the player with a given color can perform an attack.
-    Returns a boolean.'''
-    # First, check if there is at least one node where the player has more
-    # than one unit. Next, for each node with more than 1 troop, check if there
-    # are any adjacent enemy territories that could be attacked.
-    for node in territories(color, continents):
-        if node.get_troops() > 1 and len(node.attack_options()) > 0:
-            return True
-    return False
+from statetree import StateTree
 
 
-def check_attack_everyone(order, continents):
-    '''Runs check_attack() on every remaining player to make sure at least
-    one player can attack.'''
-    for player in order:
-        if check_attack(player.get_color(), continents):
-            return True
-    return False
+# If True, blitz attacks draw their result from precomputed outcome tables
+# instead of rolling (and printing) every die.
+FAST_COMBAT = False
 
 
-def blitz_attack(from_node, to_node):
+def blitz_attack(from_node, to_node, rng=None):
     '''Conducts blitz attack between the two nodes and changes the results.
     Returns a boolean representing whether attack was successful or not.
 
+    [rng] is the GameRandom stream for the dice and the messages (the global
+    one if None); a quiet stream makes the attack print nothing.
+
     Preconditions: from_node.get_troops() > 1 and to_node.get_troops() > 0;
         the nodes have two different owners.'''
+    if rng is None:
+        rng = global_random
 
-    blitz_res = blitz(from_node.get_troops(), to_node.get_troops())
+    if FAST_COMBAT:
+        blitz_res = sample_blitz(from_node.get_troops(), to_node.get_troops(), rng)
+    else:
+        blitz_res = blitz(from_node.get_troops(), to_node.get_troops(), rng)
 
     if blitz_res[0] == 1:
-        print("Attack unsuccessful! You now have 1 troop in " + from_node.get_name() + ". The " + str(to_node.get_owner()) +
-              " player has " + str(blitz_res[1]) + " troops in " + to_node.get_name())
+        rng.log("Attack unsuccessful! You now have 1 troop in " + from_node.get_name() + ". The " + str(to_node.get_owner()) +
+                " player has " + str(blitz_res[1]) + " troops in " + to_node.get_name())
         from_node.set_troops(1)
         to_node.set_troops(blitz_res[1])
         return False
     elif blitz_res[1] == 0:
-        print("\nAttack successful!")
+        rng.log("\nAttack successful!")
         while True:
 
             # Only 2 troops survived. 1 automatically goes into a new territory.
@@ -140,8 +56,8 @@ def blitz_attack(from_node, to_node):
                 to_node.set_owner(from_node.get_owner())
                 from_node.set_troops(1)
                 to_node.set_troops(1)
-                print("\nYou now have 1 troop in " + from_node.get_name() +
-                      " and " + "1 troop in " + to_node.get_name())
+                rng.log("\nYou now have 1 troop in " + from_node.get_name() +
+                        " and " + "1 troop in " + to_node.get_name())
                 return True
 
             # Only 3 troops survived. 2 automatically go into a new territory.
@@ -149,8 +65,8 @@ def blitz_attack(from_node, to_node):
                 to_node.set_owner(from_node.get_owner())
                 from_node.set_troops(1)
                 to_node.set_troops(2)
-                print("\nYou now have 1 troop in " + from_node.get_name() +
-                      " and " + "2 troops in " + to_node.get_name())
+                rng.log("\nYou now have 1 troop in " + from_node.get_name() +
+                        " and " + "2 troops in " + to_node.get_name())
                 return True
 
             # Only 4 troops survived. 3 automatically go into a new territory.
@@ -158,22 +74,22 @@ def blitz_attack(from_node, to_node):
                 to_node.set_owner(from_node.get_owner())
                 from_node.set_troops(1)
                 to_node.set_troops(3)
-                print("\nYou now have 1 troop in " + from_node.get_name() +
-                      " and " + "3 troops in " + to_node.get_name())
+                rng.log("\nYou now have 1 troop in " + from_node.get_name() +
+                        " and " + "3 troops in " + to_node.get_name())
                 return True
 
             # More than 3 troops survived. At least 3 go into a new territory.
             elif blitz_res[0] > 3:
                 while True:
-                    print("\nYou have %i troops left in %s." %
-                          (blitz_res[0], from_node.get_name()))
+                    rng.log("\nYou have %i troops left in %s." %
+                            (blitz_res[0], from_node.get_name()))
                     # Input the number of troops moved and check.
                     moved_troops = blitz_res[0]-1
                     if moved_troops < 3:
-                        print(
+                        rng.log(
                             "\nNeed to move at least 3 troops into a new territory!")
                     elif moved_troops > blitz_res[0]-1:
-                        print(
+                        rng.log(
                             "\nNot enough troops! You have to leave at least 1 troop in %s!" % from_node.get_name())
                     else:
                         # Move troops.
@@ -185,7 +101,7 @@ def blitz_attack(from_node, to_node):
                         to_troops = to_node.get_troops()
                         from_name = from_node.get_name()
                         to_name = to_node.get_name()
-                        print("You now have %i troops in %s, and %i troops in %s.\n" % (
+                        rng.log("You now have %i troops in %s, and %i troops in %s.\n" % (
                             from_troops, from_name, to_troops, to_name))
                         return True
             else:
@@ -208,30 +124,6 @@ def blitz_attack(from_node, to_node):
     #     raise ValueError("Wrong results for blitz: (%i, %i)" % blitz_res)
 
 
-def calculate_troops_gained(curr_color, continents, print_details=False):
-    '''Calculates the number of troops gained by the player with a given color
-    in the beginning of their turn.
-    Returns the number of gained troops (int), the number of territories owned
-    by the player (int), and the list of continents owned by the player
-    (Continent list).'''
-    continents_owned = []
-    territories_owned = len(territories(curr_color, continents))
-    territory_bonus = max(territories_owned//3, 3)
-    troops_gained = 0
-    troops_gained += territory_bonus
-    for continent in continents:
-        if continent.get_owner() == curr_color:
-            continents_owned.append(continent)
-            bonus = continent.get_bonus()
-            troops_gained += bonus
-            if print_details:
-                print("%i troops for %s," % (bonus, continent.get_name()))
-    if print_details:
-        print("%i troops for %i territories." %
-              (territory_bonus, territories_owned))
-    return troops_gained, territories_owned, continents_owned
-
-
 def print_continent_list(continent_lst):
     '''Helper function for deploy_phase(). Returns a string.'''
     size = len(continent_lst)
@@ -260,23 +152,10 @@ def request_input(input_type, msg):
             print("Invalid input!")
 
 
-def set_continent_owners(continents):
-    '''Checks if any of the continents is owned by a single color and
-    sets owners if there are ones.'''
-    for continent in continents:
-        single_owner = True
-        node_lst = continent.get_nodes()
-        possible_owner = node_lst[0].get_owner()
-        for node in node_lst[1:]:
-            if node.get_owner() != possible_owner:
-                single_owner = False
-                continent.demonopolize()
-                break
-        if single_owner:
-            continent.monopolize(possible_owner)
-
-
-def deploy_phase(curr_player):
+def deploy_phase(curr_player, rng=None):
+    # [rng] is the GameRandom stream of the game (the global one if None).
+    if rng is None:
+        rng = global_random
     print("\nDEPLOY.\n")
 
     print("You have the following cards: %s.\n" % str(curr_player.get_cards()))
@@ -289,7 +168,7 @@ def deploy_phase(curr_player):
         best_hand = curr_player.decide()
         # Used cards are added to the deck in random locations.
         for card in best_hand:
-            all_cards.insert(random.randint(0, len(all_cards)), card)
+            all_cards.insert(rng.randint(0, len(all_cards)), card)
         bonus_troops += curr_player.use_cards(best_hand)
 
     elif len(curr_player.possible_combos()) > 0:
@@ -302,7 +181,7 @@ def deploy_phase(curr_player):
                 print("\nYou used your bonus cards.")
                 # Used cards are added to the deck in random locations.
                 for card in best_hand:
-                    all_cards.insert(random.randint(0, len(all_cards)), card)
+                    all_cards.insert(rng.randint(0, len(all_cards)), card)
                 bonus_troops += curr_player.use_cards(best_hand)
                 break
             elif card_use == -1:
@@ -331,7 +210,7 @@ def deploy_phase(curr_player):
               curr_player.get_troops())
         # Ask for a node id.
         nodeid = request_input(int, msg_1)
-        node = find_node(nodeid, all_nodes_sorted)
+        node = registry.find(nodeid)
         # Node not found.
         if node == None:
             print("\nNode with such id not found!")
@@ -378,7 +257,7 @@ def deploy_phase(curr_player):
 #         if from_id == -1:
 #             break
 
-#         from_node = find_node(from_id, territories(curr_color, continents))
+#         from_node = registry.find_owned(from_id, curr_color)
 #         if from_node == None:
 #             print(
 #                 "You don't own a territory with such id! Please enter id of a territory you own!")
@@ -437,7 +316,7 @@ def deploy_phase(curr_player):
 #         if from_id == -1:
 #             break
 #         # Find the node from which to take troops.
-#         from_node = find_node(from_id, territories(curr_color, continents))
+#         from_node = registry.find_owned(from_id, curr_color)
 #         if from_node == None:
 #             print(
 #                 "\nYou don't own a territory with such id! Please enter id of a territory you own!\n")
@@ -452,7 +331,7 @@ def deploy_phase(curr_player):
 #             # Check if get back.
 #             if to_id == -1:
 #                 continue
-#             to_node = find_node(to_id, territories(curr_color, continents))
+#             to_node = registry.find_owned(to_id, curr_color)
 #             if to_node == None:
 #                 print(
 #                     "\nYou don't own a territory with such id! Please enter id of a territory you own!\n")
@@ -493,15 +372,16 @@ def debug_state(state):
     tt = []
     ott = []
     for terr,_ in state.get_trp_terr():
-        node = find_node(terr, all_nodes_sorted)
+        node = registry.find(terr)
         tt.append((str(node.get_owner()),str(node)))
     for terr,_ in state.get_opp_trp_terr():
-        node = find_node(terr, all_nodes_sorted)
+        node = registry.find(terr)
         ott.append((str(node.get_owner()),str(node)))
     return tt, ott
 
-def init_state_space(curr_player, opp): 
-    global statespace
+def territory_lists(curr_player, opp):
+    '''Returns the (territory id, troops) lists of [curr_player] and [opp]
+    on the current board.'''
     territory_ids = curr_player.get_territories()
     # print(territory_ids)
     tt = []
@@ -516,165 +396,102 @@ def init_state_space(curr_player, opp):
 
         else:
             ott.append((terr.get_id(), terr.get_troops()))
-    print('tt:' , tt, '\nott', ott)
     for nod_id,_ in tt:
-        nod = find_node(nod_id, all_nodes_sorted)
+        nod = registry.find(nod_id)
         assert nod.get_owner() == curr_player.get_color()
     for nod_id,_ in ott:
-        nod = find_node(nod_id, all_nodes_sorted)
+        nod = registry.find(nod_id)
         assert nod.get_owner() == opp.get_color()
-    start = State(current_player=curr_player, opponent=opp, likelihood=1, trp_terr=tt, opp_trp_terr=ott)
-    statespace.set_pointer(start)
-    build_state_paths(curr_player, opp, -(2 * 10**62), (2 * 10**62), start, 0)
+    return tt, ott
 
-import random
-def state_attack_options(state, terr_id):
-        '''Returns a list of nodes that could be attacked from the given node.'''
-        res = []
-        node = find_node(terr_id, all_nodes_sorted) # TODOne: all_nodes_sorted
-        # if random.randint(0,100) == 100:
-        #     print("\nLOOK!")
-        #     print(state.get_current_player().get_color())
-        #     for e in state.get_trp_terr():
-        #         nod = find_node(e[0],all_nodes_sorted)
-        #         print(nod, nod.get_owner())
-        #     print("SALUT")
-        #     for e in state.get_opp_trp_terr():
-        #         nod = find_node(e[0],all_nodes_sorted)
-        #         print(nod, nod.get_owner())
-        for t in node.get_neighbors():
-            # get_opp_trp_terr() returns smth like [(t_id1, #troops), (t_id2, #troops), ...]
-            for e in state.get_opp_trp_terr():
-                if (e[0]==t.get_id()):
-                    # print(t)
-                    res.append(t)
-        return res
+def init_state_space(curr_player, opp): 
+    '''Searches the current board with [curr_player] to move. The root of
+    the tree is kept (with its searched line, see follow_battle()) if it is
+    this position, so that the search deepens from its values, otherwise
+    the tree starts again from the board.'''
+    global statespace
+    key = graph_hash.key(curr_player.get_color())
+    tt, ott = territory_lists(curr_player, opp)
+    start = statespace.get_pointer()
+    if (start is None or start.get_parent() is not None
+            or start.get_key() != key
+            or start.get_current_player() is not curr_player
+            or not statespace.is_at(tt, ott)):
+        start = statespace.reset(curr_player, opp, tt, ott, key=key)
+    build_state_paths(curr_player, opp, -(2 * 10**62), (2 * 10**62), start, 0)
 
+def follow_battle(curr_player, opp, from_id, to_id):
+    '''Moves the tree on after [curr_player] attacked from [from_id] on
+    [to_id], with [opp] to move next. If the battle went as searched (a
+    conquest without losses, compared territory by territory), the tree is
+    re-rooted onto the child for the attack, so the searched line below it
+    and its values are reused and the next search only has to deepen it.
+    Otherwise the tree starts again from the board.
+    Returns True if the tree was re-rooted.'''
+    global statespace
+    key = graph_hash.key(opp.get_color())
+    tt, ott = territory_lists(opp, curr_player)
+    if statespace.follow((from_id, to_id), key, tt, ott) is not None:
+        return True
+    statespace.reset(opp, curr_player, tt, ott, key=key)
+    return False
 
 def build_state_paths(curr_player, opponent, a, b, state, d):
+    '''Runs the alpha-beta search (see search.AlphaBeta) from [state], which
+    has to match the current board, [d] plies deep into the tree, and
+    records the moves searched from [state] as its children, with the
+    principal variation below the best one (see search.AlphaBeta.search();
+    no variation with EXPECTIMAX, see expectimax.Expectimax), in place of
+    its children so far. If MOVE_TIME is set, the search deepens
+    iteratively for at most MOVE_TIME seconds and the window ([a], [b]) is
+    not used; [state] keeps its children if not even depth 1 completes. With PARALLEL, the search is split across
+    the game's process pool and goes to MAX_DEPTH (see
+    parallel.SearchPool.alphabeta()).
+    Returns the value of [state].'''
     global count
-     #if current player has now won (all territories conquered)
-    if (d >= MAX_DEPTH or len(state.get_trp_terr()) == 42):
-        if (curr_player.get_color() != Color.RED):
-            h = 0
-        else:
-            tot_troops = 0
-            for (terr, trp) in state.get_trp_terr():
-                tot_troops += trp
-            h = state.get_likelihood() * tot_troops
-        state.set_h(h) 
+    board = SearchBoard.from_nodes(all_nodes_sorted)
+    state.set_key(graph_hash.key(curr_player.get_color()))
+    if search_pool is not None and not EXPECTIMAX:
+        state.set_children([])
+        h, _, positions = search_pool.alphabeta(
+            all_nodes_sorted, curr_player.get_color(), opponent.get_color(),
+            MAX_DEPTH - d, Color.RED, PROB_THRESHOLD, EVALUATOR, state)
+        count += positions
         return h
-
-    if (curr_player.get_color() == Color.RED):
-        temp = -(2 * 10**62)
-        for (t_id, num_troops) in state.get_trp_terr():
-            #if player can attack from this territory with high likelihood of success
-            if (num_troops >= 2):
-                # print(state, t_id)
-                n_neighbors = state_attack_options(state, t_id)
-                #for each attackable neighbor
-                for neighbor in n_neighbors:
-                    # print("Assertion")
-                    # assert neighbor.get_owner() == Color.BLUE, str(neighbor) + str(neighbor.get_owner())
-                    #possible number of defending troops
-                    neighbor_id = neighbor.get_id()
-                    # print(neighbor_id)
-                    neighbor_troops = state.get_troops(neighbor_id)
-                    # defending = min(2, neighbor_troops)
-                    if (num_troops-1 > neighbor_troops):
-                        l = prob_capture(num_troops, neighbor_troops)
-                        # l = prob_capture(num_troops, defending) #TODO: change defending to neighbor_troops
-                        if (l>PROB_THRESHOLD):
-                            #make children:
-                            #the current opponent becomes the next player, who just lost the territory
-                            new_tt = [e for e in state.get_opp_trp_terr() if e not in [(neighbor_id, neighbor_troops)]]
-                            # print(state.get_opp_trp_terr())
-                            #current player becomes the opponent, plus the conquered territory, and adjust the troops in the terr attacked from
-                            new_ott = [e for e in state.get_trp_terr() if e not in [(t_id, num_troops)]]+[(neighbor_id, num_troops-1), (t_id, 1)]
-                            new_child = State(current_player=opponent, opponent=state.get_current_player(), move=(t_id,neighbor_id), likelihood=l*state.get_likelihood(), trp_terr=new_tt, opp_trp_terr=new_ott)
-                            count = count + 1
-                            if count%100 == 0:
-                                print (count)
-                            state.add_child(new_child)
-                            res = build_state_paths(opponent, curr_player, a, b, new_child, d+1)
-                            m = max(res, temp)
-                            #a-b prune
-                            a = max(a, res)
-                            if b <= a:
-                                break
+    if EXPECTIMAX:
+        expectimax_table.new_search()
+        search = Expectimax(board, Color.RED, MAX_DEPTH - d,
+                            table=expectimax_table)
+    else:
+        evaluator = make_evaluator(EVALUATOR, board, continents)
+        transposition_table.new_search()
+        search = AlphaBeta(board, Color.RED, MAX_DEPTH - d, PROB_THRESHOLD,
+                           transposition_table, evaluator=evaluator)
+    if MOVE_TIME is None:
+        state.set_children([])
+        h = search.search(curr_player.get_color(), opponent.get_color(), 0,
+                          a, b, state)
     else:
-        temp = 2 * 10**62
-        for (t_id, num_troops) in state.get_trp_terr():
-            #if player can attack from this territory with high likelihood of success
-            if (num_troops >= 2):
-                n_neighbors = state_attack_options(state, t_id)
-                #for each attackable neighbor
-                for neighbor in n_neighbors:
-                    #possible number of defending troops
-                    neighbor_id = neighbor.get_id()
-                    neighbor_troops = state.get_troops(neighbor_id)
-                    defending = min(2, neighbor_troops)
-                    if (num_troops-1 > defending):
-                        l = prob_capture(num_troops, defending)
-                        if (l>PROB_THRESHOLD):
-                            #make children:
-                            #the current opponent becomes the next player, who just lost the territory
-                            new_tt = [e for e in state.get_opp_trp_terr() if e not in [(neighbor_id, neighbor_troops)]]
-                            #current player becomes the opponent, plus the conquered territory, and adjust the troops in the terr attacked from
-                            new_ott = [e for e in state.get_trp_terr() if e not in [(t_id, num_troops)]]+[(neighbor_id, num_troops-1), (t_id, 1)]
-                            new_child = State(current_player=state.opponent, opponent=state.get_current_player(), move=(t_id,neighbor_id), likelihood=l*state.get_likelihood(), trp_terr=new_tt, opp_trp_terr=new_ott)
-                            count = count + 1
-                            if count%100 == 0:
-                                print (count)
-                            state.add_child(new_child)
-                            res = build_state_paths(opponent, curr_player, a, b, new_child, d+1)
-                            m = min(res, temp)
-                            #a-b prune
-                            b = min(b, res)
-                            if b <= a:
-                                break
-    state.set_h(m)
-    return m
-                    
-
-probs = np.zeros((2,3,3))
-probs[0,0] = [0.4167, 0., 0.5833]
-probs[0,1] = [0.5787, 0., 0.4213]
-probs[0,2] = [0.6597, 0., 0.3403]
-probs[1,0] = [0.2546, 0., 0.7454]
-probs[1,1] = [0.2276, 0.3241, 0.4483]
-probs[1,2] = [0.3717, 0.3357, 0.2926]
-
-#finished
-def prob_capture(attack, defend, n=1000):
+        h, _, _ = search.iterate(curr_player.get_color(), opponent.get_color(),
+                                 MOVE_TIME, state=state)
+        # Frees the trees of the shallower iterations.
+        statespace.compact()
+    count += search.nodes
+    return h
+
+
+def prob_capture(attack, defend):
+    '''Returns the exact probability that a blitz from a territory with
+    [attack] troops conquers a territory with [defend] troops.'''
     assert attack > 1 and defend > 0
-    wins = 0
-    for i in range(n):
-        curr_attack = attack
-        curr_defend = defend
-        while curr_defend > 0 and curr_attack > 1:
-            attacking_dice = min(curr_attack-1, 3)
-            defending_dice = min(curr_defend, 2)
-            roll = np.random.uniform()
-            lo = probs[defending_dice-1, attacking_dice-1, 0]
-            hi = lo + probs[defending_dice-1, attacking_dice-1, 1]
-            if roll < lo:
-                curr_defend -= min(attacking_dice, defending_dice) 
-            elif lo <= roll <= hi:
-                curr_attack -= 1
-                curr_defend -= 1
-            else:
-                curr_attack -= min(attacking_dice, defending_dice) 
-        if curr_attack > 1:
-            wins += 1
-    return wins/n
+    return win_probability(attack, defend)
 
 #tentatively finished
-def ai_deploy_phase(curr_player): 
+def ai_deploy_phase(curr_player, rng=None): 
     global statespace
-    rand_deploy_phase(curr_player)
+    rand_deploy_phase(curr_player, rng)
 
-def ai_attack_phase(curr_player, order): 
+def ai_attack_phase(curr_player, order, rng=None): 
     global statespace
     print("\nATTACK.\n")
 
@@ -695,31 +512,43 @@ def ai_attack_phase(curr_player, order):
     
 
     #ENTER CODE
+    # Searches again even if the tree was re-rooted onto the line searched
+    # last time (see follow_battle()): the search starts from the values
+    # kept in the table and goes deeper.
+    init_state_space(curr_player, order[0])
     state = statespace.get_pointer()
+    if len(state.get_children()) == 0:
+        print("No attack is likely enough to succeed!")
+        return
     print('first pointer:', statespace.get_pointer())
-    max_h = 0
+    # Ties go to the first child, the one the search found best, which has
+    # the searched line below it (see follow_battle()).
+    chosen_state = None
     for c in state.get_children():
-        if c.get_h() >= max_h:
-            max_h = c.get_h()
+        if chosen_state is None or c.get_h() > chosen_state.get_h():
             chosen_state = c
+    # The expectimax root's value includes ending the phase (see
+    # expectimax.Expectimax), so no child reaching it means passing is best.
+    # The alpha-beta search has no pass.
+    if EXPECTIMAX and chosen_state.get_h() < state.get_h():
+        print("Ending the attack phase is better than any attack.")
+        return
     # print("\nREAD")
     # print("tt: %s, \n ott: %s" % debug_state(chosen_state))
     from_id, to_id = chosen_state.get_move()
-    from_node = find_node(from_id, all_nodes_sorted)
-    to_node = find_node(to_id, all_nodes_sorted)
+    from_node = registry.find(from_id)
+    to_node = registry.find(to_id)
     print(state.get_current_player().get_color())
     print("HULLO")
     print(from_node.get_owner(), from_node)
     print(to_node.get_owner(), to_node)
     # print('ai-- children:', state.get_children(), 'move:', c.get_move())
     
-    statespace.set_pointer(chosen_state)
-    print('new pointer:', statespace.get_pointer())
 
 
 
     print(from_id, territories(curr_color, continents))
-    from_node = find_node(from_id, territories(curr_color, continents))
+    from_node = registry.find_owned(from_id, curr_color)
     if from_node == None:
         print(
             "You don't own a territory with such id! Please enter id of a territory you own!")
@@ -751,8 +580,47 @@ def ai_attack_phase(curr_player, order):
             else:
                 # Once set to True, [get_card] stays True.
                 # However, blitz_attack() should be called in any case in order to make changes.
-                if not blitz_attack(from_node, to_node) :
-                    init_state_space(curr_player, order[0])
+                blitz_attack(from_node, to_node, rng)
+                follow_battle(curr_player, order[0], from_node.get_id(),
+                              to_node.get_id())
+
+
+def mcts_attack_phase(curr_player, order, rng=None):
+    '''Attacks for as long as the Monte Carlo tree search (see mcts.py)
+    finds attacking better than ending the phase, searching again after every
+    blitz, for at most MCTS_ITERATIONS playouts or MOVE_TIME seconds each.
+    With PARALLEL, the playouts are shared among the game's process pool
+    (see parallel.SearchPool.mcts()), seeded from [rng], and MOVE_TIME is
+    not used.
+    [rng] is the GameRandom stream for the dice (the global one if None).'''
+    if rng is None:
+        rng = global_random
+    print("\nATTACK.\n")
+    curr_color = curr_player.get_color()
+    colors = [curr_color] + [player.get_color() for player in order
+                             if player is not curr_player]
+    while check_attack(curr_color, continents):
+        if search_pool is not None:
+            action, stats = search_pool.mcts(all_nodes_sorted, colors, ATTACK,
+                                             0, MCTS_ITERATIONS,
+                                             rng.getrandbits(32))
+            playouts = sum(visits for visits, _ in stats.values())
+            ids = search_pool.ids
+        else:
+            search = MCTS.from_nodes(all_nodes_sorted, continents, colors,
+                                     ATTACK, 0)
+            action = search.run(MCTS_ITERATIONS, MOVE_TIME)
+            playouts = search.iterations
+            ids = search.board.ids
+        print("%i playouts, best action: %s" % (playouts, str(action)))
+        if action is None or action[0] != ATTACK:
+            break
+        from_node = registry.find(ids[action[1]])
+        to_node = registry.find(ids[action[2]])
+        print("Attacking %s from %s." % (to_node.get_name(), from_node.get_name()))
+        blitz_attack(from_node, to_node, rng)
+        colors = [color for color in colors
+                  if len(territories(color, continents)) > 0]
 
 
 
@@ -760,8 +628,11 @@ def ai_attack_phase(curr_player, order):
 
 ############################## RANDOM ######################################
 #tentatively finished, needs to update the start state
-def rand_deploy_phase(curr_player): 
+def rand_deploy_phase(curr_player, rng=None): 
+    # [rng] is the GameRandom stream of the game (the global one if None).
     global statespace
+    if rng is None:
+        rng = global_random
     print("\nDEPLOY.\nThe random player has the following cards: %s.\n" % str(curr_player.get_cards()))
 
     bonus_troops = 0
@@ -777,8 +648,8 @@ def rand_deploy_phase(curr_player):
     while curr_player.get_troops() > 0:
         print("\nYou have %i more troops to deploy." %
               curr_player.get_troops())
-        nodeid = random.choice(curr_player.get_territories())
-        node = find_node(nodeid, all_nodes_sorted)
+        nodeid = rng.choice(curr_player.get_territories())
+        node = registry.find(nodeid)
         # Node not found.
         if node == None:
             print("\nNode with such id not found!")
@@ -795,7 +666,7 @@ def rand_deploy_phase(curr_player):
 
     print("\nDone deploying troops.\n")
 
-def rand_attack_phase(curr_player, order): 
+def rand_attack_phase(curr_player, order, rng=None): 
     global statespace
     print("\nATTACK.\n")
 
@@ -816,22 +687,27 @@ def rand_attack_phase(curr_player, order):
 
     #ENTER CODE
     state = statespace.get_pointer()
+    if len(state.get_children()) == 0:
+        # The searched tree ends here; search again from the current board.
+        init_state_space(curr_player, order[0])
+        state = statespace.get_pointer()
+        if len(state.get_children()) == 0:
+            print("No attack is likely enough to succeed!")
+            return
     print('first pointer:', statespace.get_pointer())
     #pick random child (prob of winning the territory is still above threshold)
     c = state.get_children()[0]
     from_id, to_id = c.get_move()
     print('random-- children:', state.get_children(), 'move:', c.get_move())
-    statespace.set_pointer(c)
-    from_node = find_node(from_id,all_nodes_sorted)
-    to_node = find_node(to_id,all_nodes_sorted)
+    from_node = registry.find(from_id)
+    to_node = registry.find(to_id)
     print(from_id, territories(curr_color, continents))
     print(state.get_current_player().get_color())
     print("HULLO2")
     print(from_node.get_owner(), from_node)
     print(to_node.get_owner(), to_node)
-    print('new pointer:', statespace.get_pointer())
 
-    from_node = find_node(from_id, territories(curr_color, continents))
+    from_node = registry.find_owned(from_id, curr_color)
     if from_node == None:
         print(
             "You don't own a territory with such id! Please enter id of a territory you own!")
@@ -862,8 +738,9 @@ def rand_attack_phase(curr_player, order):
             else:
                 # Once set to True, [get_card] stays True.
                 # However, blitz_attack() should be called in any case in order to make changes.
-                if not blitz_attack(from_node, to_node) :
-                    init_state_space(curr_player, order[0])
+                blitz_attack(from_node, to_node, rng)
+                follow_battle(curr_player, order[0], from_node.get_id(),
+                              to_node.get_id())
 
 
 
@@ -876,7 +753,11 @@ def rand_attack_phase(curr_player, order):
 # print(Europe.nodes)
 
 
-def play_random():
+def play_random(rng=None):
+    # [rng] is the GameRandom stream of this game (the global one if None).
+    global search_pool
+    if rng is None:
+        rng = global_random
     # Initialize players.
     
     red = Player(Color.RED, INITIAL_TROOPS, [], [])
@@ -884,10 +765,13 @@ def play_random():
 
     # Randomize order.
     order = [red, blue]
-    random.shuffle(order)
+    rng.shuffle(order)
 
-    claim_territories(order, all_nodes.copy())
-    initialize_troops(order, all_nodes.copy())
+    # Claim territories in an order drawn from the game's own stream.
+    claim_order = all_nodes.copy()
+    rng.shuffle(claim_order)
+    claim_territories(order, claim_order)
+    initialize_troops(order, all_nodes.copy(), rng)
     # Ensure there are no unowned nodes.
     for continent in continents:
         for node in continent.get_nodes():
@@ -896,37 +780,47 @@ def play_random():
     # territory_ids = curr_player.get_territories()
     game_over = False
     first_turn = True
+    if PARALLEL:
+        search_pool = SearchPool(all_nodes_sorted, continents, WORKERS)
     # while not game_over:
-    for i in range (2):
-        # Remove defeated players.
-        order = remove_defeated(order)
-        # Check if there's a victor.
-        if len(order) == 1:
-            col = str(order[0].get_color())
-            print("\n\n%s Player won! Congratulations!\n\n" %
-               col )
-            game_over = True
-            return (col == 'red')
-        # Make a turn.
-        else:
-            # Check if at least one player can attack.
-            if not check_attack_everyone(order, continents):
-                print("\n\nNo one can attack on this turn!\n\n")
-                # game_over = True
-            curr_player = order.pop(0)
-            order.append(curr_player)
-            print("\nCurrent player: %s.\n" % str(curr_player.get_color()))
-            # set_continent_owners(continents)
-            if (first_turn):
-                     all_nodes.sort(key = lambda x: x.get_id())
-                     init_state_space(curr_player, order[0])
-                     first_turn = False
-            if (curr_player.get_color() == Color.RED):
-                # ai_deploy_phase(curr_player)
-                ai_attack_phase(curr_player, order)
-            else: 
-                # rand_deploy_phase(curr_player)
-                rand_attack_phase(curr_player, order)
+    try:
+        for i in range (2):
+            # Remove defeated players.
+            order = remove_defeated(order, continents, rng)
+            # Check if there's a victor.
+            if len(order) == 1:
+                col = str(order[0].get_color())
+                print("\n\n%s Player won! Congratulations!\n\n" %
+                   col )
+                game_over = True
+                return (col == 'red')
+            # Make a turn.
+            else:
+                # Check if at least one player can attack.
+                if not check_attack_everyone(order, continents):
+                    print("\n\nNo one can attack on this turn!\n\n")
+                    # game_over = True
+                curr_player = order.pop(0)
+                order.append(curr_player)
+                print("\nCurrent player: %s.\n" % str(curr_player.get_color()))
+                # set_continent_owners(continents)
+                if (first_turn):
+                         all_nodes.sort(key = lambda x: x.get_id())
+                         init_state_space(curr_player, order[0])
+                         first_turn = False
+                if (curr_player.get_color() == Color.RED):
+                    # ai_deploy_phase(curr_player, rng)
+                    if MCTS_AI:
+                        mcts_attack_phase(curr_player, order, rng)
+                    else:
+                        ai_attack_phase(curr_player, order, rng)
+                else: 
+                    # rand_deploy_phase(curr_player, rng)
+                    rand_attack_phase(curr_player, order, rng)
+    finally:
+        if search_pool is not None:
+            search_pool.close()
+            search_pool = None
 
 
 
@@ -936,15 +830,43 @@ count = 0
 PROB_THRESHOLD  = 0.9 
 ITERATIONS = 1
 INITIAL_TROOPS = 70
-MAX_DEPTH = 3
-ai_wins = 0
-ai_losses = 0
-statespace = Statespace()
-for i in range(ITERATIONS):
-    if (play_random()):
-        ai_wins += 1
-    else:
-        ai_losses += 1
-win_rate = ai_wins / ITERATIONS
-print("The AI won ", ai_wins, " times out of", ITERATIONS, "giving it a win rate of", win_rate, "%")
-
+MAX_DEPTH = 6
+# Time budget of a search in seconds, or None to always search to MAX_DEPTH.
+MOVE_TIME = 1.0
+# If True, the AI searches with expectimax over blitz results instead of
+# assuming that attacks above PROB_THRESHOLD succeed.
+EXPECTIMAX = False
+# If True, the AI attacks with Monte Carlo tree search, using at most
+# MCTS_ITERATIONS playouts (and MOVE_TIME seconds) per attack.
+MCTS_AI = False
+MCTS_ITERATIONS = 2000
+# If True, the AI's alpha-beta and MCTS searches are split across a pool of
+# WORKERS processes (one per CPU if None, see parallel.SearchPool), started
+# once per game.
+PARALLEL = False
+WORKERS = None
+# Memory cap of the transposition table kept between searches, in bytes.
+TT_BYTES = 16 * 2**20
+# Position evaluation of the alpha-beta search, by name (see
+# evaluation.EVALUATORS): "troops" is the fastest, "full" the most detailed.
+EVALUATOR = "troops"
+statespace = StateTree()
+# Hash of the board, kept up to date on every change (the same keys as the
+# search's, see search.SearchBoard.key()).
+graph_hash = GraphHash(all_nodes_sorted)
+# The process pool of the game being played, if PARALLEL.
+search_pool = None
+transposition_table = TranspositionTable(TT_BYTES)
+expectimax_table = TranspositionTable(TT_BYTES)
+
+
+if __name__ == "__main__":
+    ai_wins = 0
+    ai_losses = 0
+    for i in range(ITERATIONS):
+        if (play_random()):
+            ai_wins += 1
+        else:
+            ai_losses += 1
+    win_rate = ai_wins / ITERATIONS
+    print("The AI won ", ai_wins, " times out of", ITERATIONS, "giving it a win rate of", win_rate, "%")
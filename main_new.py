@@ -885,7 +885,9 @@ def play_random():
     order = [red, blue]
     random.shuffle(order)
 
-    claim_territories(order, all_nodes.copy())
+    claim_order = all_nodes.copy()
+    random.shuffle(claim_order)
+    claim_territories(order, claim_order)
     initialize_troops(order, all_nodes.copy())
     # Ensure there are no unowned nodes.
     for continent in continents:
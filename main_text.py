@@ -1,4 +1,3 @@
-import random
 import time
 
 from card import *
@@ -6,9 +5,21 @@ from color import Color
 from continent import *
 from path import path_exists
 from player import Player
+from rules import (calculate_troops_gained, check_attack, claim_territories,
+                   initialize_troops, territories)
+from rng import GameRandom
 from roll import blitz
+from sampler import sample_blitz
 
 
+# If True, blitz attacks draw their result from precomputed outcome tables
+# instead of rolling (and printing) every die.
+FAST_COMBAT = False
+
+# The dice and shuffles of this game. Every roll is printed; pass quiet=True
+# for a silent game.
+game_random = GameRandom(quiet=False)
+
 # Initialize players.
 initial_troops = 30
 red_player = Player(Color.RED, initial_troops, [])
@@ -20,115 +31,24 @@ purple_player = Player(Color.PURPLE, initial_troops, [])
 
 # Randomize order.
 order = [red_player, blue_player, green_player, yellow_player]
-random.shuffle(order)
-
-
-def territories(color, continents):
-    '''Returns a list of territories (Node list) owned by a player with a
-    given color in the given continent list (can be empty).'''
-    res = []
-    for continent in continents:
-        for node in continent.get_nodes():
-            if node.get_owner() == color:
-                res.append(node)
-    return res
-
-
-def find_player(color, player_lst):
-    '''Returns the player from [player_lst] with a given color. Raises
-    ValueError if not found.'''
-    for player in player_lst:
-        if player.get_color() == color:
-            return player
-    raise ValueError('Player with color %s not found!' % str(color))
-
-
-# WARNING: this function changes both [order] and [nodes].
-def claim_territories(order, nodes):
-    '''Gives territories for a given [order] in a given territories.'''
-    while len(nodes) > 0:
-        # Select the next player in the queue.
-        curr_player = order.pop(0)
-        order.append(curr_player)
-        if curr_player.get_troops() == 0:
-            continue
-        # Get necessary information and pop the first node from [nodes].
-        curr_color = curr_player.get_color()
-        curr_node = nodes.pop(0)
-        assert curr_node.get_troops() == -1, "Non-empty territory during claim!"
-        # Set ownership and subtract troops.
-        curr_node.set_owner(curr_color)
-        curr_node.set_troops(1)
-        curr_player.subtract_troops(1)
-    return
-
-
-def initialize_troops(order, nodes):
-    # WARNING: this function changes both [order] and [nodes].
-    '''Initializes troops using a given order in given node list.'''
-    total_remaining_troops = 0
-    for player in order:
-        total_remaining_troops += player.get_troops()
-    while total_remaining_troops > 0:
-        # Pop the first node from the queue and put it at the end.
-        curr_node = nodes.pop(0)
-        nodes.append(curr_node)
-        curr_color = curr_node.get_owner()
-        # Find player with a given color.
-        curr_player = find_player(curr_color, order)
-        # Add a random number or, if the player doesn't have enough troops,
-        # the remaining troops to the territory
-        assigned_troops = min(random.randint(0, 5), curr_player.get_troops())
-        curr_node.add_troops(assigned_troops)
-        curr_player.subtract_troops(assigned_troops)
-        total_remaining_troops -= assigned_troops
-
-
-def remove_defeated(player_lst):
-    '''Removes players with no territories from the given player list.
-    Returns a new player list without the defeated players.
-
-    Preconditions: no duplicates in [player_lst].'''
-    res = []
-    for i in range(len(player_lst)):
-        player = player_lst[i]
-        if len(territories(player.get_color(), continents)) > 0:
-            res.append(player)
-        else:
-            print("\n%s Player has been defeated!\n" %
-                  str(player.get_color()))
-    return res
-
-
-def check_attack(color, continents):
-    '''Checks if the player with a given color can perform an attack.
-    Returns a boolean.'''
-    # First, check if there is at least one node where the player has more
-    # than one unit. Next, for each node with more than 1 troop, check if there
-    # are any adjacent enemy territories that could be attacked.
-    for node in territories(color, continents):
-        if node.get_troops() > 1 and len(node.attack_options()) > 0:
-            return True
-    return False
-
-
-def check_attack_everyone(order, continents):
-    '''Runs check_attack() on every remaining player to make sure at least
-    one player can attack.'''
-    for player in order:
-        if check_attack(player.get_color(), continents):
-            return True
-    return False
+game_random.shuffle(order)
 
 
-def blitz_attack(from_node, to_node):
+def blitz_attack(from_node, to_node, rng=None):
     '''Conducts blitz attack between the two nodes and changes the results.
     Returns a boolean representing whether attack was successful or not.
 
+    [rng] is the GameRandom stream for the dice (game_random if None).
+
     Preconditions: from_node.get_troops() > 1 and to_node.get_troops() > 0;
         the nodes have two different owners.'''
+    if rng is None:
+        rng = game_random
 
-    blitz_res = blitz(from_node.get_troops(), to_node.get_troops())
+    if FAST_COMBAT:
+        blitz_res = sample_blitz(from_node.get_troops(), to_node.get_troops(), rng)
+    else:
+        blitz_res = blitz(from_node.get_troops(), to_node.get_troops(), rng)
 
     if blitz_res[0] == 1:
         print("Attack unsuccessful! You now have 1 troop in " + from_node.get_name() + ". The " + str(to_node.get_owner()) +
@@ -201,30 +121,6 @@ def blitz_attack(from_node, to_node):
         raise ValueError("Wrong results for blitz: (%i, %i)" % blitz_res)
 
 
-def calculate_troops_gained(curr_color, continents, print_details=False):
-    '''Calculates the number of troops gained by the player with a given color
-    in the beginning of their turn.
-    Returns the number of gained troops (int), the number of territories owned
-    by the player (int), and the list of continents owned by the player
-    (Continent list).'''
-    continents_owned = []
-    territories_owned = len(territories(curr_color, continents))
-    territory_bonus = max(territories_owned//3, 3)
-    troops_gained = 0
-    troops_gained += territory_bonus
-    for continent in continents:
-        if continent.get_owner() == curr_color:
-            continents_owned.append(continent)
-            bonus = continent.get_bonus()
-            troops_gained += bonus
-            if print_details:
-                print("%i troops for %s," % (bonus, continent.get_name()))
-    if print_details:
-        print("%i troops for %i territories." %
-              (territory_bonus, territories_owned))
-    return troops_gained, territories_owned, continents_owned
-
-
 def print_continent_list(continent_lst):
     '''Helper function for deploy_phase(). Returns a string.'''
     size = len(continent_lst)
@@ -253,22 +149,6 @@ def request_input(input_type, msg):
             print("Invalid input!")
 
 
-def set_continent_owners(continents):
-    '''Checks if any of the continents is owned by a single color and
-    sets owners if there are ones.'''
-    for continent in continents:
-        single_owner = True
-        node_lst = continent.get_nodes()
-        possible_owner = node_lst[0].get_owner()
-        for node in node_lst[1:]:
-            if node.get_owner() != possible_owner:
-                single_owner = False
-                continent.demonopolize()
-                break
-        if single_owner:
-            continent.monopolize(possible_owner)
-
-
 def deploy_phase(curr_player):
     print("\nDEPLOY.\n")
 
@@ -282,7 +162,7 @@ def deploy_phase(curr_player):
         best_hand = curr_player.decide()
         # Used cards are added to the deck in random locations.
         for card in best_hand:
-            all_cards.insert(random.randint(0, len(all_cards)), card)
+            all_cards.insert(game_random.randint(0, len(all_cards)), card)
         bonus_troops += curr_player.use_cards(best_hand)
 
     elif len(curr_player.possible_combos()) > 0:
@@ -295,7 +175,7 @@ def deploy_phase(curr_player):
                 print("\nYou used your bonus cards.")
                 # Used cards are added to the deck in random locations.
                 for card in best_hand:
-                    all_cards.insert(random.randint(0, len(all_cards)), card)
+                    all_cards.insert(game_random.randint(0, len(all_cards)), card)
                 bonus_troops += curr_player.use_cards(best_hand)
                 break
             elif card_use == -1:
@@ -324,7 +204,7 @@ def deploy_phase(curr_player):
               curr_player.get_troops())
         # Ask for a node id.
         nodeid = request_input(int, msg_1)
-        node = find_node(nodeid, all_nodes_sorted)
+        node = registry.find(nodeid)
         # Node not found.
         if node == None:
             print("\nNode with such id not found!")
@@ -370,7 +250,7 @@ def attack_phase(curr_player):
         if from_id == -1:
             break
 
-        from_node = find_node(from_id, territories(curr_color, continents))
+        from_node = registry.find_owned(from_id, curr_color)
         if from_node == None:
             print(
                 "You don't own a territory with such id! Please enter id of a territory you own!")
@@ -442,7 +322,7 @@ def fortify_phase(curr_player):
         if from_id == -1:
             break
         # Find the node from which to take troops.
-        from_node = find_node(from_id, territories(curr_color, continents))
+        from_node = registry.find_owned(from_id, curr_color)
         if from_node == None:
             print(
                 "\nYou don't own a territory with such id! Please enter id of a territory you own!\n")
@@ -457,7 +337,7 @@ def fortify_phase(curr_player):
             # Check if get back.
             if to_id == -1:
                 continue
-            to_node = find_node(to_id, territories(curr_color, continents))
+            to_node = registry.find_owned(to_id, curr_color)
             if to_node == None:
                 print(
                     "\nYou don't own a territory with such id! Please enter id of a territory you own!\n")
@@ -496,8 +376,11 @@ def fortify_phase(curr_player):
 
 
 
-claim_territories(order, all_nodes.copy())
-initialize_troops(order, all_nodes.copy())
+# Territories are claimed in an order drawn from the game's stream.
+claim_order = all_nodes.copy()
+game_random.shuffle(claim_order)
+claim_territories(order, claim_order)
+initialize_troops(order, all_nodes.copy(), game_random)
 # Ensure there are no unowned nodes.
 for continent in continents:
     for node in continent.get_nodes():
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+
+
+# Map files are JSON documents of the form
+#   {"name": ..., "continents": [{"name": ..., "bonus": ...}, ...],
+#    "territories": [{"id": ..., "name": ..., "continent": ...,
+#                     "card": "INFANTRY", "location": [x, y]}, ...],
+#    "edges": [[id1, id2], ...]}
+# They are compiled once into flat, index-based lists and the result is
+# cached next to the map in __pycache__ as plain JSON, keyed by a hash of
+# the map file, so later starts skip the checks and the edge resolution.
+
+MAPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
+CLASSIC_MAP = os.path.join(MAPS_DIR, "classic.json")
+
+# Bump when the layout of compiled maps changes to invalidate old caches.
+COMPILED_FORMAT = 2
+
+
+def compile_spec(spec):
+    '''
+    Compiles a map [spec] (dict in the map file format) into a dict of flat
+    lists. Territory i (in increasing id order) has ids[i], names[i],
+    continent_of[i] (index into continents), cards[i] (Troop name or None),
+    locations[i] and neighbors[i] (sorted list of territory indices).
+    continents is a list of (name, bonus, sorted member indices) tuples.
+    Raises ValueError if the spec is inconsistent.
+    '''
+    continent_index = {}
+    continents = []
+    for continent in spec["continents"]:
+        if continent["name"] in continent_index:
+            raise ValueError("Duplicate continent: %s" % continent["name"])
+        continent_index[continent["name"]] = len(continents)
+        continents.append((continent["name"], continent["bonus"], []))
+
+    territories = sorted(spec["territories"], key=lambda t: t["id"])
+    index = {}
+    names = set()
+    for i, territory in enumerate(territories):
+        if territory["id"] in index or territory["name"] in names:
+            raise ValueError("Duplicate territory: %s" % territory["name"])
+        if territory["continent"] not in continent_index:
+            raise ValueError("Unknown continent for %s: %s" % (
+                territory["name"], territory["continent"]))
+        index[territory["id"]] = i
+        names.add(territory["name"])
+
+    neighbors = [set() for _ in territories]
+    for id1, id2 in spec["edges"]:
+        if id1 not in index or id2 not in index or id1 == id2:
+            raise ValueError("Invalid edge: (%s, %s)" % (id1, id2))
+        neighbors[index[id1]].add(index[id2])
+        neighbors[index[id2]].add(index[id1])
+
+    continent_of = []
+    for i, territory in enumerate(territories):
+        k = continent_index[territory["continent"]]
+        continent_of.append(k)
+        continents[k][2].append(i)
+
+    return {
+        "format": COMPILED_FORMAT,
+        "name": spec.get("name", ""),
+        "ids": [t["id"] for t in territories],
+        "names": [t["name"] for t in territories],
+        "continent_of": continent_of,
+        "cards": [t.get("card") for t in territories],
+        "locations": [tuple(t.get("location", (0, 0))) for t in territories],
+        "neighbors": [sorted(n) for n in neighbors],
+        "continents": continents,
+    }
+
+
+def cache_path(path):
+    '''Returns the path of the compiled cache for the map file [path].'''
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__",
+                        os.path.splitext(filename)[0] + ".compiled.json")
+
+
+def _from_json(compiled):
+    '''Restores the tuples of a compiled map read back from JSON.'''
+    compiled["locations"] = [tuple(location)
+                             for location in compiled["locations"]]
+    compiled["continents"] = [tuple(continent)
+                              for continent in compiled["continents"]]
+    return compiled
+
+
+def load_compiled(path=CLASSIC_MAP, use_cache=True):
+    '''
+    Returns the compiled form (see compile_spec()) of the map file [path].
+    The compiled map is read from the on-disk cache if it was compiled from
+    a map file with the same SHA-256 hash, and written there otherwise. The
+    cache is plain JSON, so a tampered cache can't run code. Failing to
+    write the cache (e.g. on a read-only install) is not an error.
+    '''
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    cached = cache_path(path)
+    if use_cache:
+        try:
+            with open(cached) as f:
+                saved = json.load(f)
+            if (saved.get("source") == digest
+                    and saved["compiled"].get("format") == COMPILED_FORMAT):
+                return _from_json(saved["compiled"])
+        except (OSError, ValueError, KeyError, AttributeError, TypeError):
+            pass
+
+    compiled = compile_spec(json.loads(source))
+
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            with open(cached, "w") as f:
+                json.dump({"source": digest, "compiled": compiled}, f)
+        except OSError:
+            pass
+    return compiled
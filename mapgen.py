@@ -0,0 +1,167 @@
+import json
+import math
+import random
+
+from color import Color
+from continent import build_world
+from mapdata import compile_spec
+from node import Registry
+
+
+# Synthetic maps for scaling experiments. Territories sit on a jittered grid;
+# each one is joined to its right and lower neighbors plus one diagonal per
+# grid cell, which triangulates the grid and keeps the map planar. Continents
+# are grown from random seeds by breadth-first search, so every continent is
+# connected, as on the classic map.
+
+PLAYER_COLORS = [Color.RED, Color.BLUE, Color.GREEN, Color.YELLOW, Color.CYAN,
+                 Color.PURPLE]
+CARD_TYPES = ["INFANTRY", "CAVALRY", "ARTILLERY"]
+
+
+def generate_spec(num_territories, num_continents, bonus_per_territory=0.5,
+                  edge_drop=0.1, seed=None, width=1200, height=900):
+    '''
+    Generates a random map in the map file format of mapdata.py.
+    [num_territories] territories are split into [num_continents] connected
+    continents whose bonus is round([bonus_per_territory] * size), at least 1.
+    A fraction [edge_drop] of the diagonal edges is left out so that not every
+    territory has the same degree.
+    Returns the map spec (dict).
+
+    Preconditions: 1 <= [num_continents] <= [num_territories].
+    '''
+    if not 1 <= num_continents <= num_territories:
+        raise ValueError("Need between 1 and %i continents!" % num_territories)
+    rng = random.Random(seed)
+
+    cols = max(1, int(math.ceil(math.sqrt(num_territories * width / height))))
+    rows = int(math.ceil(num_territories / cols))
+    cell_w = width / cols
+    cell_h = height / rows
+
+    def cell(i):
+        return i % cols, i // cols
+
+    def index(c, r):
+        i = r * cols + c
+        if c < cols and r < rows and i < num_territories:
+            return i
+        return None
+
+    # Positions and edges on the grid.
+    locations = []
+    for i in range(num_territories):
+        c, r = cell(i)
+        x = (c + 0.5 + rng.uniform(-0.3, 0.3)) * cell_w
+        y = (r + 0.5 + rng.uniform(-0.3, 0.3)) * cell_h
+        locations.append([int(x), int(y)])
+
+    edges = []
+    neighbors = [[] for _ in range(num_territories)]
+
+    def connect(i, j):
+        edges.append([i + 1, j + 1])
+        neighbors[i].append(j)
+        neighbors[j].append(i)
+
+    for i in range(num_territories):
+        c, r = cell(i)
+        right = index(c + 1, r)
+        down = index(c, r + 1)
+        if right is not None:
+            connect(i, right)
+        if down is not None:
+            connect(i, down)
+        # One of the two diagonals of the cell to the lower right.
+        if right is not None and down is not None and rng.random() >= edge_drop:
+            diagonal = index(c + 1, r + 1)
+            if diagonal is not None and rng.random() < 0.5:
+                connect(i, diagonal)
+            else:
+                connect(right, down)
+
+    # Grow continents from random seeds.
+    seeds = rng.sample(range(num_territories), num_continents)
+    continent_of = [None] * num_territories
+    frontier = []
+    for k, s in enumerate(seeds):
+        continent_of[s] = k
+        frontier.append(s)
+    while frontier:
+        i = frontier.pop(rng.randrange(len(frontier)))
+        for j in neighbors[i]:
+            if continent_of[j] is None:
+                continent_of[j] = continent_of[i]
+                frontier.append(j)
+
+    sizes = [0] * num_continents
+    for k in continent_of:
+        sizes[k] += 1
+    continents = []
+    for k in range(num_continents):
+        continents.append({"name": "Continent %i" % (k + 1),
+                           "bonus": max(1, int(round(bonus_per_territory * sizes[k])))})
+
+    territories = []
+    for i in range(num_territories):
+        territories.append({
+            "id": i + 1,
+            "name": "Territory %i" % (i + 1),
+            "continent": continents[continent_of[i]]["name"],
+            "card": CARD_TYPES[i % 3],
+            "location": locations[i],
+        })
+
+    return {
+        "name": "generated-%i-%i" % (num_territories, num_continents),
+        "continents": continents,
+        "territories": territories,
+        "edges": edges,
+    }
+
+
+def save_spec(spec, path):
+    '''Writes a map [spec] to [path] so that mapdata.load_compiled() can read
+    it.'''
+    with open(path, "w") as f:
+        json.dump(spec, f)
+
+
+def deal(nodes, num_players, max_extra_troops=4, seed=None):
+    '''
+    Deals [nodes] round-robin in random order between the first
+    [num_players] colors of PLAYER_COLORS and puts 1 to 1+[max_extra_troops]
+    troops on each.
+    Returns the list of colors used.
+    '''
+    if not 1 <= num_players <= len(PLAYER_COLORS):
+        raise ValueError("Number of players has to be between 1 and %i!" %
+                         len(PLAYER_COLORS))
+    rng = random.Random(seed)
+    colors = PLAYER_COLORS[:num_players]
+    order = nodes.copy()
+    rng.shuffle(order)
+    for i, node in enumerate(order):
+        node.set_owner(colors[i % num_players])
+        node.set_troops(1 + rng.randint(0, max_extra_troops))
+    return colors
+
+
+def generate_world(num_territories, num_continents, num_players=None,
+                   bonus_per_territory=0.5, seed=None):
+    '''
+    Generates a map and builds it like continent.py builds the classic one.
+    If [num_players] is given, territories are also dealt between that many
+    players (see deal()).
+    Returns the list of Continent objects and the list of all nodes sorted
+        by id (continent.continents and continent.all_nodes_sorted), which
+        are in a Registry like continent.registry.
+    '''
+    spec = generate_spec(num_territories, num_continents, bonus_per_territory,
+                         seed=seed)
+    continents, nodes = build_world(compile_spec(spec))
+    Registry(nodes)
+    if num_players is not None:
+        deal(nodes, num_players, seed=seed)
+    return continents, nodes
@@ -0,0 +1,373 @@
+import math
+import random
+import time
+
+from odds import win_probability
+from sampler import sample_blitz
+from search import SearchBoard, board_continents
+
+
+# Monte Carlo tree search (UCT) over whole turns for any number of players.
+# A turn is a deploy action (all reinforcements on one territory), any number
+# of attacks, and at most one fortify action. Dice make the game stochastic,
+# so the tree is open-loop: a tree node stands for a sequence of actions, and
+# every iteration replays that sequence with freshly sampled blitz results.
+# Children whose action is not legal in the current sample are skipped.
+
+DEPLOY = "deploy"
+ATTACK = "attack"
+FORTIFY = "fortify"
+END = "end"
+
+# Exploration constant of UCT and the progressive widening schedule: a node
+# visited n times may have up to ceil(WIDENING_C * n**WIDENING_ALPHA)
+# children, tried in order of their prior.
+EXPLORATION = 0.7
+WIDENING_C = 1.5
+WIDENING_ALPHA = 0.5
+
+# Rollouts stop after this many turns and score the position instead.
+ROLLOUT_TURNS = 8
+
+
+class TurnState():
+
+    def __init__(self, owners, troops, neighbors, continents, order,
+                 phase=DEPLOY, reinforcements=None):
+        '''
+        Initiates a game position for search: [owners] and [troops] are
+        lists indexed by territory, [neighbors] the neighbor index lists and
+        [continents] a list of (bonus, territory indices). [order] is the
+        list of colors still in the game, the first one to move. [phase] is
+        the phase of the current turn; [reinforcements] are the troops still
+        to deploy (computed if None). The lists [owners], [troops] and
+        [order] are changed in place by apply().
+        '''
+        self.owners = owners
+        self.troops = troops
+        self.neighbors = neighbors
+        self.continents = continents
+        self.order = order
+        self.phase = phase
+        self.reinforcements = reinforcements
+        if reinforcements is None:
+            self.reinforcements = self.troops_gained(order[0])
+
+    def copy(self):
+        return TurnState(self.owners.copy(), self.troops.copy(), self.neighbors,
+                         self.continents, self.order.copy(), self.phase,
+                         self.reinforcements)
+
+    def player(self):
+        '''Returns the color to move.'''
+        return self.order[0]
+
+    def troops_gained(self, color):
+        '''Same rule as rules.calculate_troops_gained().'''
+        owners = self.owners
+        res = max(owners.count(color) // 3, 3)
+        for bonus, members in self.continents:
+            if all(owners[i] == color for i in members):
+                res += bonus
+        return res
+
+    def is_over(self):
+        return len(self.order) == 1
+
+    def actions(self):
+        '''Returns the legal actions of the player to move as a list of
+        (prior, action) sorted best first.'''
+        color = self.order[0]
+        owners = self.owners
+        troops = self.troops
+        res = []
+        if self.phase == DEPLOY:
+            own = [i for i, owner in enumerate(owners) if owner == color]
+            border = [i for i in own
+                      if any(owners[j] != color for j in self.neighbors[i])]
+            for i in border or own:
+                enemies = sum(troops[j] for j in self.neighbors[i]
+                              if owners[j] != color)
+                res.append((enemies / (troops[i] + self.reinforcements),
+                            (DEPLOY, i)))
+        elif self.phase == ATTACK:
+            res.append((0.5, (END,)))
+            for i, owner in enumerate(owners):
+                if owner != color or troops[i] < 2:
+                    continue
+                for j in self.neighbors[i]:
+                    if owners[j] != color:
+                        res.append((win_probability(troops[i], troops[j]),
+                                    (ATTACK, i, j)))
+        else:
+            res.append((1.0, (END,)))
+            for i, owner in enumerate(owners):
+                if owner != color or troops[i] < 2:
+                    continue
+                if all(owners[j] == color for j in self.neighbors[i]):
+                    for j in self.neighbors[i]:
+                        res.append((troops[i] / 100, (FORTIFY, i, j)))
+        res.sort(key=lambda item: -item[0])
+        return res
+
+    def is_legal(self, action):
+        color = self.order[0]
+        kind = action[0]
+        if kind == END:
+            return self.phase != DEPLOY
+        if kind == DEPLOY:
+            return self.phase == DEPLOY and self.owners[action[1]] == color
+        i, j = action[1], action[2]
+        if self.owners[i] != color or self.troops[i] < 2:
+            return False
+        if kind == ATTACK:
+            return self.phase == ATTACK and self.owners[j] != color
+        return self.phase == FORTIFY and self.owners[j] == color
+
+    def apply(self, action, rng):
+        '''Plays [action] (assumed legal); blitz results are drawn with
+        [rng].'''
+        kind = action[0]
+        owners = self.owners
+        troops = self.troops
+        if kind == DEPLOY:
+            troops[action[1]] += self.reinforcements
+            self.reinforcements = 0
+            self.phase = ATTACK
+        elif kind == ATTACK:
+            i, j = action[1], action[2]
+            attack_left, defense_left = sample_blitz(troops[i], troops[j], rng)
+            if defense_left == 0:
+                defender = owners[j]
+                owners[j] = owners[i]
+                troops[j] = attack_left - 1
+                troops[i] = 1
+                if defender not in owners:
+                    self.order.remove(defender)
+            else:
+                troops[i] = attack_left
+                troops[j] = defense_left
+        elif kind == FORTIFY:
+            i, j = action[1], action[2]
+            troops[j] += troops[i] - 1
+            troops[i] = 1
+            self.next_turn()
+        elif self.phase == ATTACK:
+            self.phase = FORTIFY
+        else:
+            self.next_turn()
+
+    def next_turn(self):
+        self.order.append(self.order.pop(0))
+        self.phase = DEPLOY
+        self.reinforcements = self.troops_gained(self.order[0])
+
+    def rollout(self, rng, max_turns=ROLLOUT_TURNS):
+        '''Plays on with a fast random policy: deploy on a random border
+        territory, attack from random territories with at least two troops
+        more than the defender, don't fortify. Stops when the game is over or
+        after [max_turns] turns.'''
+        neighbors = self.neighbors
+        owners = self.owners
+        troops = self.troops
+        for _ in range(max_turns):
+            if len(self.order) == 1:
+                return
+            color = self.order[0]
+            if self.phase == DEPLOY:
+                border = [i for i, owner in enumerate(owners) if owner == color
+                          and any(owners[j] != color for j in neighbors[i])]
+                if border:
+                    self.apply((DEPLOY, rng.choice(border)), rng)
+            if self.phase == ATTACK:
+                while len(self.order) > 1:
+                    options = [(i, j) for i, owner in enumerate(owners)
+                               if owner == color and troops[i] > 2
+                               for j in neighbors[i]
+                               if owners[j] != color and troops[i] > troops[j] + 2]
+                    if not options:
+                        break
+                    i, j = rng.choice(options)
+                    self.apply((ATTACK, i, j), rng)
+            self.next_turn()
+
+    def rewards(self):
+        '''Returns a dictionary from every color still in the game to its
+        reward in [0, 1]: 1 for the winner, otherwise the average of its
+        share of territories and its share of troops.'''
+        if len(self.order) == 1:
+            return {self.order[0]: 1.0}
+        total_troops = sum(troops for troops in self.troops if troops > 0)
+        res = {}
+        for color in self.order:
+            territories = self.owners.count(color) / len(self.owners)
+            troops = sum(t for owner, t in zip(self.owners, self.troops)
+                         if owner == color) / total_troops
+            res[color] = (territories + troops) / 2
+        return res
+
+
+class MCTSNode():
+
+    def __init__(self, action=None, parent=None, player=None):
+        ''' Initiates a tree node reached by [action] of [player] (Color
+        object) from [parent]. [value] sums the rewards of [player] over
+        the [visits] through the node. [untried] holds the actions not yet
+        expanded, best prior first, once the node has been visited.'''
+        self.action = action
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.value = 0.0
+
+
+class MCTS():
+
+    def __init__(self, position, seed=None, exploration=EXPLORATION):
+        '''
+        Initiates a search from [position] (TurnState, not changed). Blitz
+        results are drawn from a random.Random([seed]) stream, so a seeded
+        search is reproducible. [iterations] counts the playouts so far.
+        [board] is the SearchBoard the position was built from, if any (see
+        from_nodes()), to map territory indices back to ids.
+        '''
+        self.position = position
+        self.board = None
+        self.root = MCTSNode(player=None)
+        self.rng = random.Random(seed)
+        self.exploration = exploration
+        self.iterations = 0
+
+    @classmethod
+    def from_nodes(cls, nodes, continents, order, phase=DEPLOY,
+                   reinforcements=None, seed=None):
+        '''Builds a search from the current owners and troops of [nodes],
+        [continents] (Continent objects) and [order] (colors, the first one
+        to move).'''
+        board = SearchBoard.from_nodes(nodes)
+        position = TurnState(board.owners, board.troops, board.neighbors,
+                             board_continents(board, continents), list(order),
+                             phase, reinforcements)
+        res = cls(position, seed)
+        res.board = board
+        return res
+
+    def select(self, node, position):
+        '''Returns the next node below [node] for [position]: a new child
+        if progressive widening allows one more, else the legal child with
+        the best UCT score. Returns None if no action is legal.'''
+        if node.untried is None:
+            node.untried = [action for _, action in position.actions()]
+        allowed = math.ceil(WIDENING_C * (node.visits + 1) ** WIDENING_ALPHA)
+        while node.untried and len(node.children) < allowed:
+            action = node.untried.pop(0)
+            if position.is_legal(action):
+                child = MCTSNode(action, node, position.player())
+                node.children.append(child)
+                return child
+        best = None
+        best_score = -1.0
+        log_visits = math.log(node.visits + 1)
+        for child in node.children:
+            if not position.is_legal(child.action):
+                continue
+            if child.visits == 0:
+                return child
+            score = child.value / child.visits + \
+                self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best = child
+                best_score = score
+        if best is None:
+            # Nothing expanded is legal in this sample: take the next untried
+            # legal action, if any.
+            while node.untried:
+                action = node.untried.pop(0)
+                if position.is_legal(action):
+                    child = MCTSNode(action, node, position.player())
+                    node.children.append(child)
+                    return child
+        return best
+
+    def iterate(self):
+        '''Runs one playout: selection and expansion along the tree, a
+        rollout, and backpropagation of the rewards.'''
+        position = self.position.copy()
+        node = self.root
+        path = [node]
+        while not position.is_over():
+            child = self.select(node, position)
+            if child is None:
+                break
+            position.apply(child.action, self.rng)
+            node = child
+            path.append(node)
+            if child.visits == 0:
+                break
+        position.rollout(self.rng)
+        rewards = position.rewards()
+        for node in path:
+            node.visits += 1
+            if node.player is not None:
+                node.value += rewards.get(node.player, 0.0)
+        self.iterations += 1
+
+    def run(self, iterations=None, time_budget=None):
+        '''Runs playouts until [iterations] more were made or [time_budget]
+        seconds have passed (whichever comes first; at least one must be
+        given), and can be called again to continue.
+        Returns the best action so far (see best_action()).'''
+        if iterations is None and time_budget is None:
+            raise ValueError("Need an iteration or a time budget!")
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            self.iterate()
+            done += 1
+        return self.best_action()
+
+    def best_action(self):
+        '''Returns the most visited action at the root, or None if there was
+        no playout yet.'''
+        best = None
+        for child in self.root.children:
+            if best is None or child.visits > best.visits:
+                best = child
+        return best.action if best is not None else None
+
+
+def attack_phase(iterations=200, time_budget=None, max_attacks=20):
+    '''
+    Returns an attack phase for engine.Game.play_turn() that, before every
+    attack, searches the position with a fresh MCTS (with [iterations]
+    playouts or [time_budget] seconds) and stops when ending the attack
+    phase is best or after [max_attacks] attacks. The [iterations]
+    attribute of the returned function counts all playouts made.
+    '''
+    def attack(game, player):
+        conquered = False
+        order = [p.get_color() for p in game.get_order()]
+        # play_turn() has already moved the player to the back.
+        order.remove(player.get_color())
+        order.insert(0, player.get_color())
+        for _ in range(max_attacks):
+            search = MCTS.from_nodes(game.get_nodes(), game.get_continents(),
+                                     order, ATTACK, 0,
+                                     game.rng.getrandbits(32))
+            action = search.run(iterations, time_budget)
+            attack.iterations += search.iterations
+            if action is None or action[0] != ATTACK:
+                break
+            board = search.board
+            from_node = game.find(board.ids[action[1]])
+            to_node = game.find(board.ids[action[2]])
+            conquered = game.attack(from_node, to_node) or conquered
+            order = [color for color in order
+                     if len(game.territories(color)) > 0]
+        return conquered
+    attack.iterations = 0
+    return attack
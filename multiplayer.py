@@ -0,0 +1,216 @@
+import time
+
+from color import Color
+from search import (AlphaBeta, SearchBoard, SearchTimeout,
+                    TranspositionTable)
+
+
+# Searches for games of more than two players. Each ply is a single attack
+# by the player to move, after which the next player in turn order moves;
+# players without territories are skipped. As in AlphaBeta, only attacks
+# above the threshold are considered, they are assumed to succeed, and a
+# move is worth its probability times the value of the position it leads
+# to.
+#
+# Paranoid search assumes that all other players gang up on the AI, which
+# makes the game a two-player one again, so alpha-beta and its table and
+# move ordering apply unchanged. Max^n lets every player maximize their own
+# troops instead: positions are worth a vector with one value per player,
+# and only shallow pruning is possible.
+
+
+def next_color(board, after, color):
+    '''Returns the first player after [color] in turn order ([after] maps
+    each player to the next one) that still has territories on [board]
+    ([color] itself if there is none).'''
+    nxt = after[color]
+    while nxt != color and board.territory_count(nxt) == 0:
+        nxt = after[nxt]
+    return nxt
+
+
+def _turn_order(order):
+    return {color: order[(k + 1) % len(order)]
+            for k, color in enumerate(order)}
+
+
+class Paranoid(AlphaBeta):
+
+    def __init__(self, board, order, ai_color=Color.RED, max_depth=4,
+                 threshold=0.9, table=None, ordering=True, pvs=True):
+        '''
+        Initiates a paranoid alpha-beta search on [board] (SearchBoard) for
+        the players of [order] (colors in turn order). [ai_color] maximizes
+        its troops and every other player minimizes them. The other
+        arguments and the counters are as for AlphaBeta; the [other]
+        argument of search() and iterate() is ignored.
+        '''
+        AlphaBeta.__init__(self, board, ai_color, max_depth, threshold, table,
+                           ordering, pvs)
+        self.order = list(order)
+        self.after = _turn_order(self.order)
+
+    def is_over(self, color, other):
+        # Over once the AI is out or owns everything.
+        count = self.board.territory_count(self.ai_color)
+        return count == 0 or count == len(self.board)
+
+    def turn_after(self, color, other):
+        nxt = next_color(self.board, self.after, color)
+        return nxt, next_color(self.board, self.after, nxt)
+
+
+class MaxN():
+
+    def __init__(self, board, order, max_depth=3, threshold=0.9,
+                 shallow=True):
+        '''
+        Initiates a max^n search on [board] (SearchBoard) for the players of
+        [order] (colors in turn order). A position is worth the vector of
+        the players' troops, in [order]; every player picks the move that
+        maximizes their own entry. Moves are tried most likely first, and
+        ties go to the first one.
+        If [shallow] is True, moves are cut off as soon as the player above
+        can no longer prefer them (shallow pruning): attacks never create
+        troops, so the entries of a vector never sum to more than the troops
+        on [board] now.
+        [nodes], [expanded] and [cutoffs] count the searched positions, the
+        ones with at least one move and the shallow cutoffs. [best_move] is
+        the best move (from index, to index) at the root of the last search.
+        Values are vectors, so unlike Paranoid this is not an AlphaBeta:
+        there is no table and no window.
+        '''
+        self.board = board
+        self.max_depth = max_depth
+        self.threshold = threshold
+        self.nodes = 0
+        self.expanded = 0
+        self.cutoffs = 0
+        self.best_move = None
+        # perf_counter() time at which to give up, if any (see iterate()).
+        self.deadline = None
+        self.order = list(order)
+        self.after = _turn_order(self.order)
+        self.position = {color: k for k, color in enumerate(self.order)}
+        self.shallow = shallow
+        self.max_sum = sum(board.troops)
+
+    def evaluate(self):
+        '''Returns the value vector of the board: the troops of every
+        player, in turn order.'''
+        counts = self.board.troop_counts
+        return tuple(counts.get(color, 0) for color in self.order)
+
+    def search(self, color, other=None, depth=0, bound=float("inf")):
+        '''
+        Searches the position with [color] to move, [depth] plies below the
+        root. [bound] is the value for [color] at which the player above
+        stops caring about this position (see __init__()).
+        Returns the value vector of the position; if it was cut off, the
+        entry of [color] is at least [bound] and the others may be too
+        high.
+        '''
+        self.nodes += 1
+        if (self.deadline is not None and self.nodes % 64 == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+        board = self.board
+        count = board.territory_count(color)
+        if depth >= self.max_depth or count == 0 or count == len(board):
+            return self.evaluate()
+        p = self.position[color]
+        best = None
+        best_move = None
+        moves = board.attack_moves(color, self.threshold)
+        moves.sort(key=lambda move: -move[2])
+        if len(moves) > 0:
+            self.expanded += 1
+        for from_i, to_i, l in moves:
+            board.make_attack(from_i, to_i)
+            child_bound = float("inf")
+            if self.shallow and best is not None:
+                # The child's value is scaled by [l], so is its bound.
+                child_bound = self.max_sum - best[p] / l
+            value = self.search(next_color(board, self.after, color), None,
+                                depth+1, child_bound)
+            board.unmake()
+            value = tuple(l * v for v in value)
+            if best is None or value[p] > best[p]:
+                best = value
+                best_move = (from_i, to_i)
+            if self.shallow and best[p] >= bound:
+                self.cutoffs += 1
+                break
+        if best is None:
+            # No attack available: the position is evaluated as it is.
+            best = self.evaluate()
+        if depth == 0:
+            self.best_move = best_move
+        return best
+
+    def iterate(self, color, other=None, time_budget=1.0, max_depth=None):
+        '''
+        Iterative deepening as in AlphaBeta.iterate(): searches the position
+        with [color] to move to depth 1, 2, ... up to [max_depth] (the depth
+        given at construction if None), until [time_budget] seconds have
+        passed, and abandons the iteration running out of time. [other] is
+        ignored. Without a table, iterations don't help each other, so this
+        only bounds the time.
+        Returns the value vector and the best move (from index, to index)
+        of the last completed iteration and its depth.
+        '''
+        if max_depth is None:
+            max_depth = self.max_depth
+        undo_length = len(self.board.undo_log)
+        value = None
+        move = None
+        completed = 0
+        self.deadline = time.perf_counter() + time_budget
+        try:
+            for depth in range(1, max_depth + 1):
+                self.max_depth = depth
+                value = self.search(color)
+                move = self.best_move
+                completed = depth
+        except SearchTimeout:
+            while len(self.board.undo_log) > undo_length:
+                self.board.unmake()
+        finally:
+            self.deadline = None
+            self.max_depth = max_depth
+        return value, move, completed
+
+
+def attack_phase(paranoid=True, max_depth=3, threshold=0.9,
+                 max_attacks=20):
+    '''
+    Returns an attack phase for engine.Game.play_turn() that, before every
+    attack, searches the position to [max_depth] with a fresh Paranoid
+    search (a MaxN one if [paranoid] is False) over the players still in the
+    game, and stops when there is no attack above [threshold] or after
+    [max_attacks] attacks. The [nodes] attribute of the returned function
+    counts all searched positions.
+    '''
+    def attack(game, player):
+        color = player.get_color()
+        conquered = False
+        for _ in range(max_attacks):
+            # play_turn() has already moved the player to the back.
+            order = [p.get_color() for p in game.get_order()]
+            order = order[-1:] + order[:-1]
+            board = SearchBoard.from_nodes(game.get_nodes())
+            if paranoid:
+                search = Paranoid(board, order, color, max_depth, threshold,
+                                  TranspositionTable())
+            else:
+                search = MaxN(board, order, max_depth, threshold)
+            search.search(color, order[1 % len(order)])
+            attack.nodes += search.nodes
+            if search.best_move is None:
+                break
+            from_i, to_i = search.best_move
+            conquered = game.attack(game.find(board.ids[from_i]),
+                                    game.find(board.ids[to_i])) or conquered
+        return conquered
+    attack.nodes = 0
+    return attack
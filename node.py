@@ -3,6 +3,18 @@ from color import Color
 
 class Node():
 
+    # A zobrist.GraphHash to tell about every change of owner or troops, if
+    # the node is part of a hashed graph.
+    hasher = None
+
+    # The Registry the node belongs to, if any, and its bit in the
+    # registry's ownership bitboards.
+    registry = None
+    bit = 0
+
+    # The Continent the node is in, if any.
+    continent = None
+
     def __init__(self, id, name, owner=Color.NONE, neighbors=[], numtroops=-1, location=(0, 0)):
         ''' Initiates a Node object with given [id] (int), [name] of the region
         (string), [owner] (Color object), [neighbors] (list of Node 
@@ -55,23 +67,36 @@ class Node():
         return colors[self.owner.name]
 
     def set_owner(self, owner):
+        if owner != self.owner and self.registry is not None:
+            self.registry.moved(self, owner)
+        if self.hasher is not None:
+            self.hasher.update(self, owner, self.numtroops)
         self.owner = owner
 
     def set_troops(self, numtroops):
+        if self.hasher is not None:
+            self.hasher.update(self, self.owner, numtroops)
         self.numtroops = numtroops
 
     def set_location(self, location):
         self.location = location
 
     def add_troops(self, numtroops):
-        self.numtroops += numtroops
+        self.set_troops(self.numtroops + numtroops)
 
     def subtract_troops(self, numtroops):
-        self.numtroops -= numtroops
+        self.set_troops(self.numtroops - numtroops)
+
+    def set_neighbors(self, neighbors):
+        '''Replaces the neighbors of the node with [neighbors] (list of Node
+        objects sorted by id). The other side of each edge is not changed.'''
+        if self.registry is not None:
+            self.registry.version += 1
+        self.neighbors = neighbors
 
     def add_edge(self, node):
-        self.neighbors = add_node(node, self.neighbors)
-        node.neighbors = add_node(self, node.neighbors)
+        self.set_neighbors(add_node(node, self.neighbors))
+        node.set_neighbors(add_node(self, node.neighbors))
 
     def attack_options(self):
         '''Returns a list of nodes that could be attacked from the given node.'''
@@ -82,27 +107,107 @@ class Node():
         return res
 
 
+class Registry():
+
+    def __init__(self, nodes=None):
+        ''' Initiates an index of territories with O(1) lookup by id and by
+        name. [nodes] is a list of Node objects with unique ids and names
+        (none if None). Each node gets the next bit of the registry's
+        bitboards, which hold the territories of every owner and are kept up
+        to date by Node.set_owner(); a node belongs to one registry at
+        most.
+        [version] is bumped whenever an owner or an edge of a registered
+        node changes, so that indices built on top of the graph (see
+        path.py) know when to rebuild; [components] is the component index
+        of the graph, once path.py has built one.'''
+        self.by_id = {}
+        self.by_name = {}
+        # The bitboard of each owner.
+        self.masks = {}
+        self.version = 0
+        self.components = None
+        for node in nodes or []:
+            self.add(node)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, node):
+        if node.get_id() in self.by_id or node.get_name() in self.by_name:
+            raise ValueError("Territory already registered: %s" % str(node))
+        self.by_id[node.get_id()] = node
+        self.by_name[node.get_name()] = node
+        node.registry = self
+        node.bit = 1 << (len(self.by_id) - 1)
+        self.version += 1
+        owner = node.get_owner()
+        self.masks[owner] = self.masks.get(owner, 0) | node.bit
+
+    def moved(self, node, owner):
+        '''Records that [node] is about to change hands to [owner], and
+        updates the owner of its continent: [owner] if the continent is now
+        all theirs, nobody otherwise.'''
+        self.version += 1
+        old = node.get_owner()
+        self.masks[old] = self.masks.get(old, 0) & ~node.bit
+        self.masks[owner] = self.masks.get(owner, 0) | node.bit
+        continent = node.continent
+        if continent is not None:
+            mask = continent.get_mask()
+            if self.masks[owner] & mask == mask:
+                continent.monopolize(owner)
+            else:
+                continent.demonopolize()
+
+    def get_mask(self, owner):
+        '''Returns the bitboard of the territories of [owner] (Color
+        object).'''
+        return self.masks.get(owner, 0)
+
+    def find(self, id):
+        '''Returns the Node with given [id] (int), or None if not found.'''
+        return self.by_id.get(id)
+
+    def find_name(self, territory):
+        '''Returns the Node with given [territory] name (str), or None if not
+        found.'''
+        return self.by_name.get(territory)
+
+    def find_owned(self, id, owner):
+        '''Returns the Node with given [id] if it is owned by [owner] (Color
+        object), and None otherwise.'''
+        node = self.by_id.get(id)
+        if node is None or node.get_owner() != owner:
+            return None
+        return node
+
+    def get_nodes(self):
+        '''Returns a list of all registered nodes sorted by id.'''
+        return [self.by_id[id] for id in sorted(self.by_id)]
+
+
 def find_node(id, node_lst):
     '''
     Uses binary search to look for a Node object with given [id] (int)
-        in the [node_lst]
+        in the [node_lst]. The list is never copied.
     Returns a Node object, or None if not found.
 
     Preconditions: [id] is a positive integer; [node_lst] is a list of Node 
     objects that are sorted by id in an increasing order. [node_lst] can be 
     empty.
     '''
-    if len(node_lst) == 0:
-        return None
-
-    i = len(node_lst) // 2
-    curr_node = node_lst[i]
-
-    if curr_node.get_id() < id:
-        return find_node(id, node_lst[i+1:])
-    elif curr_node.get_id() > id:
-        return find_node(id, node_lst[:i])
-    return curr_node
+    lo = 0
+    hi = len(node_lst)
+    while lo < hi:
+        i = (lo + hi) // 2
+        curr_node = node_lst[i]
+        if curr_node.get_id() < id:
+            lo = i + 1
+        elif curr_node.get_id() > id:
+            hi = i
+        else:
+            return curr_node
+    return None
 
 
 def add_node(node, node_lst):
@@ -134,13 +239,14 @@ def find_territory(territory, node_lst):
     Preconditions: 
     [node_lst] sorted in alphabetical order by territory name. No duplicates.
     '''
-    if len(node_lst) == 0:
-        return None
-
-    i = len(node_lst) // 2
-
-    if node_lst[i].get_name() < territory:
-        return find_territory(territory, node_lst[i+1:])
-    elif node_lst[i].get_name() > territory:
-        return find_territory(territory, node_lst[:i])
-    return node_lst[i]
+    lo = 0
+    hi = len(node_lst)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if node_lst[i].get_name() < territory:
+            lo = i + 1
+        elif node_lst[i].get_name() > territory:
+            hi = i
+        else:
+            return node_lst[i]
+    return None
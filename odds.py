@@ -0,0 +1,103 @@
+from dice import loss_distribution
+
+
+# Exact blitz odds. A blitz is a Markov chain over (attacking troops,
+# defending troops): every roll moves it to a state with fewer troops, so the
+# tables below are filled bottom-up, once, and every later query is a lookup.
+#
+# Troop counts follow the conventions of roll.blitz(): [attack] includes the
+# troop that has to stay behind, so the battle stops at (1, d) or (a, 0).
+
+# (attack, defense) -> {(attack remaining, defense remaining): probability}.
+_dist_cache = {}
+# (attack, defense) -> probability that the attacker conquers the territory.
+_win_cache = {}
+# (attack, defense) -> (expected attacker losses, expected defender losses).
+_loss_cache = {}
+
+
+def transitions(attack, defense):
+    '''Returns the outcomes of the next roll of a blitz with [attack] and
+    [defense] troops as a list of ((new attack, new defense), probability).
+
+    Preconditions: [attack] > 1 and [defense] > 0.'''
+    res = []
+    for (attack_lost, defend_lost), p in loss_distribution(min(attack-1, 3), min(defense, 2)):
+        res.append(((attack - attack_lost, defense - defend_lost), p))
+    return res
+
+
+def warm_up(attack, defense):
+    '''Fills the win probability and expected loss tables for every battle
+    up to [attack] attacking and [defense] defending troops. Afterwards
+    win_probability() and expected_losses() are dictionary lookups.'''
+    if (attack, defense) in _win_cache:
+        return
+    for a in range(1, attack+1):
+        for d in range(0, defense+1):
+            if (a, d) in _win_cache:
+                continue
+            if a == 1:
+                _win_cache[(a, d)] = 0.0
+                _loss_cache[(a, d)] = (0.0, 0.0)
+            elif d == 0:
+                _win_cache[(a, d)] = 1.0
+                _loss_cache[(a, d)] = (0.0, 0.0)
+            else:
+                # Every successor has been filled in already, since rows
+                # are filled in increasing order of both coordinates.
+                win = 0.0
+                attack_lost = 0.0
+                defend_lost = 0.0
+                for (new_a, new_d), p in transitions(a, d):
+                    win += p * _win_cache[(new_a, new_d)]
+                    next_a_lost, next_d_lost = _loss_cache[(new_a, new_d)]
+                    attack_lost += p * (a - new_a + next_a_lost)
+                    defend_lost += p * (d - new_d + next_d_lost)
+                _win_cache[(a, d)] = win
+                _loss_cache[(a, d)] = (attack_lost, defend_lost)
+
+
+def win_probability(attack, defense):
+    '''Returns the exact probability that a blitz with [attack] troops
+    conquers a territory defended by [defense] troops.
+
+    Preconditions: [attack] >= 1 and [defense] >= 0.'''
+    if (attack, defense) not in _win_cache:
+        warm_up(attack, defense)
+    return _win_cache[(attack, defense)]
+
+
+def expected_losses(attack, defense):
+    '''Returns a tuple of the expected troops lost by the attacker and the
+    defender, respectively, in a blitz.
+
+    Preconditions: [attack] >= 1 and [defense] >= 0.'''
+    if (attack, defense) not in _loss_cache:
+        warm_up(attack, defense)
+    return _loss_cache[(attack, defense)]
+
+
+def distribution(attack, defense):
+    '''
+    Returns the full distribution of blitz([attack], [defense]) as a dictionary
+        mapping (attack remaining, defense remaining) to its probability.
+    Every key has either 1 attacking troop or 0 defending troops left.
+
+    Preconditions: [attack] >= 1 and [defense] >= 0.
+    '''
+    if (attack, defense) in _dist_cache:
+        return _dist_cache[(attack, defense)]
+    for a in range(1, attack+1):
+        for d in range(0, defense+1):
+            if (a, d) in _dist_cache:
+                continue
+            if a == 1 or d == 0:
+                _dist_cache[(a, d)] = {(a, d): 1.0}
+                continue
+            res = {}
+            for successor, p in transitions(a, d):
+                for outcome, q in _dist_cache[successor].items():
+                    res[outcome] = res.get(outcome, 0.0) + p * q
+            _dist_cache[(a, d)] = res
+    return _dist_cache[(attack, defense)]
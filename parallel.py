@@ -0,0 +1,216 @@
+import multiprocessing
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+
+from color import COLOR_CODES, COLORS, Color
+from evaluation import EVALUATORS
+from mcts import MCTS, TurnState
+from search import (AlphaBeta, SearchBoard, TranspositionTable,
+                    board_continents)
+
+
+# Searches split across a process pool. The map structure (ids, neighbors,
+# continents) is sent to every worker once, when the pool starts; the
+# position (owners and troops) is published to a shared memory block before
+# each search, so tasks only carry a few numbers. Results come back in task
+# order and are merged in a fixed order, so they don't depend on scheduling.
+
+# State of a worker process, set by _init_worker().
+_worker = {}
+
+
+def _init_worker(name, ids, neighbors, continents):
+    # Workers share the parent's resource tracker, so the block is only
+    # unlinked once, by SearchPool.close().
+    _worker["shm"] = SharedMemory(name=name)
+    _worker["ids"] = ids
+    _worker["neighbors"] = neighbors
+    _worker["continents"] = continents
+
+
+def _read_snapshot(shm, n):
+    '''Returns the owners and troops lists stored in [shm] for [n]
+    territories (see SearchPool.publish()).'''
+    troops = array("i", bytes(shm.buf[:4 * n])).tolist()
+    owners = [COLORS[code] for code in bytes(shm.buf[4 * n:5 * n])]
+    return owners, troops
+
+
+def _evaluator(name):
+    '''Returns the worker's evaluator called [name] (see
+    evaluation.EVALUATORS), or None for the plain troop count.'''
+    if name is None:
+        return None
+    if name not in _worker:
+        _worker[name] = EVALUATORS[name](_worker["neighbors"],
+                                         _worker["continents"])
+    return _worker[name]
+
+
+def _search_root_moves(task):
+    '''Worker: searches each root move of [task] in the window ([a], [b]).
+    Returns a list of (move, value) and the number of positions searched.'''
+    color, other, depth, ai_color, threshold, evaluator, a, b, moves = task
+    ids = _worker["ids"]
+    owners, troops = _read_snapshot(_worker["shm"], len(ids))
+    board = SearchBoard(ids, owners, troops, _worker["neighbors"])
+    search = AlphaBeta(board, ai_color, depth, threshold, TranspositionTable(),
+                       evaluator=_evaluator(evaluator))
+    res = []
+    for from_i, to_i, l in moves:
+        board.make_attack(from_i, to_i)
+        res.append(((from_i, to_i),
+                    l * search.search(other, color, 1, a / l, b / l)))
+        board.unmake()
+    return res, search.nodes
+
+
+def _run_tree(task):
+    '''Worker: runs one independent MCTS tree. Returns the visits and value
+    sums of the root actions and the number of playouts.'''
+    order, phase, reinforcements, iterations, seed = task
+    ids = _worker["ids"]
+    owners, troops = _read_snapshot(_worker["shm"], len(ids))
+    position = TurnState(owners, troops, _worker["neighbors"],
+                         _worker["continents"], order, phase, reinforcements)
+    search = MCTS(position, seed)
+    search.run(iterations)
+    stats = {child.action: (child.visits, child.value)
+             for child in search.root.children}
+    return stats, search.iterations
+
+
+class SearchPool():
+
+    def __init__(self, nodes, continents, workers=None):
+        '''
+        Initiates a pool of [workers] processes (one per CPU if None) for
+        the map of [nodes] (all Node objects) and [continents] (Continent
+        objects). Call close() (or use a with statement) to stop it.
+        '''
+        board = SearchBoard.from_nodes(nodes)
+        self.ids = board.ids
+        self.index = board.index
+        self.neighbors = board.neighbors
+        self.continents = board_continents(board, continents)
+        self.workers = workers or multiprocessing.cpu_count()
+        # Troops as 4-byte ints, then owners as 1-byte color codes.
+        self.shm = SharedMemory(create=True, size=5 * len(self.ids))
+        self.pool = multiprocessing.Pool(
+            self.workers, _init_worker,
+            (self.shm.name, board.ids, board.neighbors, self.continents))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.shm.close()
+        self.shm.unlink()
+
+    def publish(self, nodes):
+        '''Writes the owners and troops of [nodes] to the shared block and
+        returns a SearchBoard of them.'''
+        board = SearchBoard.from_nodes(nodes)
+        n = len(self.ids)
+        self.shm.buf[:4 * n] = array("i", board.troops).tobytes()
+        self.shm.buf[4 * n:5 * n] = bytes(COLOR_CODES[owner]
+                                           for owner in board.owners)
+        return board
+
+    def alphabeta(self, nodes, color, other, depth, ai_color=Color.RED,
+                  threshold=0.9, evaluator=None, state=None):
+        '''
+        Root-parallel alpha-beta (see search.AlphaBeta) on the position of
+        [nodes] with [color] to move, scored by the evaluator called
+        [evaluator] in evaluation.EVALUATORS (the troops of [ai_color] if
+        None). The first of the ordered root moves is searched here; the
+        others are dealt round-robin to the workers, which only need to find
+        out whether they beat it, so they search in the window bounded by
+        its value.
+        If [state] is given, a child is recorded for every root move, in
+        search order, as AlphaBeta.search() does (without the principal
+        variation below the best one).
+        Returns the value, the best move (from index, to index; None if
+        there is none, ties go to the earlier move in order) and the number
+        of positions searched. Each worker keeps one transposition table for
+        all its moves, and a table may answer with an entry searched deeper
+        than needed, so the value and move can differ slightly with the
+        number of workers and from those of a serial search.
+        '''
+        board = self.publish(nodes)
+        name = evaluator
+        if name is not None:
+            evaluator = EVALUATORS[name](self.neighbors, self.continents)
+        root = AlphaBeta(board, ai_color, depth, threshold,
+                         evaluator=evaluator)
+        moves = root.order_moves(board.attack_moves(color, threshold),
+                                 color == ai_color, 0, None)
+        if len(moves) == 0 or depth == 0:
+            return root.record(state, root.evaluate()), None, 1
+        root.table = TranspositionTable()
+        from_i, to_i, l = moves[0]
+        board.make_attack(from_i, to_i)
+        first = l * root.search(other, color, 1)
+        board.unmake()
+        if color == ai_color:
+            a, b = first, float("inf")
+        else:
+            a, b = -float("inf"), first
+        rest = moves[1:]
+        tasks = [(color, other, depth, ai_color, threshold, name, a, b,
+                  rest[k::self.workers]) for k in range(self.workers)]
+        rank = {move[:2]: k for k, move in enumerate(moves)}
+        results = [((from_i, to_i), first)]
+        positions = 1 + root.nodes
+        for res, nodes_searched in self.pool.map(_search_root_moves, tasks):
+            results.extend(res)
+            positions += nodes_searched
+        results.sort(key=lambda result: rank[result[0]])
+        best_move, best = results[0]
+        for move, value in results[1:]:
+            if value > best if color == ai_color else value < best:
+                best_move, best = move, value
+        if state is not None:
+            for (from_i, to_i, l), (_, value) in zip(moves, results):
+                child = state.new_child((board.ids[from_i], board.ids[to_i]),
+                                        l*state.get_likelihood())
+                board.make_attack(from_i, to_i)
+                child.set_key(board.key(other))
+                board.unmake()
+                child.set_h(state.get_likelihood() * value)
+            root.record(state, best)
+        return best, best_move, positions
+
+    def mcts(self, nodes, order, phase, reinforcements=None, iterations=1000,
+             seed=0):
+        '''
+        Root-parallel MCTS (see mcts.MCTS): every worker grows its own tree
+        from the position of [nodes] with [order] (colors, the first one to
+        move) with an equal share of [iterations] playouts and a seed derived
+        from [seed]. The visits of the root actions are summed over the
+        trees.
+        Returns the most visited action (ties go to the smallest action) and
+        the merged {action: (visits, value)}. Results depend on the number
+        of workers, but not on scheduling.
+        '''
+        self.publish(nodes)
+        shares = [iterations // self.workers +
+                  (1 if k < iterations % self.workers else 0)
+                  for k in range(self.workers)]
+        tasks = [(list(order), phase, reinforcements, share,
+                  "%s:%i" % (seed, k)) for k, share in enumerate(shares) if share > 0]
+        merged = {}
+        for stats, _ in self.pool.map(_run_tree, tasks):
+            for action, (visits, value) in stats.items():
+                total = merged.get(action, (0, 0.0))
+                merged[action] = (total[0] + visits, total[1] + value)
+        best = None
+        for action in sorted(merged):
+            if best is None or merged[action][0] > merged[best][0]:
+                best = action
+        return best, merged
@@ -1,7 +1,75 @@
-from node import Node, find_node
+from node import find_node
+
+
+class ComponentIndex():
+
+    def __init__(self, registry):
+        ''' Initiates an index of owner-connected regions of the nodes of
+        [registry] (Registry object): two nodes get the same label iff they
+        have the same owner and are connected through nodes of that owner.
+        Labels are computed lazily, one region at a time, and dropped
+        whenever the version of [registry] changes (i.e. on any change of
+        ownership or edges on that board), so queries between changes cost
+        O(1).'''
+        self.registry = registry
+        self.labels = {}
+        self.next_label = 0
+        self.version = registry.version
+
+    def label(self, node):
+        '''Returns the label of the region containing [node].'''
+        if self.version != self.registry.version:
+            self.labels = {}
+            self.version = self.registry.version
+        if node in self.labels:
+            return self.labels[node]
+
+        # Breadth-first search over the region of [node].
+        label = self.next_label
+        self.next_label += 1
+        owner = node.get_owner()
+        self.labels[node] = label
+        queue = [node]
+        for curr_node in queue:
+            for neighbor in curr_node.get_neighbors():
+                if neighbor.get_owner() == owner and neighbor not in self.labels:
+                    self.labels[neighbor] = label
+                    queue.append(neighbor)
+        return label
+
+    def connected(self, node1, node2):
+        '''Returns True if [node1] and [node2] lie in the same region.'''
+        return self.label(node1) == self.label(node2)
+
+
+def components_of(registry):
+    '''Returns the component index of the nodes of [registry], built on
+    first use.'''
+    if registry.components is None:
+        registry.components = ComponentIndex(registry)
+    return registry.components
 
 
 def path_exists(node1, node2):
+    '''Finds if there is a path between the two nodes that only includes 
+    nodes that share the same owner, using the component index of their
+    registry (a search if they aren't registered). Drop-in replacement for
+    path_exists_search(), with the same results.
+    Returns a boolean.
+
+    Precondition: [node1] and [node2] both belong to the same player.'''
+    if node1 is node2:
+        # The search below only reaches [node1] again through a neighbor.
+        for node in node1.get_neighbors():
+            if node.get_owner() == node1.get_owner():
+                return True
+        return False
+    if node1.registry is None or node1.registry is not node2.registry:
+        return path_exists_search(node1, node2)
+    return components_of(node1.registry).connected(node1, node2)
+
+
+def path_exists_search(node1, node2):
     '''Finds if there is a path between the two nodes that only includes 
     nodes that share the same owner. Uses Dijkstra's shortes path algorithm
     that terminates as soon as any path from [node1] to [node2] is found, since
@@ -0,0 +1,67 @@
+import random
+
+
+class GameRandom():
+
+    def __init__(self, seed=None, quiet=False, source=None):
+        ''' Initiates a source of randomness for one game. If [source] is
+        given (anything with the interface of the random module), it is used
+        as is; otherwise a new random.Random is created from [seed] (int or
+        str). If [quiet] is True, log() prints nothing, which keeps headless
+        simulations free of console output.'''
+        if source is None:
+            source = random.Random(seed)
+        self.source = source
+        self.seed = seed
+        self.quiet = quiet
+        self.numpy_generator = None
+
+    def random(self):
+        return self.source.random()
+
+    def randint(self, a, b):
+        return self.source.randint(a, b)
+
+    def choice(self, seq):
+        return self.source.choice(seq)
+
+    def shuffle(self, lst):
+        self.source.shuffle(lst)
+
+    def getrandbits(self, k):
+        return self.source.getrandbits(k)
+
+    def is_quiet(self):
+        return self.quiet
+
+    def set_quiet(self, quiet):
+        self.quiet = quiet
+
+    def log(self, *args):
+        '''Prints [args] like print() unless the stream is quiet.'''
+        if not self.quiet:
+            print(*args)
+
+    def numpy(self):
+        '''Returns a numpy Generator derived from this stream (created on
+        first use), for the batch simulators in roll_batch.py.'''
+        if self.numpy_generator is None:
+            import numpy as np
+            self.numpy_generator = np.random.default_rng(self.getrandbits(64))
+        return self.numpy_generator
+
+    @staticmethod
+    def streams(seed, n, quiet=True):
+        '''
+        Creates [n] independent streams from a single [seed], e.g. one per
+            game or per worker process. Stream i only depends on ([seed], i),
+            so results can be reproduced regardless of how games are spread
+            over workers.
+        Returns a list of GameRandom objects.
+        '''
+        return [GameRandom("%s:%i" % (seed, i), quiet) for i in range(n)]
+
+
+# Default stream: the global random module with console output, i.e. the
+# behaviour of the game before streams were introduced.
+global_random = GameRandom(source=random)
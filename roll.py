@@ -1,7 +1,7 @@
-import random
+from rng import global_random
 
 
-def blitz(attack, defense):
+def blitz(attack, defense, rng=None):
     '''
     Does blitz roll until the defending side is destroyed or the attacker
         only has 1 troop left.
@@ -9,9 +9,14 @@ def blitz(attack, defense):
         respectively (if the second entry is 0, attack was successful; if
         the first entry is 1, attack was unsuccessful).
 
+    [rng] is a GameRandom stream used for the dice and for printing the rolls;
+    the global one is used if None.
+
     Preconditions: [attack] and [defense] are both positive integers.
     [attack] is bigger than 1.
     '''
+    if rng is None:
+        rng = global_random
     if attack <= 1:
         raise ValueError("Attacker has to have >1 troops!")
     if defense <= 0:
@@ -22,29 +27,29 @@ def blitz(attack, defense):
     while a > 1 and d > 0:
         if a >= 4 and d >= 2:
             # Both attacker and defender have enough troops for a 3-2 dice roll.
-            curr_roll = roll(3, 2)
-            print(curr_roll)
+            curr_roll = roll(3, 2, rng)
+            rng.log(curr_roll)
             a, d = write_res(a, d, curr_roll)
         elif d >= 2:
             # Attacker isn't strong enough for a 3-2 dice roll.
-            curr_roll = roll(a-1, 2)
-            print(curr_roll)
+            curr_roll = roll(a-1, 2, rng)
+            rng.log(curr_roll)
             a, d = write_res(a, d, curr_roll)
         elif a >= 4:
             # Defender isn't strong enough for a 3-2 dice roll.
-            curr_roll = roll(3, 1)
-            print(curr_roll)
+            curr_roll = roll(3, 1, rng)
+            rng.log(curr_roll)
             a, d = write_res(a, d, curr_roll)
         else:
             # Both aren't strong enough for a 3-2 dice roll.
-            curr_roll = roll(a-1, 1)
-            print(curr_roll)
+            curr_roll = roll(a-1, 1, rng)
+            rng.log(curr_roll)
             a, d = write_res(a, d, curr_roll)
 
     return (a, d)
 
 
-def roll(dice_attack, dice_defend):
+def roll(dice_attack, dice_defend, rng=None):
     '''
     A single roll that returns 2 if defender loses two troops (only
         possible if attacker rolls at least 2 dice); 1 if defender loses one
@@ -52,6 +57,7 @@ def roll(dice_attack, dice_defend):
         troop each; -1 if attacker loses one troop (only possible if defender
         rolls 1 die); -2 if attacker loses two troops (only possible if
         defender rolls at least 2 dice AND attacker rolls at least 2 dice).
+    [rng] is a GameRandom stream; the global one is used if None.
 
     Preconditions: [dice_attack] and [dice_defend] are integers.
         1 <= [dice_attack] <= 3; 1 <= [dice_defend] <=2.
@@ -60,20 +66,23 @@ def roll(dice_attack, dice_defend):
     assert 1 <= dice_attack and dice_attack <= 3, "Number of attacking dice has to be between 1 and 3, inclusively!"
     assert 1 <= dice_defend and dice_defend <= 2, "Number of defending dice has to be between 1 and 2, inclusively!"
 
+    if rng is None:
+        rng = global_random
+
     attack_rolls = []
     defend_rolls = []
 
     for _ in range(dice_attack):
-        attack_rolls.append(random.randint(1, 6))
+        attack_rolls.append(rng.randint(1, 6))
 
     for _ in range(dice_defend):
-        defend_rolls.append(random.randint(1, 6))
+        defend_rolls.append(rng.randint(1, 6))
 
     attack_rolls.sort(reverse=True)
     defend_rolls.sort(reverse=True)
 
-    print(attack_rolls)
-    print(defend_rolls)
+    rng.log(attack_rolls)
+    rng.log(defend_rolls)
 
     if dice_attack == 1 or dice_defend == 1:
         if attack_rolls[0] > defend_rolls[0]:
@@ -0,0 +1,138 @@
+import numpy as np
+
+from sampler import alias_table
+
+
+def batch_blitz(attack, defense, rng=None):
+    '''
+    Resolves many blitz attacks at once. Each battle follows the rules of
+        roll.blitz(): the attacker rolls min(a-1, 3) dice, the defender rolls
+        min(d, 2) dice, and rolling continues until the defender is destroyed
+        or the attacker only has 1 troop left.
+    Returns two integer arrays with the remaining troops for attackers and
+        defenders, respectively (same shape as the inputs).
+
+    [attack] and [defense] are integers or array-likes of integers of the same
+    shape. [rng] is a numpy Generator; a fresh one is used if None.
+
+    Preconditions: every entry of [attack] is bigger than 1 and every entry
+    of [defense] is positive.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    a = np.array(attack, dtype=np.int64)
+    d = np.array(defense, dtype=np.int64)
+    if a.shape != d.shape:
+        raise ValueError("Attacker and defender arrays have different shapes!")
+    if np.any(a <= 1):
+        raise ValueError("Attacker has to have >1 troops!")
+    if np.any(d <= 0):
+        raise ValueError("Defender has to have >0 troops!")
+
+    shape = a.shape
+    a = a.reshape(-1)
+    d = d.reshape(-1)
+    # Indices of the battles that are still going on.
+    active = np.arange(a.size)
+
+    while active.size > 0:
+        curr_a = a[active]
+        curr_d = d[active]
+        dice_attack = np.minimum(curr_a - 1, 3)
+        dice_defend = np.minimum(curr_d, 2)
+
+        # Dice that a side doesn't roll are set to 0 so they sort last.
+        attack_rolls = rng.integers(1, 7, size=(active.size, 3))
+        attack_rolls[np.arange(3) >= dice_attack[:, None]] = 0
+        attack_rolls = -np.sort(-attack_rolls, axis=1)
+        defend_rolls = rng.integers(1, 7, size=(active.size, 2))
+        defend_rolls[np.arange(2) >= dice_defend[:, None]] = 0
+        defend_rolls = -np.sort(-defend_rolls, axis=1)
+
+        # Only the highest min(dice_attack, dice_defend) pairs are compared;
+        # ties go to the defender.
+        compared = np.arange(2) < np.minimum(dice_attack, dice_defend)[:, None]
+        attacker_wins = (attack_rolls[:, :2] > defend_rolls) & compared
+        defend_lost = attacker_wins.sum(axis=1)
+        attack_lost = compared.sum(axis=1) - defend_lost
+
+        a[active] = curr_a - attack_lost
+        d[active] = curr_d - defend_lost
+        active = active[(a[active] > 1) & (d[active] > 0)]
+
+    return a.reshape(shape), d.reshape(shape)
+
+
+def empirical_distribution(attack, defense, n=100000, rng=None):
+    '''Runs [n] copies of blitz([attack], [defense]) through batch_blitz().
+    Returns a dictionary mapping (attack remaining, defense remaining) to the
+    observed frequency, in the same form as odds.distribution(), so that the
+    batch simulator can be checked against the exact blitz outcomes.'''
+    a, d = batch_blitz(np.full(n, attack), np.full(n, defense), rng)
+    outcomes, counts = np.unique(np.stack([a, d], axis=1), axis=0,
+                                 return_counts=True)
+    res = {}
+    for (a_rem, d_rem), count in zip(outcomes, counts):
+        res[(int(a_rem), int(d_rem))] = count / n
+    return res
+
+
+def sample_blitz_batch(attack, defense, rng=None):
+    '''
+    Draws blitz results for arrays of attackers and defenders from the alias
+        tables in sampler.py instead of rolling dice. The cost per battle is
+        constant; tables are built once per distinct (attack, defense) pair.
+    Returns two integer arrays with the remaining troops for attackers and
+        defenders, respectively, like batch_blitz().
+
+    Preconditions: same as batch_blitz().
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    a = np.array(attack, dtype=np.int64)
+    d = np.array(defense, dtype=np.int64)
+    if a.shape != d.shape:
+        raise ValueError("Attacker and defender arrays have different shapes!")
+    if np.any(a <= 1):
+        raise ValueError("Attacker has to have >1 troops!")
+    if np.any(d <= 0):
+        raise ValueError("Defender has to have >0 troops!")
+
+    shape = a.shape
+    a = a.reshape(-1)
+    d = d.reshape(-1)
+    # Encode each (attack, defense) pair as one integer; np.unique is much
+    # faster on a flat array than with axis=0.
+    width = int(d.max()) + 1 if d.size > 0 else 1
+    keys, inverse = np.unique(a * width + d, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    pairs = zip(keys // width, keys % width)
+
+    # Concatenate the tables of all distinct pairs so that every battle is
+    # resolved by the same few array operations.
+    sizes = np.empty(len(keys), dtype=np.int64)
+    all_outcomes = []
+    all_prob = []
+    all_alias = []
+    offset = 0
+    for k, (attack_k, defense_k) in enumerate(pairs):
+        outcomes, prob, alias = alias_table(int(attack_k), int(defense_k))
+        sizes[k] = len(outcomes)
+        all_outcomes.extend(outcomes)
+        all_prob.extend(prob)
+        all_alias.extend(offset + i for i in alias)
+        offset += len(outcomes)
+    offsets = np.cumsum(sizes) - sizes
+    all_outcomes = np.array(all_outcomes, dtype=np.int64).reshape(-1, 2)
+    all_prob = np.array(all_prob)
+    all_alias = np.array(all_alias, dtype=np.int64)
+
+    scaled = rng.random(a.size) * sizes[inverse]
+    column = scaled.astype(np.int64)
+    coin = scaled - column
+    column += offsets[inverse]
+    column = np.where(coin < all_prob[column], column, all_alias[column])
+    res_a = all_outcomes[column, 0]
+    res_d = all_outcomes[column, 1]
+
+    return res_a.reshape(shape), res_d.reshape(shape)
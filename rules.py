@@ -0,0 +1,203 @@
+from bitboard import popcount
+from rng import global_random
+
+
+# Rules of the game as plain functions over explicit players, nodes and
+# continents. The frontends call them on the module-level board of
+# continent.py; engine.Game calls them on its own board. If the nodes are
+# in a Registry (as on both of these boards), territory counts and continent
+# ownership come from its bitboards instead of a walk over every node.
+
+
+def registry_of(continents):
+    '''Returns the Registry of the nodes of [continents] (Continent list),
+    or None if they aren't registered.'''
+    for continent in continents:
+        for node in continent.get_nodes():
+            return node.registry
+    return None
+
+
+def continents_mask(continents):
+    '''Returns the bitboard of all territories of [continents].'''
+    mask = 0
+    for continent in continents:
+        mask |= continent.get_mask()
+    return mask
+
+
+def territories(color, continents):
+    '''Returns a list of territories (Node list) owned by a player with a
+    given color in the given continent list (can be empty).'''
+    res = []
+    for continent in continents:
+        for node in continent.get_nodes():
+            if node.get_owner() == color:
+                res.append(node)
+    return res
+
+
+def find_player(color, player_lst):
+    '''Returns the player from [player_lst] with a given color. Raises
+    ValueError if not found.'''
+    for player in player_lst:
+        if player.get_color() == color:
+            return player
+    raise ValueError('Player with color %s not found!' % str(color))
+
+
+# WARNING: this function changes both [order] and [nodes].
+def claim_territories(order, nodes):
+    '''Gives territories for a given [order] in a given territories.'''
+    while len(nodes) > 0:
+        # Select the next player in the queue.
+        curr_player = order.pop(0)
+        order.append(curr_player)
+        if curr_player.get_troops() == 0:
+            continue
+        # Get necessary information and pop the first node from [nodes].
+        curr_color = curr_player.get_color()
+        curr_node = nodes.pop(0)
+        assert curr_node.get_troops() == -1, "Non-empty territory during claim!"
+        # Set ownership and subtract troops.
+        curr_node.set_owner(curr_color)
+        curr_node.set_troops(1)
+        curr_player.subtract_troops(1)
+
+        if (curr_node.get_id() not in curr_player.get_territories()):
+            curr_player.add_territory(curr_node.get_id())
+    return
+
+
+def initialize_troops(order, nodes, rng=None):
+    # WARNING: this function changes both [order] and [nodes].
+    '''Initializes troops using a given order in given node list. [rng] is a
+    GameRandom stream (the global one if None).'''
+    if rng is None:
+        rng = global_random
+    total_remaining_troops = 0
+    for player in order:
+        total_remaining_troops += player.get_troops()
+    while total_remaining_troops > 0:
+        # Pop the first node from the queue and put it at the end.
+        curr_node = nodes.pop(0)
+        nodes.append(curr_node)
+        curr_color = curr_node.get_owner()
+        # Find player with a given color.
+        curr_player = find_player(curr_color, order)
+        # Add a random number or, if the player doesn't have enough troops,
+        # the remaining troops to the territory
+        assigned_troops = min(rng.randint(0, 5), curr_player.get_troops())
+        curr_node.add_troops(assigned_troops)
+        curr_player.subtract_troops(assigned_troops)
+        total_remaining_troops -= assigned_troops
+
+
+def remove_defeated(player_lst, continents, rng=None):
+    '''Removes players with no territories from the given player list.
+    Returns a new player list without the defeated players.
+
+    Preconditions: no duplicates in [player_lst].'''
+    if rng is None:
+        rng = global_random
+    registry = registry_of(continents)
+    if registry is not None:
+        mask = continents_mask(continents)
+    res = []
+    for i in range(len(player_lst)):
+        player = player_lst[i]
+        if registry is not None:
+            alive = registry.get_mask(player.get_color()) & mask != 0
+        else:
+            alive = len(territories(player.get_color(), continents)) > 0
+        if alive:
+            res.append(player)
+        else:
+            rng.log("\n%s Player has been defeated!\n" %
+                    str(player.get_color()))
+    return res
+
+
+def check_attack(color, continents):
+    '''Checks if the player with a given color can perform an attack.
+    Returns a boolean.'''
+    # First, check if there is at least one node where the player has more
+    # than one unit. Next, for each node with more than 1 troop, check if there
+    # are any adjacent enemy territories that could be attacked.
+    for node in territories(color, continents):
+        if node.get_troops() > 1 and len(node.attack_options()) > 0:
+            return True
+    return False
+
+
+def check_attack_everyone(order, continents):
+    '''Runs check_attack() on every remaining player to make sure at least
+    one player can attack.'''
+    for player in order:
+        if check_attack(player.get_color(), continents):
+            return True
+    return False
+
+
+def apply_blitz(from_node, to_node, blitz_res):
+    '''Records the result [blitz_res] of a blitz from [from_node] on
+    [to_node]. In case of a successful attack, all troops but one move into
+    the new territory.
+    Returns a boolean representing whether attack was successful or not.'''
+    if blitz_res[0] == 1:
+        from_node.set_troops(1)
+        to_node.set_troops(blitz_res[1])
+        return False
+    elif blitz_res[1] == 0:
+        from_node.set_troops(1)
+        to_node.set_troops(blitz_res[0]-1)
+        to_node.set_owner(from_node.get_owner())
+        return True
+    raise ValueError("Wrong results for blitz: (%i, %i)" % blitz_res)
+
+
+def calculate_troops_gained(curr_color, continents, print_details=False):
+    '''Calculates the number of troops gained by the player with a given color
+    in the beginning of their turn.
+    Returns the number of gained troops (int), the number of territories owned
+    by the player (int), and the list of continents owned by the player
+    (Continent list).'''
+    continents_owned = []
+    registry = registry_of(continents)
+    if registry is not None:
+        territories_owned = popcount(registry.get_mask(curr_color) &
+                                     continents_mask(continents))
+    else:
+        territories_owned = len(territories(curr_color, continents))
+    territory_bonus = max(territories_owned//3, 3)
+    troops_gained = 0
+    troops_gained += territory_bonus
+    for continent in continents:
+        if continent.get_owner() == curr_color:
+            continents_owned.append(continent)
+            bonus = continent.get_bonus()
+            troops_gained += bonus
+            if print_details:
+                print("%i troops for %s," % (bonus, continent.get_name()))
+    if print_details:
+        print("%i troops for %i territories." %
+              (territory_bonus, territories_owned))
+    return troops_gained, territories_owned, continents_owned
+
+
+def set_continent_owners(continents):
+    '''Checks if any of the continents is owned by a single color and
+    sets owners if there are ones. Registered nodes keep the owners of
+    their continents up to date on every conquest afterwards (see
+    Registry.moved()).'''
+    for continent in continents:
+        single_owner = True
+        node_lst = continent.get_nodes()
+        possible_owner = node_lst[0].get_owner()
+        for node in node_lst[1:]:
+            if node.get_owner() != possible_owner:
+                single_owner = False
+                continent.demonopolize()
+                break
+        if single_owner:
+            continent.monopolize(possible_owner)
@@ -0,0 +1,77 @@
+import random
+
+from odds import distribution
+
+
+# Alias tables (Vose's method) over the exact blitz outcomes from odds.py.
+# Drawing a blitz result is one uniform index plus one biased coin, no matter
+# how many rolls the battle would have taken.
+
+# (attack, defense) -> (outcomes, prob, alias).
+_alias_cache = {}
+
+
+def alias_table(attack, defense):
+    '''
+    Builds (or fetches) the alias table for blitz([attack], [defense]).
+    Returns a tuple (outcomes, prob, alias): [outcomes] is a list of
+        (attack remaining, defense remaining) tuples; column i yields
+        outcomes[i] with probability prob[i] and outcomes[alias[i]] otherwise.
+
+    Preconditions: [attack] > 1 and [defense] > 0.
+    '''
+    key = (attack, defense)
+    if key in _alias_cache:
+        return _alias_cache[key]
+
+    outcomes = sorted(distribution(attack, defense).items())
+    n = len(outcomes)
+    scaled = [p * n for _, p in outcomes]
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        if scaled[l] < 1.0:
+            small.append(l)
+        else:
+            large.append(l)
+    # Whatever is left over is 1 up to rounding error.
+    for i in small + large:
+        prob[i] = 1.0
+
+    res = ([outcome for outcome, _ in outcomes], prob, alias)
+    _alias_cache[key] = res
+    return res
+
+
+def sample_blitz(attack, defense, rng=None):
+    '''
+    Draws the result of blitz([attack], [defense]) in constant time, without
+        rolling any dice.
+    Returns a tuple representing the remaining troops for attacker and
+        defender, respectively, exactly like roll.blitz().
+
+    [rng] is an object with a random() method (e.g. random.Random); the
+    random module is used if None.
+
+    Preconditions: [attack] and [defense] are both positive integers.
+    [attack] is bigger than 1.
+    '''
+    if attack <= 1:
+        raise ValueError("Attacker has to have >1 troops!")
+    if defense <= 0:
+        raise ValueError("Defender has to have >0 troops!")
+    if rng is None:
+        rng = random
+    outcomes, prob, alias = alias_table(attack, defense)
+    u = rng.random() * len(outcomes)
+    i = int(u)
+    if u - i >= prob[i]:
+        i = alias[i]
+    return outcomes[i]
@@ -0,0 +1,650 @@
+import time
+
+from color import Color
+from odds import win_probability
+from zobrist import zobrist_for
+
+
+# Game-tree search for the AI. Positions are not copied: the search applies
+# a conquest to a single SearchBoard, recurses and undoes it again, so each
+# step costs O(1) (plus O(degree) to list the moves of a territory).
+
+
+class SearchBoard():
+
+    def __init__(self, ids, owners, troops, neighbors, zobrist=None):
+        ''' Initiates a mutable board for search. Territory i has id [ids][i],
+        owner [owners][i] (Color object), [troops][i] troops and the neighbor
+        indices [neighbors][i] (list of lists of ints). Keeps the number of
+        territories and troops of every color, so that terminal tests and
+        the evaluation take O(1), and the Zobrist hash of the position in
+        [hash] ([zobrist] keys; shared ones for the map size if None).'''
+        self.ids = ids
+        self.owners = owners
+        self.troops = troops
+        self.neighbors = neighbors
+        self.index = {t_id: i for i, t_id in enumerate(ids)}
+        self.zobrist = zobrist if zobrist is not None else zobrist_for(len(ids))
+        # One (i, j, troops of i, troops of j, owner of j, hash) entry per
+        # move; a move changes the troops of i and j and possibly the owner
+        # of j.
+        self.undo_log = []
+        self.territory_counts = {}
+        self.troop_counts = {}
+        self.hash = 0
+        for i in range(len(ids)):
+            self.place(i)
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        '''Builds a SearchBoard from the current owners and troops of [nodes]
+        (list of Node objects containing all their neighbors). Territories
+        are indexed in increasing id order.'''
+        nodes = sorted(nodes, key=lambda node: node.get_id())
+        index = {node.get_id(): i for i, node in enumerate(nodes)}
+        neighbors = [sorted(index[n.get_id()] for n in node.get_neighbors())
+                     for node in nodes]
+        return cls([node.get_id() for node in nodes],
+                   [node.get_owner() for node in nodes],
+                   [node.get_troops() for node in nodes], neighbors)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, t_id):
+        '''Returns the index of the territory with id [t_id].'''
+        return self.index[t_id]
+
+    def key(self, side):
+        '''Returns the hash of the position with [side] (Color object) to
+        move.'''
+        return self.hash ^ self.zobrist.side_key(side)
+
+    def lift(self, i):
+        '''Takes territory [i] out of the counts and the hash before it
+        changes.'''
+        owner = self.owners[i]
+        numtroops = self.troops[i]
+        self.territory_counts[owner] -= 1
+        self.troop_counts[owner] -= numtroops
+        self.hash ^= self.zobrist.territory_key(i, owner, numtroops)
+
+    def place(self, i):
+        '''Puts territory [i] back into the counts and the hash after it
+        changed.'''
+        owner = self.owners[i]
+        numtroops = self.troops[i]
+        self.territory_counts[owner] = self.territory_counts.get(owner, 0) + 1
+        self.troop_counts[owner] = self.troop_counts.get(owner, 0) + numtroops
+        self.hash ^= self.zobrist.territory_key(i, owner, numtroops)
+
+    def territory_count(self, color):
+        return self.territory_counts.get(color, 0)
+
+    def total_troops(self, color):
+        return self.troop_counts.get(color, 0)
+
+    def attack_moves(self, color, threshold=0.0):
+        '''Returns a list of (from index, to index, probability) for every
+        attack of [color] that leaves more troops behind than the defender
+        has and succeeds with probability above [threshold].
+        The rule is the same for every player. The recursive search that
+        build_state_paths() in main.py used to run held the opponent to a
+        weaker test: more than min(2, defenders) troops to spare, and the
+        capture probability against that many defenders. That let the
+        opponent make long-shot attacks into stacked territories at inflated
+        odds, and a TODO there already asked for the full defender count.
+        With one rule, the moves of a position depend only on the board and
+        the side to move, not on which player the search is run for.'''
+        owners = self.owners
+        troops = self.troops
+        res = []
+        for i, owner in enumerate(owners):
+            num_troops = troops[i]
+            if owner != color or num_troops < 2:
+                continue
+            for j in self.neighbors[i]:
+                if owners[j] != color and num_troops - 1 > troops[j]:
+                    l = win_probability(num_troops, troops[j])
+                    if l > threshold:
+                        res.append((i, j, l))
+        return res
+
+    def attack_move(self, from_i, to_i, color, threshold=0.0):
+        '''Returns the move (from index, to index, probability) of [color]
+        from territory [from_i] on [to_i] if it is one of attack_moves(),
+        otherwise None.'''
+        owners = self.owners
+        troops = self.troops
+        if (owners[from_i] != color or owners[to_i] == color
+                or troops[from_i] - 1 <= troops[to_i]
+                or to_i not in self.neighbors[from_i]):
+            return None
+        l = win_probability(troops[from_i], troops[to_i])
+        return (from_i, to_i, l) if l > threshold else None
+
+    def make_attack(self, from_i, to_i):
+        '''Applies a successful blitz from territory [from_i] on [to_i]: all
+        troops but one move into the conquered territory. Undone by
+        unmake().
+
+        Preconditions: [from_i] has at least 2 troops; the territories have
+        different owners.'''
+        # The hot path of the search, so the bookkeeping of lift() and
+        # place() is done inline.
+        owners = self.owners
+        troops = self.troops
+        attacker = owners[from_i]
+        defender = owners[to_i]
+        from_troops = troops[from_i]
+        to_troops = troops[to_i]
+        self.undo_log.append((from_i, to_i, from_troops, to_troops, defender,
+                              self.hash))
+        key = self.zobrist.territory_key
+        self.hash ^= (key(from_i, attacker, from_troops) ^
+                      key(from_i, attacker, 1) ^
+                      key(to_i, defender, to_troops) ^
+                      key(to_i, attacker, from_troops - 1))
+        self.territory_counts[attacker] += 1
+        self.territory_counts[defender] -= 1
+        self.troop_counts[defender] -= to_troops
+        owners[to_i] = attacker
+        troops[to_i] = from_troops - 1
+        troops[from_i] = 1
+
+    def make_blitz(self, from_i, to_i, attack_left, defense_left):
+        '''Applies the result of a blitz from territory [from_i] on [to_i]
+        that ended with [attack_left] attacking and [defense_left] defending
+        troops (see odds.distribution()). If the defense is wiped out, all
+        attacking troops but one move in. Undone by unmake().'''
+        troops = self.troops
+        self.undo_log.append((from_i, to_i, troops[from_i], troops[to_i],
+                              self.owners[to_i], self.hash))
+        self.lift(from_i)
+        self.lift(to_i)
+        if defense_left == 0:
+            self.owners[to_i] = self.owners[from_i]
+            troops[to_i] = attack_left - 1
+            troops[from_i] = 1
+        else:
+            troops[from_i] = attack_left
+            troops[to_i] = defense_left
+        self.place(from_i)
+        self.place(to_i)
+
+    def make_deploy(self, i, numtroops):
+        '''Adds [numtroops] troops to territory [i]. Undone by unmake().'''
+        self.undo_log.append((i, i, self.troops[i], self.troops[i],
+                              self.owners[i], self.hash))
+        self.lift(i)
+        self.troops[i] += numtroops
+        self.place(i)
+
+    def make_fortify(self, from_i, to_i, numtroops):
+        '''Moves [numtroops] troops from territory [from_i] to [to_i]. Undone
+        by unmake().
+
+        Preconditions: [from_i] has more than [numtroops] troops; both
+        territories have the same owner.'''
+        troops = self.troops
+        self.undo_log.append((from_i, to_i, troops[from_i], troops[to_i],
+                              self.owners[to_i], self.hash))
+        self.lift(from_i)
+        self.lift(to_i)
+        troops[from_i] -= numtroops
+        troops[to_i] += numtroops
+        self.place(from_i)
+        self.place(to_i)
+
+    def unmake(self):
+        '''Takes back the last move made with one of the make_*() methods.'''
+        i, j, troops_i, troops_j, owner_j, old_hash = self.undo_log.pop()
+        owners = self.owners
+        troops = self.troops
+        troop_counts = self.troop_counts
+        # The owner of [i] never changes.
+        troop_counts[owners[i]] += troops_i - troops[i]
+        troops[i] = troops_i
+        if j != i:
+            troop_counts[owners[j]] -= troops[j]
+            troop_counts[owner_j] += troops_j
+            if owners[j] != owner_j:
+                self.territory_counts[owners[j]] -= 1
+                self.territory_counts[owner_j] += 1
+                owners[j] = owner_j
+            troops[j] = troops_j
+        self.hash = old_hash
+
+
+def board_continents(board, continents):
+    '''Returns [continents] (list of Continent objects) as (bonus, list of
+    territory indices of [board]) tuples.'''
+    return [(continent.get_bonus(),
+             [board.find(node.get_id()) for node in continent.get_nodes()])
+            for continent in continents]
+
+
+# Bound types of transposition table entries: the stored value is exact, a
+# lower bound (the search failed high) or an upper bound (it failed low).
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable():
+
+    # Approximate size in bytes of one stored entry (its slot, the entry
+    # tuple, the key, the value and the move), used to turn a memory cap into
+    # a number of slots.
+    ENTRY_BYTES = 200
+
+    def __init__(self, max_bytes=16 * 2**20):
+        ''' Initiates a table of search results keyed by Zobrist hash, using
+        at most about [max_bytes] bytes. Positions map to one of a fixed
+        number of slots (a power of two). On a clash, the new entry replaces
+        the old one unless the old one is from the current search and was
+        searched deeper (see new_search()).'''
+        size = 1
+        while size * 2 * TranspositionTable.ENTRY_BYTES <= max_bytes:
+            size *= 2
+        self.slots = [None] * size
+        self.mask = size - 1
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.slots) - self.slots.count(None)
+
+    def new_search(self):
+        '''Marks the entries stored so far as old: they are still used, but
+        any entry of the new search may replace them.'''
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+
+    def probe(self, key):
+        '''Returns the entry (key, value, draft, bound type, best move,
+        generation) stored for [key], or None.'''
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, value, draft, bound, move):
+        '''Stores the [value] of the position [key] searched [draft] plies
+        deep, its [bound] type (EXACT, LOWER or UPPER) and the best [move]
+        (or None).'''
+        i = key & self.mask
+        old = self.slots[i]
+        if (old is not None and old[0] != key and old[5] == self.generation
+                and old[2] > draft):
+            return
+        self.slots[i] = (key, value, draft, bound, move, self.generation)
+
+
+# Width of the null windows of principal-variation search. Values are
+# expected troop counts, so this is far below any real difference.
+NULL_WINDOW = 1e-6
+
+
+class SearchTimeout(Exception):
+    '''Raised inside a search when its time budget is used up.'''
+
+
+def move_first(moves, move):
+    '''Returns [moves] (list of (from index, to index, probability)) with
+    [move] (from index, to index) in front, if it is one of them.'''
+    for k, (from_i, to_i, _) in enumerate(moves):
+        if (from_i, to_i) == move:
+            return [moves[k]] + moves[:k] + moves[k+1:]
+    return moves
+
+
+class AlphaBeta():
+
+    def __init__(self, board, ai_color=Color.RED, max_depth=3, threshold=0.9,
+                 table=None, ordering=True, pvs=True, evaluator=None):
+        '''
+        Initiates a two-player alpha-beta search on [board] (SearchBoard).
+        Each ply is a single attack, after which the other player moves.
+        Only attacks that succeed with probability above [threshold] are
+        considered, and they are assumed to succeed. A position is worth the
+        troops of [ai_color] (the maximizing player) and a move is worth its
+        probability times the value of the position it leads to, so the value
+        of the root is the expected troops weighted by path likelihood.
+        [table] is a TranspositionTable to look positions up in and store
+        results to (none if None). Values only depend on the position and the
+        depth left, so a table can be kept between searches with the same
+        [ai_color], [threshold] and [evaluator].
+        If [ordering] is True, moves are tried best first (see order_moves());
+        otherwise in board order, after the table's best move. If [pvs] is
+        True, moves after the first one are searched with a null window and
+        only searched again if they turn out better (principal-variation
+        search).
+        [nodes] counts searched positions, [expanded] the ones with at least
+        one move, [cutoffs] the beta cutoffs, [first_cutoffs] those caused by
+        the first move and [researches] the repeated principal-variation
+        searches (see cutoff_rate()).
+        [evaluator] (see evaluation.py) replaces the troops of [ai_color] as
+        the value of a position if given. If it scores batches, the
+        positions one ply above the leaves score all their moves at once.
+        [best_move] is the best move (from index, to index) found at the root
+        by the last completed search.
+        [pv] holds the principal variation below each ply of the search in
+        progress, as lists of (from id, to id, probability, value, key); it is
+        only kept when a state is recorded (see search()).
+        '''
+        self.board = board
+        self.ai_color = ai_color
+        self.max_depth = max_depth
+        self.threshold = threshold
+        self.table = table
+        self.ordering = ordering
+        self.pvs = pvs
+        self.evaluator = evaluator
+        self.batched = evaluator is not None and evaluator.batched
+        self.nodes = 0
+        self.expanded = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.researches = 0
+        # Two killer moves (moves that caused a cutoff) per ply, and a
+        # history score per move summed over all cutoffs it caused.
+        self.killers = {}
+        self.history = {}
+        self.best_move = None
+        self.pv = None
+        # perf_counter() time at which to give up, if any (see iterate()).
+        self.deadline = None
+
+    def evaluate(self):
+        if self.evaluator is None:
+            return self.board.total_troops(self.ai_color)
+        return self.evaluator.evaluate(self.board, self.ai_color)
+
+    def score_leaves(self, color, other, depth, maximizing):
+        '''Scores every move of [color] at [depth], one ply above the
+        leaves, with a single batch evaluation instead of a search each.
+        Returns the best value and move (from index, to index), or None
+        twice if there is no move.'''
+        board = self.board
+        moves = board.attack_moves(color, self.threshold)
+        if len(moves) == 0:
+            return None, None
+        self.expanded += 1
+        self.nodes += len(moves)
+        values = self.evaluator.evaluate_moves(board, moves, self.ai_color)
+        best = None
+        best_k = None
+        for k, (_, _, l) in enumerate(moves):
+            value = l * float(values[k])
+            if best is None or (value > best if maximizing else value < best):
+                best = value
+                best_k = k
+        from_i, to_i, l = moves[best_k]
+        if self.pv is not None:
+            board.make_attack(from_i, to_i)
+            key = board.key(self.turn_after(color, other)[0])
+            board.unmake()
+            self.pv[depth] = [(board.ids[from_i], board.ids[to_i], l,
+                               best / l, key)]
+        return best, (from_i, to_i)
+
+    def cutoff_rate(self):
+        '''Returns the fraction of expanded positions that were cut off and
+        the fraction of cutoffs caused by the first move tried.'''
+        return (self.cutoffs / max(1, self.expanded),
+                self.first_cutoffs / max(1, self.cutoffs))
+
+    def order_moves(self, moves, maximizing, depth, hash_move):
+        '''
+        Returns [moves] sorted best first for the player to move: the
+        table's [hash_move], then the killer moves of ply [depth], then by
+        history score, then by a one-ply estimate (likelihood times the AI's
+        troops after the move).
+        '''
+        board = self.board
+        killers = self.killers.get(depth, [])
+        history = self.history
+        ai_color = self.ai_color
+        ai_troops = board.total_troops(ai_color)
+
+        def score(move):
+            from_i, to_i, l = move
+            if (from_i, to_i) == hash_move:
+                return (2, 0, 0)
+            if (from_i, to_i) in killers:
+                return (1, 1 - killers.index((from_i, to_i)), 0)
+            lost = board.troops[to_i] if board.owners[to_i] == ai_color else 0
+            estimate = l * (ai_troops - lost)
+            return (0, history.get((from_i, to_i), 0),
+                    estimate if maximizing else -estimate)
+        return sorted(moves, key=score, reverse=True)
+
+    def generate_moves(self, color, maximizing, depth, hash_move):
+        '''
+        Yields the moves of [color] in search order (see order_moves()).
+        The table's [hash_move] comes first, before the other moves are
+        even generated, so a cutoff on it saves generating and ordering
+        them.
+        '''
+        board = self.board
+        first = None
+        if hash_move is not None:
+            first = board.attack_move(hash_move[0], hash_move[1], color,
+                                      self.threshold)
+            if first is not None:
+                yield first
+        moves = board.attack_moves(color, self.threshold)
+        if self.ordering:
+            moves = self.order_moves(moves, maximizing, depth, None)
+        for move in moves:
+            if first is None or move[:2] != first[:2]:
+                yield move
+
+    def reward(self, move, depth, draft):
+        '''Records that [move] caused a cutoff at ply [depth] with [draft]
+        plies left.'''
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + draft * draft
+
+    def is_over(self, color, other):
+        '''Returns True if the game is over with [color] to move against
+        [other].'''
+        board = self.board
+        return (board.territory_count(color) == 0
+                or board.territory_count(other) == 0)
+
+    def turn_after(self, color, other):
+        '''Returns the player to move and their opponent after [color] has
+        attacked [other] (see multiplayer.Paranoid for more players).'''
+        return other, color
+
+    def search(self, color, other, depth=0, a=-float("inf"), b=float("inf"),
+               state=None):
+        '''
+        Searches the position with [color] to move against [other], [depth]
+        plies below the root, in the window ([a], [b]).
+        If [state] is given (State or statetree.TreeState), a child is
+        recorded for every move searched at the root, with h set to its
+        likelihood times its value, as ai_attack_phase() expects. Deeper
+        positions are dropped once their value is known, except for the
+        principal variation, which is recorded below the best child.
+        Returns the value of the position.
+        '''
+        self.nodes += 1
+        if (self.deadline is not None and self.nodes % 64 == 0
+                and time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+        pv = self.pv
+        if depth == 0:
+            pv = self.pv = {} if state is not None else None
+        if pv is not None:
+            pv[depth] = []
+        board = self.board
+        if depth >= self.max_depth or self.is_over(color, other):
+            return self.record(state, self.evaluate())
+
+        # The root is always searched, so that all its children are
+        # recorded.
+        draft = self.max_depth - depth
+        table = self.table
+        entry = None
+        if table is not None:
+            key = board.key(color)
+            entry = table.probe(key)
+            if depth > 0 and entry is not None and entry[2] >= draft:
+                value, bound = entry[1], entry[3]
+                if (bound == EXACT or (bound == LOWER and value >= b)
+                        or (bound == UPPER and value <= a)):
+                    return self.record(state, value)
+        a_orig = a
+        b_orig = b
+
+        maximizing = color == self.ai_color
+        best = None
+        best_move = None
+        if self.batched and draft == 1 and depth > 0:
+            best, best_move = self.score_leaves(color, other, depth,
+                                                maximizing)
+            moves = []
+        else:
+            hash_move = entry[4] if entry is not None else None
+            moves = self.generate_moves(color, maximizing, depth, hash_move)
+        for k, (from_i, to_i, l) in enumerate(moves):
+            if k == 0:
+                self.expanded += 1
+            child = None
+            if state is not None and depth == 0:
+                child = state.new_child((board.ids[from_i], board.ids[to_i]),
+                                        l*state.get_likelihood())
+            board.make_attack(from_i, to_i)
+            next_color, next_other = self.turn_after(color, other)
+            if pv is not None:
+                child_key = board.key(next_color)
+            if child is not None:
+                child.set_key(child_key)
+            # The child's value is scaled by [l], so is its window.
+            if not self.pvs or k == 0:
+                value = l * self.search(next_color, next_other, depth+1,
+                                        a/l, b/l, child)
+            else:
+                # Only test whether the move beats the best one so far.
+                if maximizing:
+                    low, high = a, a + NULL_WINDOW
+                else:
+                    low, high = b - NULL_WINDOW, b
+                value = l * self.search(next_color, next_other, depth+1,
+                                        low/l, high/l, child)
+                if a < value < b:
+                    self.researches += 1
+                    if child is not None:
+                        child.set_children([])
+                    value = l * self.search(next_color, next_other, depth+1,
+                                            a/l, b/l, child)
+            board.unmake()
+            if best is None or (value > best if maximizing else value < best):
+                best = value
+                best_move = (from_i, to_i)
+                if pv is not None:
+                    pv[depth] = [(board.ids[from_i], board.ids[to_i], l,
+                                  value / l, child_key)] + pv.get(depth+1, [])
+            if maximizing:
+                a = max(a, value)
+            else:
+                b = min(b, value)
+            if b <= a:
+                self.cutoffs += 1
+                if k == 0:
+                    self.first_cutoffs += 1
+                self.reward((from_i, to_i), depth, draft)
+                break
+        if best is None:
+            # No attack available: the position is evaluated as it is.
+            best = self.evaluate()
+        if table is not None:
+            if best <= a_orig:
+                bound = UPPER
+            elif best >= b_orig:
+                bound = LOWER
+            else:
+                bound = EXACT
+            table.store(key, best, draft, bound, best_move)
+        if depth == 0:
+            self.best_move = best_move
+            if state is not None and best_move is not None:
+                self.record_pv(state)
+        return self.record(state, best)
+
+    def iterate(self, color, other, time_budget, max_depth=None, state=None):
+        '''
+        Iterative deepening: searches the position with [color] to move
+        against [other] to depth 1, 2, ... up to [max_depth] (the depth given
+        at construction if None), until [time_budget] seconds have passed.
+        The iteration running out of time is abandoned and the board is
+        restored. Each iteration tries the best moves of the previous ones
+        first (through the table; a table is created if there is none).
+        If [state] is given, its children are those recorded by the last
+        completed iteration; each iteration records after the children of
+        the previous one, which are dropped once it completes.
+        Returns the value and the best move (from index, to index) of the
+        last completed iteration and its depth. The move is None if there is
+        no good move, or if not even depth 1 was completed in time.
+        '''
+        if max_depth is None:
+            max_depth = self.max_depth
+        if self.table is None:
+            self.table = TranspositionTable()
+        self.table.new_search()
+        undo_length = len(self.board.undo_log)
+        value = None
+        move = None
+        completed = 0
+        children = list(state.get_children()) if state is not None else None
+        self.deadline = time.perf_counter() + time_budget
+        try:
+            for depth in range(1, max_depth + 1):
+                self.max_depth = depth
+                start = len(children) if state is not None else 0
+                value = self.search(color, other, 0, state=state)
+                move = self.best_move
+                completed = depth
+                if state is not None:
+                    # A copy, since a State keeps the list it is given.
+                    children = state.get_children()[start:]
+                    state.set_children(list(children))
+        except SearchTimeout:
+            while len(self.board.undo_log) > undo_length:
+                self.board.unmake()
+            if state is not None:
+                state.set_children(children)
+        finally:
+            self.deadline = None
+            self.max_depth = max_depth
+        return value, move, completed
+
+    def record_pv(self, state):
+        '''Records the principal variation of the last search below the
+        child of [state] for its first move. The variation stops early where
+        the table cut the search short.'''
+        pv = self.pv[0]
+        node = None
+        for child in state.get_children():
+            if child.get_move() == pv[0][:2]:
+                node = child
+        for from_id, to_id, l, value, key in pv[1:]:
+            node = node.new_child((from_id, to_id), l*node.get_likelihood(),
+                                  key)
+            node.set_h(node.get_likelihood() * value)
+
+    def record(self, state, value):
+        if state is not None:
+            state.set_h(state.get_likelihood() * value)
+        return value
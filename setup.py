@@ -26,13 +26,21 @@ cx_Freeze.setup(
                                "Cards_active.png",
                                "Button_generic_large.png",
                                "Button_generic_large_active.png",
+                               "bitboard.py",
                                "card.py",
                                "color.py",
                                "continent.py",
+                               "dice.py",
+                               "mapdata.py",
+                               "maps/classic.json",
                                "node.py",
+                               "odds.py",
                                "path.py",
                                "player.py",
+                               "rng.py",
                                "roll.py",
+                               "rules.py",
+                               "sampler.py",
                                "troop.py",
                            ]}},
     executables = executables
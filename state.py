@@ -1,23 +1,38 @@
 from player import Player
 
 class State():
-  def __init__(self, current_player, opponent, move=None, h=0,  children=[], likelihood=0, trp_terr=[], opp_trp_terr=[]):
+  def __init__(self, current_player, opponent, move=None, h=0,  children=None, likelihood=0, trp_terr=None, opp_trp_terr=None, key=None):
     self.current_player = current_player
     self.opponent = opponent
     self.move = move
     # self.parent = parent
-    self.children = children
+    # Lists default to new empty ones; a shared default list would collect
+    # the children of every state.
+    self.children = children if children is not None else []
     self.likelihood = likelihood
-    self.trp_terr = trp_terr
-    self.opp_trp_terr = opp_trp_terr
+    self.trp_terr = trp_terr if trp_terr is not None else []
+    self.opp_trp_terr = opp_trp_terr if opp_trp_terr is not None else []
     self.h = h
+    # Zobrist hash of the position (see zobrist.py), if known.
+    self.key = key
 
   def add_child(self, s):
     self.children.append(s) 
 
+  def new_child(self, move, likelihood, key=None):
+    '''Adds a child for [move] (from id, to id) with [likelihood], the
+    other player to move. Returns the child.'''
+    child = State(current_player=self.opponent, opponent=self.current_player,
+                  move=move, likelihood=likelihood, key=key)
+    self.add_child(child)
+    return child
+
   def get_children(self):
     return self.children
 
+  def set_children(self, children):
+    self.children = children
+
 
   def get_likelihood(self):
     return self.likelihood 
@@ -28,6 +43,12 @@ class State():
   def get_h(self):
     return self.h
 
+  def get_key(self):
+    return self.key
+
+  def set_key(self, key):
+    self.key = key
+
 
   def get_opp_trp_terr(self):
     return self.opp_trp_terr
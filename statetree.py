@@ -0,0 +1,322 @@
+from array import array
+
+from player import Player
+
+
+# Compact storage for the search tree of the AI. Instead of one State object
+# (with its own lists) per searched position, the tree is an arena of
+# parallel arrays indexed by node number: a node costs a few dozen bytes
+# whatever the size of the map. Children are linked through first_child,
+# last_child and next_sibling. Only the root keeps its territories, since
+# every other position follows from the root and the moves on the way to
+# it.
+
+NO_NODE = -1
+
+
+class StateTree():
+
+    def __init__(self):
+        ''' Initiates an empty tree; reset() gives it a root. Replaces
+        Statespace: the pointer is the node the game is currently at.'''
+        self.players = None
+        self.trp_terr = []
+        self.opp_trp_terr = []
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.last_child = array("i")
+        self.next_sibling = array("i")
+        self.from_ids = array("i")
+        self.to_ids = array("i")
+        self.likelihood = array("d")
+        self.h = array("d")
+        # Zobrist hashes; 0 if unknown.
+        self.keys = array("Q")
+        # Plies below the root, which gives the player to move.
+        self.depth = array("B")
+        self.pointer = NO_NODE
+
+    def __len__(self):
+        return len(self.parent)
+
+    def reset(self, current_player, opponent, trp_terr, opp_trp_terr,
+              likelihood=1, key=None):
+        '''Drops all nodes and starts again from a root where
+        [current_player] (Player object) owns [trp_terr] and [opponent] owns
+        [opp_trp_terr] (lists of (territory id, troops)). The pointer is set
+        to the root.
+        Returns the root (TreeState object).'''
+        self.players = (current_player, opponent)
+        self.trp_terr = trp_terr
+        self.opp_trp_terr = opp_trp_terr
+        for column in self.columns():
+            del column[:]
+        self.pointer = self.add(NO_NODE, None, likelihood, key)
+        return TreeState(self, self.pointer)
+
+    def columns(self):
+        return [self.parent, self.first_child, self.last_child,
+                self.next_sibling,
+                self.from_ids, self.to_ids, self.likelihood, self.h,
+                self.keys, self.depth]
+
+    def add(self, parent, move, likelihood, key=None):
+        '''Adds a node for [move] ((from id, to id), or None for the root)
+        as the last child of [parent] (index, NO_NODE for the root).
+        Returns the index of the node.'''
+        i = len(self.parent)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        from_id, to_id = move if move is not None else (NO_NODE, NO_NODE)
+        self.from_ids.append(from_id)
+        self.to_ids.append(to_id)
+        self.likelihood.append(likelihood)
+        self.h.append(0.0)
+        self.keys.append(key or 0)
+        if parent == NO_NODE:
+            self.depth.append(0)
+        else:
+            self.depth.append(self.depth[parent] + 1)
+            last = self.last_child[parent]
+            if last == NO_NODE:
+                self.first_child[parent] = i
+            else:
+                self.next_sibling[last] = i
+            self.last_child[parent] = i
+        return i
+
+    def children(self, i):
+        '''Returns the indices of the children of node [i], in the order
+        they were added.'''
+        res = []
+        child = self.first_child[i]
+        while child != NO_NODE:
+            res.append(child)
+            child = self.next_sibling[child]
+        return res
+
+    def link(self, i, children):
+        '''Makes [children] (list of indices) the children of node [i].'''
+        self.first_child[i] = children[0] if len(children) > 0 else NO_NODE
+        self.last_child[i] = children[-1] if len(children) > 0 else NO_NODE
+        for k, child in enumerate(children):
+            self.parent[child] = i
+            if k + 1 < len(children):
+                self.next_sibling[child] = children[k + 1]
+            else:
+                self.next_sibling[child] = NO_NODE
+
+    def subtree_size(self, i):
+        size = 1
+        stack = self.children(i)
+        while len(stack) > 0:
+            size += 1
+            stack.extend(self.children(stack.pop()))
+        return size
+
+    def set_children(self, i, children):
+        '''Makes [children] (list of indices) the only children of node [i].
+        Dropped subtrees are freed if they are the most recently added
+        nodes, as when a search is repeated; otherwise they stay in the
+        arena, unreachable, until reset().'''
+        dropped = [child for child in self.children(i)
+                   if child not in children]
+        self.link(i, children)
+        if len(dropped) == 0:
+            return
+        start = min(dropped)
+        size = sum(self.subtree_size(child) for child in dropped)
+        if start + size == len(self.parent) and self.pointer < start:
+            for column in self.columns():
+                del column[start:]
+
+    def renumber(self, start):
+        '''Keeps only the subtree of node [start], renumbered in depth-first
+        order so that [start] becomes node 0. Views taken before are invalid
+        afterwards; the pointer is kept if it is in the subtree, otherwise
+        it moves to node 0.'''
+        order = []
+        stack = [start]
+        while len(stack) > 0:
+            i = stack.pop()
+            order.append(i)
+            stack.extend(reversed(self.children(i)))
+        if start == 0 and len(order) == len(self.parent):
+            return
+        new_index = {i: k for k, i in enumerate(order)}
+        links = [self.parent, self.first_child, self.last_child,
+                 self.next_sibling]
+        for column in self.columns():
+            values = [column[i] for i in order]
+            if any(column is link for link in links):
+                values = [new_index.get(i, NO_NODE) for i in values]
+            del column[:]
+            column.extend(values)
+        self.pointer = new_index.get(self.pointer, 0)
+
+    def compact(self):
+        '''Frees the unreachable nodes (see renumber()).'''
+        if len(self.parent) > 0:
+            self.renumber(0)
+
+    def reroot(self, state, trp_terr, opp_trp_terr):
+        '''Makes [state] (TreeState object) the root, where its current
+        player owns [trp_terr] and the other one [opp_trp_terr], and points
+        to it. Its subtree is kept with the searched values, rescaled so that
+        the new root has likelihood 1; the rest of the tree is freed.
+        Returns the new root.'''
+        i = state.index
+        shift = self.depth[i]
+        scale = self.likelihood[i]
+        if shift % 2 == 1:
+            self.players = (self.players[1], self.players[0])
+        self.trp_terr = trp_terr
+        self.opp_trp_terr = opp_trp_terr
+        self.pointer = i
+        self.renumber(i)
+        self.from_ids[0] = NO_NODE
+        self.to_ids[0] = NO_NODE
+        for k in range(len(self.parent)):
+            self.depth[k] -= shift
+            self.likelihood[k] /= scale
+            self.h[k] /= scale
+        return TreeState(self, 0)
+
+    def follow(self, move, key, trp_terr, opp_trp_terr):
+        '''Re-roots the tree (see reroot()) onto the child of the root for
+        [move] (from id, to id) if the move turned out as the search
+        assumed, i.e. if the player to move next now owns [trp_terr] and the
+        other one [opp_trp_terr], as after the conquest the child was
+        searched for (see search.SearchBoard.make_attack()). [key] is the
+        Zobrist hash of the position, which rules out most children without
+        comparing territories.
+        Returns the new root, or None if there is no such child.'''
+        pointer = self.get_pointer()
+        if pointer is None or pointer.index != 0:
+            return None
+        for child in pointer.get_children():
+            if (child.get_move() == move and child.get_key() == key
+                    and self.after(move) == (dict(trp_terr),
+                                             dict(opp_trp_terr))):
+                return self.reroot(child, trp_terr, opp_trp_terr)
+        return None
+
+    def after(self, move):
+        '''Returns the territories ({territory id: troops}) of the player
+        to move next and of the other one after the player at the root
+        conquered with [move] (from id, to id), moving all troops but one.'''
+        from_id, to_id = move
+        own = dict(self.trp_terr)
+        opp = dict(self.opp_trp_terr)
+        troops = own[from_id]
+        own[from_id] = 1
+        own[to_id] = troops - 1
+        del opp[to_id]
+        return opp, own
+
+    def is_at(self, trp_terr, opp_trp_terr):
+        '''Returns True if the root is the position where its current player
+        owns [trp_terr] and the other one [opp_trp_terr].'''
+        return (dict(self.trp_terr) == dict(trp_terr)
+                and dict(self.opp_trp_terr) == dict(opp_trp_terr))
+
+    def set_pointer(self, state):
+        self.pointer = state.index
+
+    def get_pointer(self):
+        if self.pointer == NO_NODE:
+            return None
+        return TreeState(self, self.pointer)
+
+    def live(self):
+        '''Returns the number of nodes reachable from the root.'''
+        return self.subtree_size(0) if len(self.parent) > 0 else 0
+
+
+class TreeState():
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        ''' A view of node [index] of [tree] (StateTree object), with the
+        methods of State. Views are created on demand and hold no data, so
+        two views of the same node are interchangeable.'''
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other):
+        return (isinstance(other, TreeState) and self.tree is other.tree
+                and self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self):
+        return "TreeState(%i, move=%s, h=%.3f)" % (self.index, self.get_move(),
+                                                   self.get_h())
+
+    def new_child(self, move, likelihood, key=None):
+        '''Adds a child for [move] (from id, to id) with [likelihood], the
+        other player to move. Returns the child.'''
+        return TreeState(self.tree,
+                         self.tree.add(self.index, move, likelihood, key))
+
+    def get_children(self):
+        return [TreeState(self.tree, child)
+                for child in self.tree.children(self.index)]
+
+    def set_children(self, children):
+        self.tree.set_children(self.index, [child.index for child in children])
+
+    def get_likelihood(self):
+        return self.tree.likelihood[self.index]
+
+    def set_h(self, h):
+        self.tree.h[self.index] = h
+
+    def get_h(self):
+        return self.tree.h[self.index]
+
+    def get_key(self):
+        return self.tree.keys[self.index] or None
+
+    def set_key(self, key):
+        self.tree.keys[self.index] = key or 0
+
+    def get_move(self):
+        tree = self.tree
+        if tree.from_ids[self.index] == NO_NODE:
+            return None
+        return (tree.from_ids[self.index], tree.to_ids[self.index])
+
+    def get_parent(self):
+        parent = self.tree.parent[self.index]
+        return TreeState(self.tree, parent) if parent != NO_NODE else None
+
+    def get_current_player(self):
+        player = self.tree.players[self.tree.depth[self.index] % 2]
+        assert type(player) is Player
+        return player
+
+    def get_opponent(self):
+        player = self.tree.players[1 - self.tree.depth[self.index] % 2]
+        assert type(player) is Player
+        return player
+
+    def get_trp_terr(self):
+        if self.index != 0:
+            raise Exception('Territories are only kept for the root')
+        return self.tree.trp_terr
+
+    def get_opp_trp_terr(self):
+        if self.index != 0:
+            raise Exception('Territories are only kept for the root')
+        return self.tree.opp_trp_terr
+
+    def get_troops(self, t_id):
+        for (t, num) in self.get_trp_terr() + self.get_opp_trp_terr():
+            if (t == t_id):
+                return num
+        raise Exception('Given id is not found')
@@ -0,0 +1,59 @@
+import pytest
+
+from card import Card, add_card, find_card, remove_card
+from node import Node
+from troop import Troop
+
+
+def territories(*names):
+    return [Node(i, name) for i, name in enumerate(names)]
+
+
+def hand(nodes, wildcards=0):
+    res = []
+    for node in nodes:
+        res = add_card(Card(Troop.INFANTRY, node), res)
+    for _ in range(wildcards):
+        res = add_card(Card(Troop.WILDCARD, None), res)
+    return res
+
+
+def names(card_lst):
+    return [card.get_node().get_name() if card.get_node() else None
+            for card in card_lst]
+
+
+def test_add_card_keeps_the_hand_sorted():
+    nodes = territories("Peru", "Alaska", "Egypt", "Ural", "Japan")
+    cards = hand(nodes, wildcards=1)
+    assert names(cards) == ["Alaska", "Egypt", "Japan", "Peru", "Ural", None]
+    with pytest.raises(ValueError):
+        add_card(Card(Troop.CAVALRY, nodes[2]), cards)
+
+
+def test_find_card_returns_the_card():
+    nodes = territories("Peru", "Alaska", "Egypt")
+    cards = hand(nodes, wildcards=1)
+    for node in nodes:
+        card = find_card(node, cards)
+        assert isinstance(card, Card)
+        assert card.get_node() is node
+    assert find_card(Node(9, "Brazil"), cards) is None
+    assert find_card(None, cards).get_troop_type() == Troop.WILDCARD
+    assert find_card(None, hand(nodes)) is None
+    assert find_card(nodes[0], []) is None
+
+
+def test_remove_card_returns_a_new_hand():
+    nodes = territories("Peru", "Alaska", "Egypt")
+    cards = hand(nodes, wildcards=2)
+    res = remove_card(nodes[2], cards)
+    assert names(res) == ["Alaska", "Peru", None, None]
+    assert len(cards) == 5
+    assert names(remove_card(None, res)) == ["Alaska", "Peru", None]
+    with pytest.raises(ValueError):
+        remove_card(nodes[2], res)
+    with pytest.raises(ValueError):
+        remove_card(None, hand(nodes))
+    with pytest.raises(ValueError):
+        remove_card(nodes[0], [])
@@ -0,0 +1,37 @@
+from fractions import Fraction
+
+import pytest
+
+from dice import loss_distribution, outcome_cube
+
+
+def test_cube_matches_the_loss_distributions():
+    cube = outcome_cube()
+    for dd in [1, 2]:
+        for da in [1, 2, 3]:
+            for (attack_lost, _), p in loss_distribution(da, dd):
+                assert cube[dd-1][da-1][attack_lost] == p
+
+
+def test_cube_under_house_rules():
+    # Three defending dice and eight-sided dice.
+    cube = outcome_cube(max_dice_defend=3, sides=8, exact=True)
+    assert len(cube) == 3 and len(cube[0]) == 3
+    for row in cube:
+        for probs in row:
+            assert len(probs) == 4
+            assert sum(probs) == 1
+    # One die each: the attacker needs a strictly higher die.
+    assert cube[0][0][:2] == [Fraction(28, 64), Fraction(36, 64)]
+    # One die against two: it has to beat the higher of both.
+    win = Fraction(sum((a - 1) ** 2 for a in range(1, 9)), 8 ** 3)
+    assert cube[1][0][:2] == [win, 1 - win]
+    # Three against three compares three pairs.
+    assert cube[2][2][3] > 0
+
+
+@pytest.mark.parametrize("sides", [4, 6, 10])
+def test_one_against_one_with_any_die(sides):
+    win = Fraction(sides - 1, 2 * sides)
+    assert loss_distribution(1, 1, sides, exact=True) == [
+        ((0, 1), win), ((1, 0), 1 - win)]
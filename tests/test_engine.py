@@ -0,0 +1,52 @@
+from color import Color
+from continent import all_nodes_sorted
+from engine import Game, run_games
+
+
+def snapshot(game):
+    return ([(node.get_owner(), node.get_troops()) for node in game.get_nodes()],
+            [player.get_color() for player in game.get_order()],
+            [len(player.get_cards()) for player in game.get_order()],
+            len(game.deck), game.turn)
+
+
+def test_games_share_no_state():
+    game1 = Game(seed=1)
+    game2 = Game(seed=1)
+    assert not set(game1.get_nodes()) & set(game2.get_nodes())
+    assert not set(game1.deck) & set(game2.deck)
+    assert not set(game1.players) & set(game2.players)
+
+    game1.setup()
+    assert snapshot(game1) != snapshot(game2)
+    game2.setup()
+    assert snapshot(game1) == snapshot(game2)
+
+
+def test_interleaved_games_play_like_games_alone():
+    alone = Game(seed=4, colors=(Color.RED, Color.BLUE))
+    alone.setup()
+    states = []
+    for _ in range(40):
+        alone.play_turn()
+        states.append(snapshot(alone))
+
+    game = Game(seed=4, colors=(Color.RED, Color.BLUE))
+    other = Game(seed=5, colors=(Color.RED, Color.BLUE))
+    game.setup()
+    other.setup()
+    for state in states:
+        other.play_turn()
+        game.play_turn()
+        assert snapshot(game) == state
+
+
+def test_games_leave_the_classic_map_alone():
+    before = [(node.get_owner(), node.get_troops()) for node in all_nodes_sorted]
+    Game(seed=2).play(max_turns=50)
+    assert [(node.get_owner(), node.get_troops())
+            for node in all_nodes_sorted] == before
+
+
+def test_run_games_is_reproducible():
+    assert run_games(2, seed=8) == run_games(2, seed=8)
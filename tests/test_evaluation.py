@@ -0,0 +1,101 @@
+import pytest
+
+from color import Color
+from evaluation import (FEATURES, FeatureEvaluator, TroopEvaluator,
+                        board_arrays, make_evaluator)
+from mapgen import generate_world
+from search import AlphaBeta, SearchBoard
+
+
+def line_board():
+    '''Territories 0 - 1 - 2 - 3; 0 and 1 make a continent worth 2, 2 and 3
+    one worth 3.'''
+    board = SearchBoard([1, 2, 3, 4],
+                        [Color.RED, Color.RED, Color.BLUE, Color.RED],
+                        [5, 2, 4, 1], [[1], [0, 2], [1, 3], [2]])
+    return board, [(2, [0, 1]), (3, [2, 3])]
+
+
+def test_feature_values():
+    board, continents = line_board()
+    evaluator = FeatureEvaluator(board.neighbors, continents)
+    owners, troops = board_arrays(board)
+    red = evaluator.feature_vectors(owners[None], troops[None], Color.RED)[0]
+    blue = evaluator.feature_vectors(owners[None], troops[None], Color.BLUE)[0]
+    assert dict(zip(FEATURES, red)) == {
+        "troops": 8, "border_pressure": 5, "continent_completion": 2.75,
+        "reinforcements": 5, "components": 2}
+    assert dict(zip(FEATURES, blue)) == {
+        "troops": 4, "border_pressure": 0, "continent_completion": 0.75,
+        "reinforcements": 3, "components": 1}
+    weights = FeatureEvaluator(board.neighbors, continents,
+                               weights={"border_pressure": 0.0}).weights
+    assert evaluator.evaluate(board, Color.RED) == pytest.approx(
+        red @ evaluator.weights)
+    assert weights[FEATURES.index("border_pressure")] == 0.0
+
+
+def count_components(board, color):
+    seen = set()
+    res = 0
+    for start in range(len(board)):
+        if board.owners[start] != color or start in seen:
+            continue
+        res += 1
+        seen.add(start)
+        queue = [start]
+        for i in queue:
+            for j in board.neighbors[i]:
+                if board.owners[j] == color and j not in seen:
+                    seen.add(j)
+                    queue.append(j)
+    return res
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_components_match_a_search(seed):
+    continents, nodes = generate_world(60, 5, 3, seed=seed)
+    board = SearchBoard.from_nodes(nodes)
+    evaluator = make_evaluator("full", board, continents)
+    owners, troops = board_arrays(board)
+    for color in [Color.RED, Color.BLUE, Color.GREEN, Color.YELLOW]:
+        features = evaluator.feature_vectors(owners[None], troops[None], color)
+        assert features[0, -1] == count_components(board, color)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_evaluate_moves_matches_making_them(seed):
+    continents, nodes = generate_world(42, 6, 2, seed=seed)
+    board = SearchBoard.from_nodes(nodes)
+    evaluator = make_evaluator("full", board, continents)
+    moves = board.attack_moves(Color.RED)
+    values = evaluator.evaluate_moves(board, moves, Color.RED)
+    for (from_i, to_i, _), value in zip(moves, values):
+        board.make_attack(from_i, to_i)
+        assert value == pytest.approx(evaluator.evaluate(board, Color.RED))
+        board.unmake()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batched_leaves_agree_with_single_ones(seed):
+    continents, nodes = generate_world(42, 6, 2, seed=seed)
+    board = SearchBoard.from_nodes(nodes)
+    values = []
+    for batched in [False, True]:
+        evaluator = make_evaluator("fast", board, continents)
+        evaluator.batched = batched
+        search = AlphaBeta(board, Color.RED, 3, 0.5, evaluator=evaluator)
+        values.append(search.search(Color.RED, Color.BLUE))
+    assert values[1] == pytest.approx(values[0])
+
+
+def test_troop_evaluator_and_names():
+    board, _ = line_board()
+    assert TroopEvaluator().evaluate(board, Color.RED) == 8
+    assert isinstance(make_evaluator("troops", board, []), TroopEvaluator)
+    assert make_evaluator("fast", board, []).features == FEATURES[:-1]
+    with pytest.raises(ValueError):
+        make_evaluator("best", board, [])
+    with pytest.raises(ValueError):
+        FeatureEvaluator(board.neighbors, [(1, [0])],
+                         features=["troops", "morale"])
@@ -0,0 +1,55 @@
+import pytest
+
+from color import Color
+from expectimax import Expectimax, blitz_outcomes
+from mapgen import generate_world
+from search import SearchBoard, TranspositionTable
+
+
+def position(seed, num_territories=20):
+    _, nodes = generate_world(num_territories, 4, 2, seed=seed)
+    return SearchBoard.from_nodes(nodes)
+
+
+@pytest.mark.parametrize("attack, defense", [(2, 1), (5, 3), (12, 4), (30, 30)])
+@pytest.mark.parametrize("max_outcomes", [1, 3])
+def test_blitz_outcomes(attack, defense, max_outcomes):
+    outcomes = blitz_outcomes(attack, defense, max_outcomes)
+    assert sum(p for _, _, p in outcomes) == pytest.approx(1.0)
+    assert len(outcomes) <= 2 * max_outcomes
+    assert [p for _, _, p in outcomes] == sorted(
+        (p for _, _, p in outcomes), reverse=True)
+    for attack_left, defense_left, _ in outcomes:
+        assert 1 <= attack_left <= attack and 0 <= defense_left <= defense
+        assert defense_left == 0 or attack_left == 1
+
+
+def test_one_ply_is_the_best_expected_blitz():
+    board = SearchBoard([1, 2, 3], [Color.RED, Color.BLUE, Color.RED],
+                        [6, 2, 3], [[1], [0, 2], [1]])
+    search = Expectimax(board, Color.RED, 1)
+
+    def expected(from_i):
+        value = 0.0
+        for attack_left, defense_left, p in blitz_outcomes(
+                board.troops[from_i], board.troops[1]):
+            board.make_blitz(from_i, 1, attack_left, defense_left)
+            value += p * search.evaluate()
+            board.unmake()
+        return value
+
+    best = max([search.evaluate(), expected(0), expected(2)])
+    assert search.search(Color.RED, Color.BLUE) == pytest.approx(best)
+    assert search.best_move == (0, 1)
+    assert len(board.undo_log) == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_star1_agrees_with_plain_expectimax(seed):
+    board = position(seed)
+    values = []
+    for star1 in [False, True]:
+        for table in [None, TranspositionTable()]:
+            values.append(Expectimax(board, Color.RED, 2, star1=star1,
+                                     table=table).search(Color.RED, Color.BLUE))
+    assert values == pytest.approx([values[0]] * len(values))
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from mapdata import CLASSIC_MAP, cache_path, compile_spec, load_compiled
+
+
+def spec():
+    return {
+        "name": "Tiny",
+        "continents": [{"name": "East", "bonus": 2}, {"name": "West", "bonus": 1}],
+        "territories": [
+            {"id": 3, "name": "C", "continent": "West", "card": "CAVALRY"},
+            {"id": 1, "name": "A", "continent": "East", "location": [5, 6]},
+            {"id": 2, "name": "B", "continent": "East", "card": "INFANTRY"},
+        ],
+        "edges": [[1, 2], [3, 2], [2, 1]],
+    }
+
+
+def test_compile_spec():
+    compiled = compile_spec(spec())
+    assert compiled["ids"] == [1, 2, 3]
+    assert compiled["names"] == ["A", "B", "C"]
+    assert compiled["continent_of"] == [0, 0, 1]
+    assert compiled["cards"] == [None, "INFANTRY", "CAVALRY"]
+    assert compiled["locations"] == [(5, 6), (0, 0), (0, 0)]
+    assert compiled["neighbors"] == [[1], [0, 2], [1]]
+    assert compiled["continents"] == [("East", 2, [0, 1]), ("West", 1, [2])]
+
+
+@pytest.mark.parametrize("change", [
+    lambda s: s["continents"].append({"name": "East", "bonus": 3}),
+    lambda s: s["territories"].append({"id": 1, "name": "D", "continent": "East"}),
+    lambda s: s["territories"].append({"id": 4, "name": "A", "continent": "East"}),
+    lambda s: s["territories"].append({"id": 4, "name": "D", "continent": "North"}),
+    lambda s: s["edges"].append([1, 9]),
+    lambda s: s["edges"].append([2, 2]),
+])
+def test_compile_spec_rejects_inconsistent_maps(change):
+    broken = spec()
+    change(broken)
+    with pytest.raises(ValueError):
+        compile_spec(broken)
+
+
+def write_map(path, map_spec):
+    with open(path, "w") as f:
+        json.dump(map_spec, f)
+
+
+def test_cache_is_keyed_by_the_map_file(tmp_path):
+    path = str(tmp_path / "tiny.json")
+    write_map(path, spec())
+    compiled = load_compiled(path)
+    assert compiled == compile_spec(spec())
+
+    # A cache that matches the file is used as it is.
+    with open(cache_path(path)) as f:
+        saved = json.load(f)
+    saved["compiled"]["name"] = "From the cache"
+    with open(cache_path(path), "w") as f:
+        json.dump(saved, f)
+    assert load_compiled(path)["name"] == "From the cache"
+    assert load_compiled(path, use_cache=False)["name"] == "Tiny"
+
+    # Any change to the map file makes it stale.
+    changed = spec()
+    changed["name"] = "Changed"
+    write_map(path, changed)
+    assert load_compiled(path)["name"] == "Changed"
+
+
+def test_broken_cache_is_recompiled(tmp_path):
+    path = str(tmp_path / "tiny.json")
+    write_map(path, spec())
+    load_compiled(path)
+    with open(cache_path(path), "w") as f:
+        f.write("not json")
+    assert load_compiled(path) == compile_spec(spec())
+
+
+def test_classic_map():
+    compiled = load_compiled(CLASSIC_MAP, use_cache=False)
+    assert len(compiled["ids"]) == 42
+    assert len(compiled["continents"]) == 6
+    for i, neighbors in enumerate(compiled["neighbors"]):
+        for j in neighbors:
+            assert i in compiled["neighbors"][j]
@@ -0,0 +1,67 @@
+import pytest
+
+from mapdata import compile_spec, load_compiled
+from mapgen import PLAYER_COLORS, deal, generate_spec, generate_world, save_spec
+
+
+def reachable(start, neighbors, allowed):
+    seen = {start}
+    queue = [start]
+    for i in queue:
+        for j in neighbors[i]:
+            if j in allowed and j not in seen:
+                seen.add(j)
+                queue.append(j)
+    return seen
+
+
+@pytest.mark.parametrize("num_territories, num_continents", [
+    (1, 1), (2, 2), (7, 3), (42, 6), (100, 10), (250, 1)])
+@pytest.mark.parametrize("seed", range(3))
+def test_generated_maps_are_connected(num_territories, num_continents, seed):
+    compiled = compile_spec(generate_spec(num_territories, num_continents,
+                                          seed=seed))
+    neighbors = compiled["neighbors"]
+    every = set(range(num_territories))
+    assert reachable(0, neighbors, every) == every
+    for i, adjacent in enumerate(neighbors):
+        assert i not in adjacent
+        for j in adjacent:
+            assert i in neighbors[j]
+
+    # Every continent is non-empty and connected on its own.
+    assert len(compiled["continents"]) == num_continents
+    for _, bonus, members in compiled["continents"]:
+        assert members
+        assert bonus >= 1
+        assert reachable(members[0], neighbors, set(members)) == set(members)
+
+
+def test_same_seed_same_map():
+    assert generate_spec(30, 4, seed=5) == generate_spec(30, 4, seed=5)
+    assert generate_spec(30, 4, seed=5) != generate_spec(30, 4, seed=6)
+
+
+def test_bad_continent_counts():
+    with pytest.raises(ValueError):
+        generate_spec(5, 0)
+    with pytest.raises(ValueError):
+        generate_spec(5, 6)
+
+
+def test_saved_maps_load(tmp_path):
+    spec = generate_spec(20, 3, seed=1)
+    path = str(tmp_path / "generated.json")
+    save_spec(spec, path)
+    assert load_compiled(path, use_cache=False) == compile_spec(spec)
+
+
+def test_generate_world_deals_the_map():
+    continents, nodes = generate_world(30, 4, num_players=3, seed=2)
+    assert sum(len(c.get_nodes()) for c in continents) == len(nodes) == 30
+    assert len(nodes[0].registry) == 30
+    owners = {node.get_owner() for node in nodes}
+    assert owners == set(PLAYER_COLORS[:3])
+    assert all(1 <= node.get_troops() <= 5 for node in nodes)
+    with pytest.raises(ValueError):
+        deal(nodes, len(PLAYER_COLORS) + 1)
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from color import Color
+from engine import Game
+from mcts import ATTACK, DEPLOY, END, FORTIFY, MCTS, TurnState, attack_phase
+
+RED, BLUE, GREEN = Color.RED, Color.BLUE, Color.GREEN
+
+
+def line(owners, troops, order, phase=DEPLOY, reinforcements=None):
+    '''Territories in a line, the first two making up a continent worth 2.'''
+    n = len(owners)
+    neighbors = [[j for j in (i - 1, i + 1) if 0 <= j < n] for i in range(n)]
+    return TurnState(list(owners), list(troops), neighbors, [(2, [0, 1])],
+                     list(order), phase, reinforcements)
+
+
+def test_turn_state_plays_a_turn():
+    position = line([RED, RED, BLUE, GREEN], [3, 2, 1, 1], [RED, BLUE, GREEN])
+    assert position.reinforcements == 3 + 2
+    assert [action for _, action in position.actions()] == [(DEPLOY, 1)]
+    assert not position.is_legal((END,))
+
+    position.apply((DEPLOY, 1), random.Random(0))
+    assert position.troops[1] == 7 and position.phase == ATTACK
+    assert position.is_legal((ATTACK, 1, 2))
+    assert not position.is_legal((ATTACK, 1, 0))
+    # Seven troops against one; the blitz drawn with this seed wins.
+    position.apply((ATTACK, 1, 2), random.Random(0))
+    assert position.owners[2] == RED and position.troops[1] == 1
+    assert position.order == [RED, GREEN]
+
+    position.apply((END,), None)
+    assert position.phase == FORTIFY
+    position.apply((FORTIFY, 0, 1), None)
+    assert position.troops[:2] == [1, 3]
+    assert position.player() == GREEN and position.phase == DEPLOY
+    assert position.reinforcements == 3
+
+
+def test_copies_are_independent():
+    position = line([RED, BLUE], [3, 1], [RED, BLUE])
+    copy = position.copy()
+    copy.apply((DEPLOY, 0), random.Random(0))
+    assert position.troops == [3, 1] and position.phase == DEPLOY
+
+
+def test_rewards():
+    position = line([RED, RED, BLUE], [6, 2, 2], [RED, BLUE])
+    rewards = position.rewards()
+    assert rewards[RED] == pytest.approx((2 / 3 + 0.8) / 2)
+    assert rewards[RED] + rewards[BLUE] == pytest.approx(1.0)
+    position.rollout(random.Random(1), max_turns=200)
+    if position.is_over():
+        assert position.rewards() == {position.player(): 1.0}
+
+
+def test_search_is_reproducible_and_leaves_the_position_alone():
+    position = line([RED, RED, BLUE, BLUE, RED, BLUE], [5, 2, 3, 4, 6, 2],
+                    [RED, BLUE], ATTACK, 0)
+    before = (list(position.owners), list(position.troops), position.phase)
+    runs = []
+    for _ in range(2):
+        search = MCTS(position, seed=3)
+        action = search.run(iterations=150)
+        runs.append((action, [(child.action, child.visits)
+                              for child in search.root.children]))
+        assert search.iterations == 150
+        assert position.is_legal(action)
+    assert runs[0] == runs[1]
+    assert (position.owners, position.troops, position.phase) == before
+
+
+def test_search_takes_the_winning_attack():
+    # Blue's last territory, one troop against thirty.
+    position = line([RED, BLUE, RED], [30, 1, 2], [RED, BLUE], ATTACK, 0)
+    assert MCTS(position, seed=0).run(iterations=100) == (ATTACK, 0, 1)
+
+
+def test_run_needs_a_budget():
+    search = MCTS(line([RED, BLUE], [3, 1], [RED, BLUE]))
+    assert search.best_action() is None
+    with pytest.raises(ValueError):
+        search.run()
+    assert search.run(time_budget=0.05) is not None
+
+
+def test_attack_phase_plays_games():
+    attack = attack_phase(iterations=20)
+    game = Game(seed=6, colors=(RED, BLUE))
+    game.setup()
+    for _ in range(4):
+        game.play_turn(attack=attack)
+    assert attack.iterations > 0
+    assert all(node.get_troops() >= 1 for node in game.get_nodes())
@@ -0,0 +1,38 @@
+from color import Color
+from multiplayer import MaxN
+from search import SearchBoard
+
+
+ORDER = [Color.RED, Color.BLUE, Color.GREEN]
+
+
+def cut_position():
+    '''Five territories on which max^n with shallow pruning, three plies
+    deep with attacks above 0.3, cuts off part of the tree.'''
+    owners = [Color.RED, Color.BLUE, Color.RED, Color.BLUE, Color.GREEN]
+    troops = [14, 15, 5, 3, 1]
+    neighbors = [[1, 4], [0, 2, 4], [1, 3], [2], [0, 1]]
+    return SearchBoard([1, 2, 3, 4, 5], owners, troops, neighbors)
+
+
+def test_shallow_pruning_cuts_without_changing_the_result():
+    full = MaxN(cut_position(), ORDER, 3, 0.3, shallow=False)
+    pruned = MaxN(cut_position(), ORDER, 3, 0.3)
+    value = full.search(Color.RED)
+    assert pruned.search(Color.RED) == value
+    assert pruned.best_move == full.best_move
+    assert full.cutoffs == 0
+    assert pruned.cutoffs > 0
+    assert pruned.nodes < full.nodes
+
+
+def test_iterate_reaches_the_full_depth():
+    board = cut_position()
+    search = MaxN(board, ORDER, 3, 0.3)
+    value, move, depth = search.iterate(Color.RED, Color.BLUE, 60.0)
+    expected = MaxN(cut_position(), ORDER, 3, 0.3)
+    assert depth == 3
+    assert value == expected.search(Color.RED)
+    assert move == expected.best_move
+    assert search.max_depth == 3
+    assert len(board.undo_log) == 0
@@ -0,0 +1,68 @@
+import pytest
+
+from color import Color
+from continent import Continent
+from node import Node, Registry
+
+
+def small_world():
+    '''Four territories in two continents of two, all Red's but the last.'''
+    owners = [Color.RED, Color.RED, Color.RED, Color.BLUE]
+    nodes = [Node(i, "T%d" % i, owner) for i, owner in enumerate(owners)]
+    north = Continent("North", nodes[:2], 2, Color.RED)
+    south = Continent("South", nodes[2:], 1)
+    return Registry(nodes), nodes, north, south
+
+
+def test_registry_finds_territories():
+    registry, nodes, _, _ = small_world()
+    assert len(registry) == 4
+    assert registry.find(2) is nodes[2]
+    assert registry.find(9) is None
+    assert registry.find_name("T1") is nodes[1]
+    assert registry.find_owned(3, Color.BLUE) is nodes[3]
+    assert registry.find_owned(3, Color.RED) is None
+    assert registry.get_nodes() == nodes
+    with pytest.raises(ValueError):
+        registry.add(Node(0, "Elsewhere"))
+
+
+def test_masks_follow_owners():
+    registry, nodes, _, _ = small_world()
+    assert [node.bit for node in nodes] == [1, 2, 4, 8]
+    assert registry.get_mask(Color.RED) == 0b0111
+    assert registry.get_mask(Color.BLUE) == 0b1000
+    assert registry.get_mask(Color.GREEN) == 0
+
+    version = registry.version
+    nodes[1].set_owner(Color.GREEN)
+    assert registry.get_mask(Color.RED) == 0b0101
+    assert registry.get_mask(Color.GREEN) == 0b0010
+    assert registry.version > version
+
+    # Setting the same owner again is not a move.
+    version = registry.version
+    nodes[1].set_owner(Color.GREEN)
+    assert registry.version == version
+
+
+def test_moves_update_continent_owners():
+    registry, nodes, north, south = small_world()
+    assert north.get_mask() == 0b0011
+    assert south.get_mask() == 0b1100
+
+    nodes[0].set_owner(Color.BLUE)
+    assert north.get_owner() is None
+    nodes[2].set_owner(Color.BLUE)
+    assert south.get_owner() == Color.BLUE
+    nodes[1].set_owner(Color.BLUE)
+    assert north.get_owner() == Color.BLUE
+    nodes[3].set_owner(Color.RED)
+    assert south.get_owner() is None
+
+
+def test_edges_bump_the_version():
+    registry, nodes, _, _ = small_world()
+    version = registry.version
+    nodes[0].add_edge(nodes[1])
+    assert registry.version > version
@@ -0,0 +1,50 @@
+from fractions import Fraction
+
+import pytest
+
+from dice import loss_distribution
+from odds import distribution, expected_losses, win_probability
+from rng import GameRandom
+from roll import blitz
+
+
+def test_loss_distribution_of_three_dice_against_two():
+    assert loss_distribution(3, 2, exact=True) == [
+        ((0, 2), Fraction(2890, 7776)),
+        ((1, 1), Fraction(2611, 7776)),
+        ((2, 0), Fraction(2275, 7776)),
+    ]
+
+
+def test_win_probability_of_small_battles():
+    # One die each: the attacker needs the higher one.
+    assert win_probability(2, 1) == pytest.approx(15 / 36)
+    # Two dice against one, and one each after a lost roll.
+    assert win_probability(3, 1) == pytest.approx(
+        125 / 216 + 91 / 216 * 15 / 36)
+    assert win_probability(1, 3) == 0.0
+    assert win_probability(5, 0) == 1.0
+
+
+@pytest.mark.parametrize("attack", range(1, 12))
+@pytest.mark.parametrize("defense", range(1, 10))
+def test_distribution_matches_win_probability_and_losses(attack, defense):
+    outcomes = distribution(attack, defense)
+    assert sum(outcomes.values()) == pytest.approx(1.0)
+    assert all(a == 1 or d == 0 for a, d in outcomes)
+    win = sum(p for (_, d), p in outcomes.items() if d == 0)
+    assert win_probability(attack, defense) == pytest.approx(win)
+    attack_lost = sum(p * (attack - a) for (a, _), p in outcomes.items())
+    defense_lost = sum(p * (defense - d) for (_, d), p in outcomes.items())
+    assert expected_losses(attack, defense) == pytest.approx(
+        (attack_lost, defense_lost))
+
+
+@pytest.mark.parametrize("attack, defense", [(3, 2), (6, 4), (10, 10)])
+def test_win_probability_matches_rolled_blitzes(attack, defense):
+    rng = GameRandom(attack * 100 + defense, quiet=True)
+    trials = 4000
+    wins = sum(blitz(attack, defense, rng)[1] == 0 for _ in range(trials))
+    # About four standard deviations.
+    assert wins / trials == pytest.approx(win_probability(attack, defense),
+                                          abs=0.032)
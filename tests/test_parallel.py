@@ -0,0 +1,52 @@
+import pytest
+
+from color import Color
+from evaluation import make_evaluator
+from mapgen import generate_world
+from mcts import ATTACK
+from parallel import SearchPool
+from player import Player
+from search import AlphaBeta, SearchBoard
+from statetree import StateTree
+
+
+@pytest.fixture(scope="module")
+def world():
+    return generate_world(42, 6, 2, seed=7)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("evaluator", [None, "fast"])
+def test_parallel_alphabeta_matches_the_serial_search(world, workers,
+                                                      evaluator):
+    continents, nodes = world
+    board = SearchBoard.from_nodes(nodes)
+    if evaluator is not None:
+        serial = AlphaBeta(board, Color.RED, 4, 0.5, evaluator=make_evaluator(
+            evaluator, board, continents))
+    else:
+        serial = AlphaBeta(board, Color.RED, 4, 0.5)
+    value = serial.search(Color.RED, Color.BLUE)
+    tree = StateTree()
+    state = tree.reset(Player(Color.RED, 0, [], []),
+                       Player(Color.BLUE, 0, [], []), [], [])
+    # The workers' tables could change the result (see
+    # SearchPool.alphabeta()), though not on this position.
+    with SearchPool(nodes, continents, workers) as pool:
+        res = pool.alphabeta(nodes, Color.RED, Color.BLUE, 4, Color.RED, 0.5,
+                             evaluator, state)
+    assert res[0] == pytest.approx(value)
+    assert res[1] == serial.best_move
+    assert state.get_h() == pytest.approx(value)
+    best = max(state.get_children(), key=lambda child: child.get_h())
+    assert best.get_move() == tuple(board.ids[i] for i in serial.best_move)
+
+
+def test_parallel_mcts_does_not_depend_on_scheduling(world):
+    continents, nodes = world
+    colors = [Color.RED, Color.BLUE]
+    with SearchPool(nodes, continents, 2) as pool:
+        first = pool.mcts(nodes, colors, ATTACK, 0, 200, seed=5)
+        second = pool.mcts(nodes, colors, ATTACK, 0, 200, seed=5)
+    assert first == second
+    assert sum(visits for visits, _ in first[1].values()) > 0
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from color import Color
+from mapgen import generate_world
+from path import components_of, path_exists, path_exists_search
+
+
+def assert_matches_search(nodes):
+    for node1 in nodes:
+        for node2 in nodes:
+            if node1.get_owner() == node2.get_owner():
+                assert path_exists(node1, node2) == \
+                    path_exists_search(node1, node2)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_path_exists_matches_search(seed):
+    _, nodes = generate_world(24, 4, num_players=3, seed=seed)
+    assert_matches_search(nodes)
+
+
+def test_index_follows_moves():
+    _, nodes = generate_world(20, 3, num_players=2, seed=7)
+    registry = nodes[0].registry
+    index = components_of(registry)
+    assert components_of(registry) is index
+    rng = random.Random(7)
+    for _ in range(30):
+        node = rng.choice(nodes)
+        node.set_owner(Color.GREEN if node.get_owner() != Color.GREEN
+                       else Color.RED)
+        assert index.version != registry.version
+        assert_matches_search(nodes)
+        assert index.version == registry.version
+
+
+def test_unregistered_nodes_fall_back_to_search():
+    _, nodes = generate_world(12, 2, num_players=1, seed=3)
+    for node in nodes:
+        node.registry = None
+    assert path_exists(nodes[0], nodes[-1])
@@ -0,0 +1,43 @@
+from card import shuffled_deck
+from color import Color
+from mapgen import generate_world
+from player import Player
+from rng import GameRandom
+from roll import blitz
+from rules import initialize_troops
+
+
+def draws(rng, n=20):
+    return [rng.randint(1, 6) for _ in range(n)]
+
+
+def test_streams_reproduce_from_their_seed():
+    first = GameRandom.streams(7, 3)
+    second = GameRandom.streams(7, 3)
+    assert [draws(rng) for rng in first] == [draws(rng) for rng in second]
+    assert draws(first[0]) != draws(first[1])
+    assert draws(GameRandom(5)) == draws(GameRandom(5))
+
+
+def test_quiet_streams_print_nothing(capsys):
+    blitz(20, 15, GameRandom(1, quiet=True))
+    assert capsys.readouterr().out == ""
+    blitz(20, 15, GameRandom(1))
+    assert capsys.readouterr().out != ""
+
+
+def test_seeded_blitzes_and_decks_reproduce():
+    results = [[blitz(12, 9, rng) for _ in range(50)]
+               for rng in [GameRandom(3, quiet=True), GameRandom(3, quiet=True)]]
+    assert results[0] == results[1]
+    assert shuffled_deck(GameRandom(4)) == shuffled_deck(GameRandom(4))
+
+
+def test_seeded_setup_reproduces():
+    def setup(seed):
+        _, nodes = generate_world(30, 4, 2, seed=0)
+        order = [Player(Color.RED, 40, []), Player(Color.BLUE, 40, [])]
+        initialize_troops(order, nodes.copy(), GameRandom(seed))
+        return [node.get_troops() for node in nodes]
+    assert setup(1) == setup(1)
+    assert setup(1) != setup(2)
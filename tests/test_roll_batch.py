@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from odds import distribution
+from roll_batch import batch_blitz, empirical_distribution
+
+
+@pytest.mark.parametrize("attack, defense", [(2, 1), (4, 2), (8, 5)])
+def test_batch_blitz_matches_the_exact_distribution(attack, defense):
+    observed = empirical_distribution(attack, defense, 100000,
+                                      np.random.default_rng(attack + defense))
+    exact = distribution(attack, defense)
+    assert set(observed) <= set(exact)
+    for outcome, p in exact.items():
+        # Well over four standard deviations of 100000 draws.
+        assert observed.get(outcome, 0.0) == pytest.approx(p, abs=0.007)
+
+
+def test_batch_blitz_keeps_the_shape_of_its_inputs():
+    a, d = batch_blitz([[5, 3], [2, 9]], [[1, 2], [4, 3]],
+                       np.random.default_rng(0))
+    assert a.shape == d.shape == (2, 2)
+    assert np.all((a == 1) | (d == 0))
+
+
+def test_batch_blitz_rejects_impossible_battles():
+    with pytest.raises(ValueError):
+        batch_blitz([1], [3])
+    with pytest.raises(ValueError):
+        batch_blitz([4], [0])
+    with pytest.raises(ValueError):
+        batch_blitz([4, 5], [3])
@@ -0,0 +1,47 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from odds import distribution
+from roll_batch import sample_blitz_batch
+from sampler import alias_table, sample_blitz
+
+
+@pytest.mark.parametrize("attack, defense", [(2, 1), (5, 3), (12, 9), (30, 2)])
+def test_alias_table_gives_the_exact_distribution(attack, defense):
+    outcomes, prob, alias = alias_table(attack, defense)
+    n = len(outcomes)
+    implied = [p / n for p in prob]
+    for i, j in enumerate(alias):
+        implied[j] += (1.0 - prob[i]) / n
+    exact = distribution(attack, defense)
+    assert dict(zip(outcomes, implied)) == pytest.approx(exact)
+
+
+@pytest.mark.parametrize("attack, defense", [(3, 2), (7, 5)])
+def test_sample_blitz_frequencies(attack, defense):
+    rng = random.Random(attack * defense)
+    n = 50000
+    counts = Counter(sample_blitz(attack, defense, rng) for _ in range(n))
+    for outcome, p in distribution(attack, defense).items():
+        assert counts[outcome] / n == pytest.approx(p, abs=0.01)
+
+
+def test_sample_blitz_batch_frequencies():
+    n = 50000
+    attack = np.array([3, 7] * n)
+    defense = np.array([2, 5] * n)
+    a, d = sample_blitz_batch(attack, defense, np.random.default_rng(1))
+    for k, (attack_k, defense_k) in enumerate([(3, 2), (7, 5)]):
+        counts = Counter(zip(a[k::2].tolist(), d[k::2].tolist()))
+        for outcome, p in distribution(attack_k, defense_k).items():
+            assert counts[outcome] / n == pytest.approx(p, abs=0.01)
+
+
+def test_sample_blitz_rejects_impossible_battles():
+    with pytest.raises(ValueError):
+        sample_blitz(1, 3)
+    with pytest.raises(ValueError):
+        sample_blitz(4, 0)
@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+from color import Color
+from mapgen import generate_world
+from sampler import sample_blitz
+from search import EXACT, LOWER, AlphaBeta, SearchBoard, TranspositionTable
+
+
+def position(seed, num_territories=42):
+    '''Returns the continents and a SearchBoard of a generated map dealt
+    between RED and BLUE.'''
+    continents, nodes = generate_world(num_territories, 6, 2, seed=seed)
+    return continents, SearchBoard.from_nodes(nodes)
+
+
+def snapshot(board):
+    counts = [(board.territory_count(color), board.total_troops(color))
+              for color in Color]
+    return list(board.owners), list(board.troops), board.hash, counts
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_make_and_unmake_restore_the_board_and_hash(seed):
+    _, board = position(seed)
+    rng = random.Random(seed)
+    start = snapshot(board)
+    color, other = Color.RED, Color.BLUE
+    for _ in range(30):
+        moves = board.attack_moves(color)
+        if len(moves) == 0:
+            break
+        from_i, to_i, _ = rng.choice(moves)
+        if rng.random() < 0.5:
+            board.make_attack(from_i, to_i)
+        else:
+            board.make_blitz(from_i, to_i, *sample_blitz(
+                board.troops[from_i], board.troops[to_i], rng))
+        # The incremental counts and hash are those of the position.
+        fresh = SearchBoard(board.ids, list(board.owners), list(board.troops),
+                            board.neighbors)
+        assert snapshot(board) == snapshot(fresh)
+        color, other = other, color
+    while len(board.undo_log) > 0:
+        board.unmake()
+    assert snapshot(board) == start
+
+
+def test_table_replacement():
+    table = TranspositionTable(max_bytes=2 * TranspositionTable.ENTRY_BYTES)
+    assert len(table.slots) == 2
+    table.store(1, 5.0, 3, EXACT, None)
+    assert table.probe(1)[1:5] == (5.0, 3, EXACT, None)
+    assert table.probe(3) is None
+    # A shallower entry of the same search doesn't replace a deeper one...
+    table.store(3, 6.0, 2, LOWER, None)
+    assert table.probe(1) is not None and table.probe(3) is None
+    # ...but does once that one is from an older search.
+    table.new_search()
+    table.store(3, 6.0, 2, LOWER, None)
+    assert table.probe(1) is None and table.probe(3)[1] == 6.0
+    table.clear()
+    assert len(table) == 0
+
+
+def test_reused_table_agrees_with_a_fresh_one():
+    # Two positions that differ only in the troops on one territory (both
+    # large counts) must not share table entries.
+    _, board = position(1)
+    i = max(range(len(board)), key=lambda i: (board.owners[i] == Color.RED,
+                                              len(board.neighbors[i])))
+    table = TranspositionTable()
+    for troops in [40, 50]:
+        board.lift(i)
+        board.troops[i] = troops
+        board.place(i)
+        table.new_search()
+        reused = AlphaBeta(board, Color.RED, 4, 0.5, table)
+        fresh = AlphaBeta(board, Color.RED, 4, 0.5, TranspositionTable())
+        assert (reused.search(Color.RED, Color.BLUE)
+                == pytest.approx(fresh.search(Color.RED, Color.BLUE)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_iterate_reaches_the_search_depth(seed):
+    _, board = position(seed)
+    search = AlphaBeta(board, Color.RED, 4, 0.5)
+    value = search.search(Color.RED, Color.BLUE)
+    move = search.best_move
+    deepening = AlphaBeta(board, Color.RED, 4, 0.5)
+    assert deepening.iterate(Color.RED, Color.BLUE, 60.0) == \
+        (pytest.approx(value), move, 4)
+    assert deepening.max_depth == 4
+    assert len(board.undo_log) == 0
+
+
+def test_iterate_out_of_time_restores_the_board():
+    _, board = position(0)
+    start = snapshot(board)
+    search = AlphaBeta(board, Color.RED, 8, 0.5)
+    # The clock is only read every few nodes, so the shallowest iterations
+    # may still complete.
+    value, move, depth = search.iterate(Color.RED, Color.BLUE, 0.0)
+    assert depth < 8
+    assert (value is None) == (depth == 0)
+    assert snapshot(board) == start
+    assert search.max_depth == 8
+    assert search.deadline is None
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_alphabeta_variants_agree(seed):
+    _, board = position(seed)
+    values = []
+    for ordering in [False, True]:
+        for pvs in [False, True]:
+            for table in [None, TranspositionTable()]:
+                search = AlphaBeta(board, Color.RED, 4, 0.5, table, ordering,
+                                   pvs)
+                values.append(search.search(Color.RED, Color.BLUE))
+                assert len(board.undo_log) == 0
+    assert values == pytest.approx([values[0]] * len(values))
+
+
+def test_both_players_attack_by_the_same_rule():
+    # 0 - 1 - 2 in a line: 4 troops can't take 3 defenders, 5 can.
+    def line(owners, troops):
+        return SearchBoard([1, 2, 3], owners, troops, [[1], [0, 2], [1]])
+    red = line([Color.RED, Color.BLUE, Color.RED], [4, 3, 5])
+    blue = line([Color.BLUE, Color.RED, Color.BLUE], [4, 3, 5])
+    assert [move[:2] for move in red.attack_moves(Color.RED)] == [(2, 1)]
+    assert red.attack_moves(Color.RED) == blue.attack_moves(Color.BLUE)
+    assert red.attack_move(0, 1, Color.RED) is None
+    assert blue.attack_move(0, 1, Color.BLUE) is None
+
+
+@pytest.mark.parametrize("ordering", [False, True])
+def test_generate_moves_yields_the_hash_move_first(ordering):
+    _, board = position(2)
+    search = AlphaBeta(board, Color.RED, 3, 0.5, ordering=ordering)
+    moves = board.attack_moves(Color.RED, 0.5)
+    if ordering:
+        moves = search.order_moves(moves, True, 0, None)
+    assert list(search.generate_moves(Color.RED, True, 0, None)) == moves
+    hash_move = moves[-1]
+    generated = list(search.generate_moves(Color.RED, True, 0, hash_move[:2]))
+    assert generated == [hash_move] + moves[:-1]
+    # A hash move that is no longer legal is skipped.
+    illegal = (moves[0][0], moves[0][0])
+    assert list(search.generate_moves(Color.RED, True, 0, illegal)) == moves
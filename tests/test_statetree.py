@@ -0,0 +1,161 @@
+import pytest
+
+from color import Color
+from mapgen import generate_world
+from player import Player
+from search import AlphaBeta, SearchBoard, TranspositionTable
+from state import State
+from statetree import NO_NODE, StateTree, TreeState
+
+
+def players():
+    return Player(Color.RED, 0, [], []), Player(Color.BLUE, 0, [], [])
+
+
+def small_tree():
+    '''A root with children a (with children a1, a2) and b.'''
+    red, blue = players()
+    tree = StateTree()
+    root = tree.reset(red, blue, [(1, 8)], [(2, 3)])
+    a = root.new_child((1, 2), 0.5, key=5)
+    b = root.new_child((1, 3), 0.25)
+    a1 = a.new_child((2, 1), 0.4)
+    a2 = a.new_child((2, 4), 0.1)
+    return tree, root, a, b, a1, a2
+
+
+def test_arena_links_children_in_order():
+    tree, root, a, b, a1, a2 = small_tree()
+    assert len(tree) == 5 and tree.live() == 5
+    assert root.get_children() == [a, b]
+    assert a.get_children() == [a1, a2]
+    assert a1.get_parent() == a and root.get_parent() is None
+    assert tree.subtree_size(a.index) == 3
+    assert a.get_move() == (1, 2) and root.get_move() is None
+    assert a.get_key() == 5 and b.get_key() is None
+    assert a1.get_likelihood() == 0.4
+    # Players alternate with the depth.
+    red, blue = tree.players
+    assert root.get_current_player() is red
+    assert a.get_current_player() is blue and a.get_opponent() is red
+    assert a1.get_current_player() is red
+
+
+def test_set_children_frees_the_newest_nodes():
+    tree, root, a, b, a1, a2 = small_tree()
+    # b's subtree is the newest: dropping it shrinks the arena...
+    b1 = b.new_child((3, 2), 1.0)
+    b.set_children([])
+    assert len(tree) == 5 and b.get_children() == []
+    # ...but a's is not, so it is left in place, unreachable.
+    root.set_children([b])
+    assert root.get_children() == [b]
+    assert len(tree) == 5 and tree.live() == 2
+    tree.compact()
+    assert len(tree) == 2 and tree.live() == 2
+    assert TreeState(tree, 1).get_move() == (1, 3)
+    assert TreeState(tree, 1).get_parent() == TreeState(tree, 0)
+
+
+def test_renumber_keeps_a_subtree_depth_first():
+    tree, root, a, b, a1, a2 = small_tree()
+    a2.set_h(7.5)
+    tree.set_pointer(a2)
+    tree.renumber(a.index)
+    assert len(tree) == 3
+    assert list(tree.parent) == [NO_NODE, 0, 0]
+    assert [TreeState(tree, i).get_move() for i in range(3)] == \
+        [(1, 2), (2, 1), (2, 4)]
+    assert tree.get_pointer() == TreeState(tree, 2)
+    assert tree.get_pointer().get_h() == 7.5
+
+
+def test_reroot_rescales_and_swaps_players():
+    tree, root, a, b, a1, a2 = small_tree()
+    a.set_h(0.5 * 6.0)
+    a1.set_h(0.4 * 2.0)
+    red, blue = tree.players
+    new_root = tree.reroot(a, [(2, 3)], [(1, 1)])
+    assert new_root == tree.get_pointer() == TreeState(tree, 0)
+    assert new_root.get_move() is None
+    assert new_root.get_likelihood() == 1 and new_root.get_h() == 6.0
+    assert new_root.get_current_player() is blue
+    assert new_root.get_trp_terr() == [(2, 3)]
+    child = new_root.get_children()[0]
+    assert child.get_likelihood() == 0.8 and child.get_h() == 1.6
+    assert child.get_current_player() is red
+
+
+def recorded(state):
+    return (state.get_move(), state.get_likelihood(), state.get_h(),
+            state.get_key(), state.get_current_player().get_color(),
+            [recorded(child) for child in state.get_children()])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_views_record_searches_like_states(seed):
+    _, nodes = generate_world(30, 4, 2, seed=seed)
+    red, blue = players()
+    tree = StateTree()
+    roots = [State(red, blue, likelihood=1), tree.reset(red, blue, [], [])]
+    for root in roots:
+        board = SearchBoard.from_nodes(nodes)
+        AlphaBeta(board, Color.RED, 4, 0.5, TranspositionTable()).search(
+            Color.RED, Color.BLUE, state=root)
+    assert recorded(roots[1]) == recorded(roots[0])
+    # Only the root's children and the principal variation below one of
+    # them (at most three plies at depth 4) are kept.
+    children = roots[1].get_children()
+    assert sum(len(child.get_children()) > 0 for child in children) <= 1
+    assert tree.live() <= 1 + len(children) + 3
+
+
+def test_views_are_interchangeable():
+    tree, root, a, b, a1, a2 = small_tree()
+    assert TreeState(tree, a.index) == a and a != b
+    assert len({a, TreeState(tree, a.index), b}) == 2
+    TreeState(tree, a.index).set_h(3.0)
+    assert a.get_h() == 3.0
+    assert TreeState(StateTree(), 0) != root
+
+
+def searched_tree():
+    '''A root where RED owns territories 1 (8 troops) and 2 (1 troop) and
+    BLUE owns 3 (2 troops), with a child for the conquest of 3 from 1.'''
+    red, blue = players()
+    tree = StateTree()
+    root = tree.reset(red, blue, [(1, 8), (2, 1)], [(3, 2)], key=11)
+    child = root.new_child((1, 3), 0.9, key=22)
+    child.set_h(6.3)
+    return tree, red, blue
+
+
+def test_follow_reroots_onto_the_searched_position():
+    tree, red, blue = searched_tree()
+    root = tree.follow((1, 3), 22, [], [(1, 1), (2, 1), (3, 7)])
+    assert root is not None
+    assert root.get_parent() is None
+    assert root.get_current_player() is blue
+    assert root.get_likelihood() == 1
+    assert root.get_h() == 6.3 / 0.9
+
+
+def test_follow_compares_troops_as_well_as_the_key():
+    # Same move and key, but the battle cost the attacker a troop.
+    tree, red, blue = searched_tree()
+    assert tree.follow((1, 3), 22, [], [(1, 1), (2, 1), (3, 6)]) is None
+    assert tree.follow((1, 3), 33, [], [(1, 1), (2, 1), (3, 7)]) is None
+    assert tree.follow((2, 3), 22, [], [(1, 1), (2, 1), (3, 7)]) is None
+
+
+def test_is_at_ignores_the_order_of_territories():
+    tree, red, blue = searched_tree()
+    assert tree.is_at([(2, 1), (1, 8)], [(3, 2)])
+    assert not tree.is_at([(1, 8), (2, 2)], [(3, 2)])
+
+
+def test_follow_only_from_the_root():
+    tree, red, blue = searched_tree()
+    child = tree.get_pointer().get_children()[0]
+    tree.set_pointer(child)
+    assert tree.follow((1, 3), 22, [], [(1, 1), (2, 1), (3, 7)]) is None
@@ -0,0 +1,45 @@
+import random
+
+from color import Color
+from mapgen import generate_world
+from search import SearchBoard
+from zobrist import PRESET_TROOPS, GraphHash, Zobrist, zobrist_for
+
+
+def test_graph_hash_follows_the_nodes():
+    _, nodes = generate_world(42, 6, 2, seed=3)
+    graph_hash = GraphHash(nodes)
+    rng = random.Random(3)
+    for _ in range(50):
+        node = rng.choice(nodes)
+        if rng.random() < 0.5:
+            node.set_troops(rng.randint(1, 100))
+        else:
+            node.set_owner(rng.choice([Color.RED, Color.BLUE]))
+        board = SearchBoard.from_nodes(nodes)
+        assert graph_hash.key(Color.RED) == board.key(Color.RED)
+        assert graph_hash.key(Color.RED) == \
+            graph_hash.zobrist.hash_nodes(nodes, Color.RED)
+    graph_hash.detach()
+    assert all(node.hasher is None for node in nodes)
+
+
+def test_keys_are_reproducible():
+    zobrist = Zobrist(10, seed=4)
+    # Keys past the preset troop counts don't depend on the order they are
+    # asked for in.
+    late = Zobrist(10, seed=4)
+    big = PRESET_TROOPS + 7
+    assert late.territory_key(3, Color.RED, big) == \
+        zobrist.territory_key(3, Color.RED, big)
+    assert zobrist.territory_key(3, Color.RED, 5) == \
+        late.territory_key(3, Color.RED, 5)
+    assert zobrist.side_key(Color.RED) != zobrist.side_key(Color.BLUE)
+    assert zobrist_for(10, 4) is zobrist_for(10, 4)
+
+
+def test_large_troop_counts_get_distinct_keys():
+    zobrist = Zobrist(2)
+    keys = {zobrist.territory_key(0, Color.RED, troops)
+            for troops in range(PRESET_TROOPS + 100)}
+    assert len(keys) == PRESET_TROOPS + 100
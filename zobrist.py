@@ -0,0 +1,118 @@
+import random
+
+from color import COLOR_CODES
+
+
+# Zobrist hashing: every (territory, owner, troop count) triple and every
+# side to move gets a random 64-bit key, and a position hashes to the XOR of
+# the keys of its parts. A change to one territory updates the hash in O(1)
+# by XORing its old key out and its new key in. Troop counts are hashed
+# exactly: positions that only differ in a big stack are different
+# positions to the search (and to a transposition table).
+
+# Keys for up to PRESET_TROOPS troops are drawn up front. Larger counts get
+# theirs on first use, from a stream seeded by the count itself, so the keys
+# don't depend on the order they are needed in.
+PRESET_TROOPS = 64
+
+
+class Zobrist():
+
+    def __init__(self, num_territories, seed=0):
+        ''' Initiates the random keys for a map with [num_territories]
+        territories, numbered by their index in increasing id order. The same
+        [seed] always gives the same keys, so hashes can be stored and
+        compared across runs.'''
+        rng = random.Random(seed)
+        self.seed = seed
+        self.num_territories = num_territories
+        self.table = [[[rng.getrandbits(64) for _ in range(PRESET_TROOPS + 1)]
+                       for _ in COLOR_CODES]
+                      for _ in range(num_territories)]
+        self.sides = [rng.getrandbits(64) for _ in COLOR_CODES]
+
+    def territory_key(self, i, owner, numtroops):
+        '''Returns the key of territory [i] owned by [owner] (Color object)
+        with [numtroops] troops; unclaimed territories (-1 troops) share the
+        key of empty ones.'''
+        keys = self.table[i][COLOR_CODES[owner]]
+        if numtroops >= len(keys):
+            self.extend(keys, i, owner, numtroops)
+        return keys[max(numtroops, 0)]
+
+    def extend(self, keys, i, owner, numtroops):
+        '''Adds the keys of territory [i] owned by [owner] for up to
+        [numtroops] troops to [keys], its list of keys by troop count.'''
+        code = COLOR_CODES[owner]
+        while len(keys) <= numtroops:
+            stream = random.Random("%s:%i:%i:%i" % (self.seed, i, code,
+                                                     len(keys)))
+            keys.append(stream.getrandbits(64))
+
+    def side_key(self, color):
+        '''Returns the key of [color] (Color object) being the side to
+        move.'''
+        return self.sides[COLOR_CODES[color]]
+
+    def hash_territories(self, territories, side=None):
+        '''Returns the hash of a whole position given as (index, owner,
+        troops) triples, with [side] to move (or no side if None).'''
+        h = 0 if side is None else self.side_key(side)
+        for i, owner, numtroops in territories:
+            h ^= self.territory_key(i, owner, numtroops)
+        return h
+
+    def hash_nodes(self, nodes, side=None):
+        '''Returns the hash of the position of [nodes] (all Node objects of
+        the map) with [side] to move.'''
+        nodes = sorted(nodes, key=lambda node: node.get_id())
+        return self.hash_territories(
+            [(i, node.get_owner(), node.get_troops())
+             for i, node in enumerate(nodes)], side)
+
+
+_shared = {}
+
+
+def zobrist_for(num_territories, seed=0):
+    '''Returns a Zobrist object for maps of [num_territories] territories,
+    shared by all boards of that size.'''
+    key = (num_territories, seed)
+    if key not in _shared:
+        _shared[key] = Zobrist(num_territories, seed)
+    return _shared[key]
+
+
+class GraphHash():
+
+    def __init__(self, nodes, zobrist=None):
+        ''' Keeps the hash of a live Node graph. Attaches itself to each of
+        [nodes] (all Node objects of the map), whose set_owner(),
+        set_troops(), add_troops() and subtract_troops() then report every
+        change, so the hash stays current in O(1) per change. The side to
+        move is not part of the graph; see key().'''
+        nodes = sorted(nodes, key=lambda node: node.get_id())
+        self.zobrist = zobrist if zobrist is not None else zobrist_for(len(nodes))
+        self.index = {}
+        self.hash = 0
+        for i, node in enumerate(nodes):
+            self.index[node] = i
+            self.hash ^= self.zobrist.territory_key(i, node.get_owner(),
+                                                    node.get_troops())
+            node.hasher = self
+
+    def update(self, node, owner, numtroops):
+        '''Records that [node] is about to get [owner] and [numtroops].'''
+        i = self.index[node]
+        self.hash ^= self.zobrist.territory_key(i, node.get_owner(),
+                                                node.get_troops())
+        self.hash ^= self.zobrist.territory_key(i, owner, numtroops)
+
+    def key(self, side):
+        '''Returns the hash of the graph with [side] (Color object) to
+        move.'''
+        return self.hash ^ self.zobrist.side_key(side)
+
+    def detach(self):
+        for node in self.index:
+            node.hasher = None